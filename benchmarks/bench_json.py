@@ -0,0 +1,45 @@
+"""Benchmark of the JSON backends on the player DB and league fixtures.
+
+python -m benchmarks.bench_json [--db script/resources/players_db.json]
+"""
+import argparse
+import timeit
+from pathlib import Path
+
+from script.common import json_backend
+from script.players.players import PlayerDB
+
+FIXTURES = ['test_league.json', 'test_rosters.json']
+
+
+def bench_file(path: Path, number: int) -> None:
+    """Prints decode and encode times of a file for every backend."""
+    raw = path.read_bytes()
+    for backend in json_backend.available_backends():
+        json_backend.set_backend(backend)
+        data = json_backend.loads(raw)
+        decode = timeit.timeit(lambda: json_backend.loads(raw), number=number)
+        encode = timeit.timeit(lambda: json_backend.dumps(data), number=number)
+        print(f"{path.name:<24} {len(raw) / 1024:>9.1f} KiB {backend:<8} "
+              f"decode {decode / number * 1000:>9.3f} ms  "
+              f"encode {encode / number * 1000:>9.3f} ms")
+
+
+def main(database: str, number: int) -> None:
+    """Entry point."""
+    default_backend = json_backend.get_backend()
+    paths = [Path(database)] + [Path(fixture) for fixture in FIXTURES]
+    for path in paths:
+        if not path.exists():
+            print(f"{path} not found, skipping.")
+            continue
+        bench_file(path, number)
+    json_backend.set_backend(default_backend)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default=PlayerDB.player_db, help='Player database')
+    parser.add_argument('--number', type=int, default=20, help='Iterations')
+    args = parser.parse_args()
+    main(args.db, args.number)
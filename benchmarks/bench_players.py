@@ -0,0 +1,83 @@
+"""Memory and time benchmark of materializing the full player universe.
+
+python -m benchmarks.bench_players [--db script/resources/players_db.json]
+
+Without a player DB a synthetic universe of --size players is built
+from the test fixture.
+"""
+import argparse
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Sized
+
+from script.common.common import read_json_from_file
+from script.players.players import (Player, PlayerDB, PlayerRepository,
+                                    read_player_database)
+
+FIXTURE = 'test/resources/test_player_data.json'
+
+
+def load_repository(database: str, size: int) -> PlayerRepository:
+    """Returns a loaded repository, synthetic if the DB does not exist."""
+    repository = PlayerRepository(database)
+    if Path(database).exists():
+        repository.reload()
+        return repository
+    template = next(iter(read_json_from_file(FIXTURE).values()))
+    repository.load_items(
+        (str(i), dict(template, player_id=str(i), full_name=f"Player {i}"))
+        for i in range(size)
+    )
+    return repository
+
+
+def measure(name: str, build: Callable[[], Sized]) -> None:
+    """Prints time and allocated memory of building the players."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    players = build()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<32} {len(players):>6} entries "
+          f"{elapsed * 1000:>9.1f} ms {current / 1024 ** 2:>8.2f} MiB "
+          f"(peak {peak / 1024 ** 2:.2f} MiB)")
+
+
+def main(database: str, size: int) -> None:
+    """Entry point."""
+    repository = load_repository(database, size)
+    player_ids = list(repository)
+
+    def lazy() -> List[Player]:
+        return [Player(player_id, repository) for player_id in player_ids]
+
+    def position_and_name() -> List[Player]:
+        players = lazy()
+        for player in players:
+            player.professional.position
+            player.personal.full_name
+        return players
+
+    def fully_hydrated() -> List[Player]:
+        players = position_and_name()
+        for player in players:
+            player.sleeper.fantasy_positions
+        return players
+
+    if Path(database).exists():
+        measure('records (raw JSON)', lambda: read_json_from_file(database))
+        measure('records (interned)', lambda: read_player_database(database))
+    measure('players (lazy)', lazy)
+    measure('players (position and name)', position_and_name)
+    measure('players (fully hydrated)', fully_hydrated)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default=PlayerDB.player_db, help='Player database')
+    parser.add_argument('--size', type=int, default=11000,
+                        help='Synthetic universe size without a player DB')
+    args = parser.parse_args()
+    main(args.db, args.size)
@@ -0,0 +1,196 @@
+"""Benchmark of vectorized scoring of a full season.
+
+python -m benchmarks.bench_scoring [--players 2000 --weeks 18]
+
+Scores synthetic weekly stats under the scoring settings of
+test_league.json.
+"""
+import argparse
+import random
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from script.common.common import read_json_from_file
+from script.scoring.batch import MultiLeagueScorer
+from script.scoring.engine import DEFAULT_STATS, ScoringEngine, StatMatrix
+from script.scoring.live import LiveScorer
+from script.scoring.top_scorers import DEFAULT_POSITIONS, TopScorerQuery
+from script.scoring.week_cache import ScoredWeekCache
+
+LEAGUE = 'test_league.json'
+STATS_PER_PLAYER = 12
+ROSTERS_PER_LEAGUE = 12
+STARTERS = 9
+LIVE_UPDATES = 10000
+TOP_QUERIES = 1000
+
+
+def synthetic_week(players: int, seed: int) -> Dict[str, Dict[str, Any]]:
+    """Returns random weekly stats of the given number of players."""
+    rng = random.Random(seed)
+    return {
+        str(player_id): {
+            stat: rng.randint(1, 100)
+            for stat in rng.sample(DEFAULT_STATS, STATS_PER_PLAYER)
+            }
+        for player_id in range(players)
+    }
+
+
+def synthetic_leagues(
+        settings: Dict[str, float], leagues: int
+        ) -> Dict[str, Dict[str, float]]:
+    """Returns leagues with one of ten reception weights each."""
+    return {
+        str(league_id): dict(settings, rec=(league_id % 10) / 10)
+        for league_id in range(leagues)
+    }
+
+
+def bench_live(
+        league_settings: Dict[str, Dict[str, float]],
+        week: Dict[str, Dict[str, Any]]
+        ) -> None:
+    """Prints the cost of single player live stat updates."""
+    rng = random.Random(0)
+    player_ids = list(week)
+    lineups = {
+        league_id: {
+            str(roster_id): rng.sample(player_ids, STARTERS)
+            for roster_id in range(ROSTERS_PER_LEAGUE)
+            }
+        for league_id in league_settings
+    }
+    scorer = LiveScorer(league_settings, lineups)
+    scorer.load_stats(week)
+    deltas = [
+        {rng.choice(player_ids): {'rush_yd': rng.randint(1, 20),
+                                  'rush_att': 1}}
+        for _ in range(LIVE_UPDATES)
+    ]
+    start = time.perf_counter()
+    for delta in deltas:
+        scorer.apply_deltas(delta)
+    live = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scorer.load_stats(week)
+    full = time.perf_counter() - start
+    print(f"live update         {live / LIVE_UPDATES * 1e6:>10.2f} us")
+    print(f"full rescore        {full * 1000:>10.2f} ms")
+
+
+def bench_week_cache(
+        league_settings: Dict[str, Dict[str, float]],
+        season: List[Dict[str, Dict[str, Any]]]
+        ) -> None:
+    """Prints a season range report scored cold and from the cache."""
+    weeks = range(1, len(season) + 1)
+
+    def load_stats(_season: str, week: int) -> Dict[str, Dict[str, Any]]:
+        return season[week - 1]
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ScoredWeekCache(directory)
+        start = time.perf_counter()
+        cache.league_weeks(league_settings, '2023', weeks, load_stats,
+                           current_week=len(season))
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        cache.league_weeks(league_settings, '2023', weeks, load_stats,
+                           current_week=len(season))
+        warm = time.perf_counter() - start
+    print(f"season report cold  {cold * 1000:>10.2f} ms")
+    print(f"season report warm  {warm * 1000:>10.2f} ms")
+
+
+def bench_top_scorers(engine: ScoringEngine,
+                      week: Dict[str, Dict[str, Any]]) -> None:
+    """Prints the cost of a top 3 query over all positions of a slate."""
+    rng = random.Random(0)
+    points = engine.score_stats(week)
+    groups: Dict[str, List[str]] = {
+        position: [] for position in DEFAULT_POSITIONS
+        }
+    for player_id in points:
+        groups[rng.choice(DEFAULT_POSITIONS)].append(player_id)
+    start = time.perf_counter()
+    query = TopScorerQuery(list(points), list(points.values()), groups)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(TOP_QUERIES):
+        query.top(depth=3)
+    top = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(TOP_QUERIES):
+        for group in groups.values():
+            sorted(group, key=lambda player_id: (-points[player_id],
+                                                 player_id))[:3]
+    full_sort = time.perf_counter() - start
+    print(f"top scorers build   {build * 1000:>10.2f} ms")
+    print(f"top scorers query   {top / TOP_QUERIES * 1000:>10.3f} ms")
+    print(f"top scorers sorted  {full_sort / TOP_QUERIES * 1000:>10.3f} ms")
+
+
+def main(players: int, weeks: int, leagues: int) -> None:
+    """Entry point."""
+    settings = read_json_from_file(LEAGUE)['scoring_settings']
+    engine = ScoringEngine(settings)
+    season = [synthetic_week(players, week) for week in range(weeks)]
+
+    start = time.perf_counter()
+    matrices: List[StatMatrix] = [
+        StatMatrix.from_stats(week) for week in season
+        ]
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for matrix in matrices:
+        engine.score(matrix)
+    score = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for week in season:
+        for stats in week.values():
+            sum(value * engine.weights[engine.vocabulary.column(stat)]
+                for stat, value in stats.items())
+    loop = time.perf_counter() - start
+
+    league_settings = synthetic_leagues(settings, leagues)
+    start = time.perf_counter()
+    scorer = MultiLeagueScorer(league_settings)
+    for matrix in matrices:
+        scorer.score(matrix).values
+    batch = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for league in league_settings.values():
+        league_engine = ScoringEngine(league)
+        for matrix in matrices:
+            league_engine.score(matrix)
+    per_league = time.perf_counter() - start
+
+    print(f"{weeks} weeks x {players} players")
+    print(f"build stat matrices {build * 1000:>10.2f} ms")
+    print(f"score (matrix)      {score * 1000:>10.2f} ms")
+    print(f"score (python loop) {loop * 1000:>10.2f} ms")
+    print(f"{leagues} leagues, {len(scorer.fingerprints)} distinct scorings")
+    print(f"score (batched)     {batch * 1000:>10.2f} ms")
+    print(f"score (per league)  {per_league * 1000:>10.2f} ms")
+    bench_live(league_settings, season[-1])
+    bench_week_cache(league_settings, season)
+    bench_top_scorers(engine, season[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=2000,
+                        help='Players with stats per week')
+    parser.add_argument('--weeks', type=int, default=18, help='Weeks')
+    parser.add_argument('--leagues', type=int, default=100,
+                        help='Leagues of the multi-league benchmark')
+    args = parser.parse_args()
+    main(args.players, args.weeks, args.leagues)
@@ -1,32 +1,35 @@
 """Handling of shared functions."""
 
-import json
 from pathlib import Path
 from typing import Dict, Any
-import requests
+
+from script.common import json_backend
+from script.common.session import get_session
 
 
 def http_get_response_data_text(url: str) -> Dict[str, Any]:
     """Returns HTTP GET in text format."""
-    response = requests.get(url, timeout=10)
-    return json.loads(response.text)
+    response = get_session().get(url)
+    return json_backend.loads(response.text)
 
 
 def http_get_response_data_json(url: str) -> Dict[str, Any] | None:
     """Returns HTTP GET in JSON format."""
-    response = requests.get(url, timeout=None)
-    return response.json() if response.status_code == 200 else None
+    response = get_session().get(url)
+    return json_backend.loads(response.content) \
+        if response.status_code == 200 else None
 
 
-def write_json_to_file(data: dict, output_file: str):
-    """Helper function to write JSON data to file."""
-    with open(output_file, "w", encoding="utf-8") as file:
-        json.dump(data, file, indent=4)
+def write_json_to_file(data: dict, output_file: str, pretty: bool = False):
+    """Helper function to write JSON data to file.
+    Output is compact unless pretty is set."""
+    with open(output_file, "wb") as file:
+        file.write(json_backend.dumps(data, pretty))
 
 
 def read_json_from_file(input_file: str) -> Dict[str, Any]:
     """Helper function to read JSON data from file."""
     if not Path(input_file).exists():
         raise FileNotFoundError
-    with open(input_file, "r", encoding="utf-8") as file:
-        return json.load(file)
+    with open(input_file, "rb") as file:
+        return json_backend.loads(file.read())
@@ -0,0 +1,77 @@
+"""Selectable JSON encoder and decoder.
+
+JSON reading, writing and HTTP decoding of payloads, caches, player
+stores, change logs and metrics goes through loads() and dumps() of
+this module. Only scoring_fingerprint() keeps the standard library
+encoder, since its hashes must not depend on the installed backend.
+orjson is used if it is installed, otherwise the standard library json
+module.
+"""
+import json
+from typing import Any, Callable, Dict, List, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _stdlib_loads(data: Union[bytes, str]) -> Any:
+    return json.loads(data)
+
+
+def _stdlib_dumps(data: Any, pretty: bool) -> bytes:
+    if pretty:
+        return json.dumps(data, indent=4).encode('utf-8')
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def _orjson_loads(data: Union[bytes, str]) -> Any:
+    return orjson.loads(data)
+
+
+def _orjson_dumps(data: Any, pretty: bool) -> bytes:
+    option = orjson.OPT_NON_STR_KEYS
+    if pretty:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(data, option=option)
+
+
+_BACKENDS: Dict[str, Dict[str, Callable]] = {
+    'json': {'loads': _stdlib_loads, 'dumps': _stdlib_dumps},
+}
+if orjson is not None:
+    _BACKENDS['orjson'] = {'loads': _orjson_loads, 'dumps': _orjson_dumps}
+
+_backend = 'orjson' if orjson is not None else 'json'
+
+
+def available_backends() -> List[str]:
+    """Returns the names of the installed JSON backends."""
+    return list(_BACKENDS)
+
+
+def get_backend() -> str:
+    """Returns the name of the selected JSON backend."""
+    return _backend
+
+
+def set_backend(name: str) -> None:
+    """Selects the JSON backend used by loads() and dumps()."""
+    global _backend
+    if name not in _BACKENDS:
+        raise ValueError(
+            f"Unknown JSON backend {name!r}, "
+            f"available: {available_backends()}."
+            )
+    _backend = name
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decodes a JSON document."""
+    return _BACKENDS[_backend]['loads'](data)
+
+
+def dumps(data: Any, pretty: bool = False) -> bytes:
+    """Encodes data as UTF-8 JSON, compact unless pretty is set."""
+    return _BACKENDS[_backend]['dumps'](data, pretty)
@@ -0,0 +1,164 @@
+"""Shared connection-pooled HTTP session.
+
+All HTTP GET requests towards Sleeper go through one keep-alive session
+so that connections are reused instead of re-negotiating TCP and TLS for
+every call.
+
+Retries happen inside urllib3. Code sending requests can register a
+listener with on_retry() that is called before every retry attempt,
+e.g. to wait for a rate limiter slot.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
+from threading import Lock
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+RetryListener = Callable[[Optional[int]], None]
+
+_retry_listener: ContextVar[Optional[RetryListener]] = ContextVar(
+    'retry_listener', default=None
+    )
+
+
+@contextmanager
+def on_retry(listener: RetryListener) -> Iterator[None]:
+    """Calls listener with the status code of the failed attempt, None
+    for connection errors, before every retry sent in the block."""
+    token = _retry_listener.set(listener)
+    try:
+        yield
+    finally:
+        _retry_listener.reset(token)
+
+
+class ListenedRetry(Retry):
+    """Retry notifying the on_retry() listener of the current context."""
+    def increment(self, *args: Any, **kwargs: Any) -> "ListenedRetry":
+        retry = super().increment(*args, **kwargs)
+        listener = _retry_listener.get()
+        if listener is not None:
+            listener(retry.history[-1].status)
+        return retry
+
+
+@dataclass
+class SessionConfig:
+    """Configuration of the shared HTTP session.
+
+    pool_connections (int): Number of hosts to keep connection pools for.
+
+    pool_maxsize (int): Maximum number of connections kept per host.
+
+    connect_timeout (float): Seconds to wait for a connection.
+
+    read_timeout (float): Seconds to wait for response data.
+
+    retries (int): Number of retries on connection errors and
+    retryable status codes.
+
+    backoff_factor (float): Exponential backoff factor between retries.
+
+    status_forcelist (Tuple[int, ...]): Status codes that are retried.
+    """
+    pool_connections: int = 10
+    pool_maxsize: int = 10
+    connect_timeout: float = 3.05
+    read_timeout: float = 30.0
+    retries: int = 3
+    backoff_factor: float = 0.5
+    status_forcelist: Tuple[int, ...] = (429, 500, 502, 503, 504)
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        """Connect and read timeout as expected by requests."""
+        return self.connect_timeout, self.read_timeout
+
+
+class HTTPSession:
+    """Keep-alive HTTP session with pooling, timeouts and retries."""
+    def __init__(self, config: Optional[SessionConfig] = None) -> None:
+        self._config = config or SessionConfig()
+        self._lock = Lock()
+        self._session = self._build_session()
+
+    def _build_adapter(self) -> HTTPAdapter:
+        """Creates a pooled adapter retrying as configured."""
+        retry = ListenedRetry(
+            total=self._config.retries,
+            backoff_factor=self._config.backoff_factor,
+            status_forcelist=self._config.status_forcelist,
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        return HTTPAdapter(
+            pool_connections=self._config.pool_connections,
+            pool_maxsize=self._config.pool_maxsize,
+            max_retries=retry,
+        )
+
+    def _build_session(self) -> requests.Session:
+        """Creates a requests session mounted with a pooled adapter."""
+        adapter = self._build_adapter()
+        session = requests.Session()
+        session.headers.update({'Connection': 'keep-alive'})
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def ensure_pool_maxsize(self, pool_maxsize: int) -> None:
+        """Grows the connection pool of every host to pool_maxsize.
+
+        Pools never shrink, since the session is shared. Requests in
+        flight finish on the replaced adapter.
+        """
+        with self._lock:
+            if pool_maxsize <= self._config.pool_maxsize:
+                return
+            self._config = replace(self._config, pool_maxsize=pool_maxsize)
+            adapter = self._build_adapter()
+            self._session.mount('https://', adapter)
+            self._session.mount('http://', adapter)
+
+    @property
+    def config(self) -> SessionConfig:
+        """Configuration of the session."""
+        return self._config
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        """HTTP GET using the configured timeouts unless overridden."""
+        kwargs.setdefault('timeout', self._config.timeout)
+        return self._session.get(url, **kwargs)
+
+    def close(self) -> None:
+        """Closes all pooled connections."""
+        self._session.close()
+
+
+_shared_session: Optional[HTTPSession] = None
+_shared_session_lock = Lock()
+
+
+def get_session() -> HTTPSession:
+    """Returns the process-wide HTTP session."""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = HTTPSession()
+        return _shared_session
+
+
+def configure_session(config: SessionConfig) -> HTTPSession:
+    """Replaces the process-wide HTTP session with a new configuration."""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is not None:
+            _shared_session.close()
+        _shared_session = HTTPSession(config)
+        return _shared_session
@@ -1,6 +1,17 @@
 ''' Returns the highest scorers for given week and season'''
 import argparse
 from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from script.common.common import write_json_to_file
+from script.parser.api_parser import SleeperAPIParser
+from script.parser.cache import ResponseCache
+from script.players.players import PlayerRepository
+from script.players.search import display_name
+from script.scoring.top_scorers import (DEFAULT_DEPTH, DEFAULT_POSITIONS,
+                                        TopScorer, TopScorerQuery)
+from script.scoring.week_cache import ScoredWeekCache
 
 
 def get_current_season() -> str:
@@ -9,9 +20,62 @@ def get_current_season() -> str:
     return str(current_time.year)
 
 
+def load_weekly_stats(
+        api: SleeperAPIParser, season: str, week: int
+        ) -> Dict[str, Dict[str, Any]]:
+    ''' Returns the stats of a week, raising if the fetch failed or
+    returned no players. '''
+    stats = api.get_weekly_stats(season, str(week))
+    if not stats:
+        raise ValueError(f"No stats for week {week} of season {season}")
+    return stats
+
+
+def highest_scorers(
+        api: SleeperAPIParser, league_id: str, season: str, week: int,
+        positions: Sequence[str], depth: int,
+        repository: PlayerRepository, rookies: bool = False,
+        week_cache: Optional[ScoredWeekCache] = None
+        ) -> Dict[str, List[TopScorer]]:
+    ''' Returns the top depth players per position under the scoring
+    settings of a league. Finished weeks are scored once per scoring
+    settings and read from the week cache afterwards. '''
+    league = api.get_specific_league(league_id)
+    if not league:
+        raise ValueError(f"Unknown league {league_id}")
+    week_cache = week_cache if week_cache is not None \
+        else ScoredWeekCache()
+    scored = week_cache.league_week(
+        league['scoring_settings'], season, week,
+        lambda stats_season, stats_week: load_weekly_stats(
+            api, stats_season, stats_week),
+        api.is_finished_week(str(week), season)
+        )
+    query = TopScorerQuery.from_week(
+        scored, repository.index, positions, rookies
+        )
+    return query.top(depth=depth)
+
+
+def scorers_to_json(
+        scorers: Dict[str, List[TopScorer]], repository: PlayerRepository
+        ) -> Dict[str, List[Dict[str, Any]]]:
+    ''' Returns the top scorers with player names as JSON data. '''
+    return {
+        position: [
+            {'rank': scorer.rank, 'player_id': scorer.player_id,
+             'name': display_name(repository.get(scorer.player_id) or {}),
+             'points': round(scorer.points, 2)}
+            for scorer in ranked
+        ]
+        for position, ranked in scorers.items()
+    }
+
+
 def main(
-        input_season: str, input_week: int, 
-        position: str, depth: str, output: str
+        input_season: str, input_week: int,
+        position: str, depth: str, output: str,
+        league_id: Optional[str] = None, rookies: bool = False
         ):
     ''' Entry point for weekly highest scorer. '''
 
@@ -19,35 +83,59 @@ def main(
         season = get_current_season()
     else:
         season = input_season
-    print(season)
 
     if input_week is None:
         raise ValueError("Missing week input")
-    print(input_week)
+    week = int(input_week)
+
+    if league_id is None:
+        raise ValueError("Missing league input")
 
     if position is None:
-        selected_positions = ["QB", "RB", "WR", "TE", "K", "DEF"]
+        selected_positions = list(DEFAULT_POSITIONS)
     else:
-        selected_positions = [position]
-    print(selected_positions)
+        selected_positions = [
+            selected.strip().upper() for selected in position.split(',')
+            ]
 
     if depth is None:
-        selected_depth = 3
+        selected_depth = DEFAULT_DEPTH
     else:
-        selected_depth = depth
-    print(selected_depth)
+        selected_depth = int(depth)
+
+    api = SleeperAPIParser(cache=ResponseCache())
+    repository = PlayerRepository.instance()
+    scorers = scorers_to_json(highest_scorers(
+        api, league_id, season, week, selected_positions, selected_depth,
+        repository, rookies
+        ), repository)
 
-    print(output)
+    for selected, ranked in scorers.items():
+        print(selected)
+        for scorer in ranked:
+            name = scorer['name'] or scorer['player_id']
+            print(f"{scorer['rank']:>3}. {name:<30}{scorer['points']:>8.2f}")
 
-    # TODO: Get League Data
+    Path(output).mkdir(parents=True, exist_ok=True)
+    suffix = '_rookies' if rookies else ''
+    write_json_to_file(
+        scorers,
+        str(Path(output) / f"highest_scorers_{season}_{week}{suffix}.json"),
+        pretty=True
+        )
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--season', help='Enter which season')
     parser.add_argument('--week', help='Enter which week')
-    parser.add_argument('--position', help='Enter which positions')
+    parser.add_argument('--position',
+                        help='Enter which positions, comma separated')
     parser.add_argument('--depth', help='Enter number of players')
     parser.add_argument('--output', default='build', help='Output path')
+    parser.add_argument('--league', help='League whose scoring is used')
+    parser.add_argument('--rookies', action='store_true',
+                        help='Only rank rookies')
     args = parser.parse_args()
-    main(args.season, args.week, args.position, args.depth, args.output)
+    main(args.season, args.week, args.position, args.depth, args.output,
+         args.league, args.rookies)
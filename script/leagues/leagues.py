@@ -1,14 +1,15 @@
 """Handling of all data related to leagues."""
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Dict, List, Type, TypeVar
+from typing import Any, Dict, List, Optional, Type, TypeVar
 
-from script.leagues.rosters import LeagueRoster
+from script.leagues.rosters import (LeagueRoster, ResolvedRoster,
+                                    resolve_rosters)
 from script.parser.api_parser import SleeperAPIParser
 from script.players.player_types import (Bench, Flex, Kicker, Quarterback,
                                          RunnningBack, SuperFlex, TightEnd,
                                          WideReceiver)
-from script.players.players import Player
+from script.players.players import Player, PlayerRepository
 
 TRUE = 1
 FALSE = 0
@@ -61,29 +62,29 @@ class LeagueType(Enum):
 class ReceivingScoring():
     """Handling of receiving score data."""
     def __init__(self, score_settings: Dict[str, float]) -> None:
-        self.rec: float = score_settings.get('playoff_week_start')
-        self.rec_yd: float = score_settings.get('playoff_week_start')
-        self.rec_td: float = score_settings.get('playoff_week_start')
-        self.bonus_rec_te: float = score_settings.get('playoff_week_start')
-        self.rec_2pt: float = score_settings.get('playoff_week_start')
+        self.rec: float = score_settings.get('rec')
+        self.rec_yd: float = score_settings.get('rec_yd')
+        self.rec_td: float = score_settings.get('rec_td')
+        self.bonus_rec_te: float = score_settings.get('bonus_rec_te')
+        self.rec_2pt: float = score_settings.get('rec_2pt')
 
 
 @dataclass
 class PassingScoring():
     """Handling of passing score data."""
     def __init__(self, score_settings) -> None:
-        self.pass_yd = score_settings.get('playoff_week_start')
-        self.pass_td = score_settings.get('playoff_week_start')
-        self.pass_2pt = score_settings.get('playoff_week_start')
+        self.pass_yd = score_settings.get('pass_yd')
+        self.pass_td = score_settings.get('pass_td')
+        self.pass_2pt = score_settings.get('pass_2pt')
 
 
 @dataclass
 class RushingScoring():
     """Handling of rushing score data."""
     def __init__(self, score_settings) -> None:
-        self.rush_yd: float = score_settings.get('playoff_week_start')
-        self.rush_td: float = score_settings.get('playoff_week_start')
-        self.rush_2pt: float = score_settings.get('playoff_week_start')
+        self.rush_yd: float = score_settings.get('rush_yd')
+        self.rush_td: float = score_settings.get('rush_td')
+        self.rush_2pt: float = score_settings.get('rush_2pt')
 
 
 @dataclass
@@ -96,7 +97,7 @@ class Defense():
         self.pts_allow_1_6: float = score_settings.get('pts_allow_1_6')
         self.pts_allow_7_13: float = score_settings.get('pts_allow_7_13')
         self.pts_allow_14_20: float = score_settings.get('pts_allow_14_20')
-        self.pts_allow_21_17: float = score_settings.get('pts_allow_21_17')
+        self.pts_allow_21_27: float = score_settings.get('pts_allow_21_27')
         self.pts_allow_28_34: float = score_settings.get('pts_allow_28_34')
         self.pts_allow_35p: float = score_settings.get('pts_allow_35p')
         # TODO: Clean up
@@ -148,6 +149,7 @@ class LeagueType(Enum):
 class ScoringSettings():
     """Entry point for league scoring settings."""
     def __init__(self, score_settings: Dict[str, float]) -> None:
+        self._settings: Dict[str, float] = dict(score_settings or {})
         self._rec_settings = ReceivingScoring(score_settings)
         self._rush_settings = RushingScoring(score_settings)
         self._pass_settings = PassingScoring(score_settings)
@@ -156,6 +158,11 @@ class ScoringSettings():
         self._kicking_settings = Kicking(score_settings)
         self._custom_settings = CustomSettings(score_settings)
 
+    @property
+    def settings(self) -> Dict[str, float]:
+        """Returns the raw scoring_settings, stat key to points."""
+        return self._settings
+
     @property
     def receiving_settings(self):
         """Returns receiving score settings."""
@@ -527,19 +534,28 @@ class League:
 
 class LeagueParse:
     """This endpoint retrieves a specific league."""
-    def __init__(self, league_id: str) -> None:
+    def __init__(
+            self, league_id: str,
+            parser: Optional[SleeperAPIParser] = None
+            ) -> None:
         self.league_id = league_id
-        self.parser = SleeperAPIParser()
+        self.parser = parser or SleeperAPIParser()
 
     def get_league(self) -> League:
         """Returns the League data for given league."""
-        data = self.parser.get_league(self.league_id)
+        data = self.parser.get_specific_league(self.league_id)
         return League(data)
 
     def get_rosters(self) -> List[LeagueRoster]:
         """Returns all rosters from a league."""
         rosters = []
-        league_rosters = self.parser.get_league_rosters(self.league_id)
+        league_rosters = self.parser.get_rosters_in_a_league(self.league_id)
         for roster in league_rosters:
             rosters.append(LeagueRoster(roster))
         return rosters
+
+    def get_resolved_rosters(
+            self, repository: Optional[PlayerRepository] = None
+            ) -> List[ResolvedRoster]:
+        """Returns the players of all rosters resolved in one pass."""
+        return resolve_rosters(self.get_rosters(), repository)
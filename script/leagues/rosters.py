@@ -1,7 +1,7 @@
-from typing import List, Dict, Any
+from dataclasses import dataclass
+from typing import Iterable, List, Dict, Any, Mapping, Optional
 
-from script.common.common import read_json_from_file
-from script.players.players import Player
+from script.players.players import Player, PlayerRepository
 from decimal import Decimal
 
 
@@ -121,10 +121,15 @@ class RosterSettings:
 
 class RosterPlayers:
     """Handling of roster player data."""
-    def __init__(self, players: Dict[str, Any], starters: Dict[str, Any], taxi: Dict[str, Any]) -> None:
-        self._players = players
-        self.starters = starters
-        self.taxi = taxi
+    def __init__(
+            self, players: List[str], starters: List[str],
+            taxi: Optional[List[str]],
+            reserve: Optional[List[str]] = None
+            ) -> None:
+        self._players = players or []
+        self.starters = starters or []
+        self.taxi = taxi or []
+        self.reserve = reserve or []
 
     @property
     def players(self):
@@ -133,35 +138,49 @@ class RosterPlayers:
             in the player database. '''
         return self._players
 
+    def player_ids(self) -> List[str]:
+        ''' Returns the unique ids of players, starters, taxi and reserve. '''
+        return list(dict.fromkeys(
+            self.players + self.starters + self.taxi + self.reserve
+            ))
+
+    @staticmethod
+    def _get_players(
+            player_ids: List[str], database_file: str
+            ) -> List[Player]:
+        repository = PlayerRepository.instance(database_file)
+        return [Player(player, repository)
+                for player in player_ids if player in repository]
+
     def get_roster_players(self, database_file: str) -> List[Player]:
         ''' Returns all players in a single roster in the league. '''
-        roster_players = []
-        database = read_json_from_file(database_file)
-        for player in self.players:
-            if player in database:
-                player_data = database[player]
-                roster_players.append(Player(player_data))
-        return roster_players
+        return self._get_players(self.players, database_file)
 
     def get_starter_players(self, database_file: str) -> List[Player]:
         ''' Returns all current starters of a roster. '''
-        starters = []
-        database = read_json_from_file(database_file)
-        for player in self.starters:
-            if player in database:
-                player_data = database[player]
-                starters.append(Player(player_data))
-        return starters
+        return self._get_players(self.starters, database_file)
 
     def get_taxi_players(self, database_file: str) -> List[Player]:
-        ''' Returns all current starters of a roster. '''
-        taxi_players = []
-        database = read_json_from_file(database_file)
-        for player in self.starters:
-            if player in database:
-                player_data = database[player]
-                taxi_players.append(Player(player_data))
-        return taxi_players
+        ''' Returns all current taxi squad players of a roster. '''
+        return self._get_players(self.taxi, database_file)
+
+    def get_reserve_players(self, database_file: str) -> List[Player]:
+        ''' Returns all current reserve players of a roster. '''
+        return self._get_players(self.reserve, database_file)
+
+
+@dataclass
+class ResolvedRoster:
+    """Players of a roster resolved against the player database.
+
+    Player IDs missing from the database, like empty "0" starter
+    slots, are left out.
+    """
+    roster_id: int
+    players: List[Player]
+    starters: List[Player]
+    taxi: List[Player]
+    reserve: List[Player]
 
 
 class LeagueRoster:
@@ -173,7 +192,10 @@ class LeagueRoster:
         self._metadata = RosterMetadata(roster_data.get('metadata'))
         self.league_id: str = roster_data.get('league_id')
         self.co_owners = roster_data.get('co_owners')
-        self._roster_players = RosterPlayers(roster_data.get('players'), roster_data.get('starters'), roster_data.get("taxi"))
+        self._roster_players = RosterPlayers(
+            roster_data.get('players'), roster_data.get('starters'),
+            roster_data.get('taxi'), roster_data.get('reserve')
+            )
 
     @property
     def roster_id(self) -> int:
@@ -194,3 +216,40 @@ class LeagueRoster:
     def roster_players(self) -> RosterPlayers:
         """Returns players of a roster."""
         return self._roster_players
+
+    def resolve(self, players: Mapping[str, Player]) -> ResolvedRoster:
+        """Resolves the roster from already built players by ID."""
+        roster_players = self._roster_players
+
+        def lookup(player_ids: List[str]) -> List[Player]:
+            return [players[player_id] for player_id in player_ids
+                    if player_id in players]
+
+        return ResolvedRoster(
+            self._roster_id,
+            lookup(roster_players.players),
+            lookup(roster_players.starters),
+            lookup(roster_players.taxi),
+            lookup(roster_players.reserve),
+        )
+
+
+def resolve_rosters(
+        rosters: Iterable[LeagueRoster],
+        repository: Optional[PlayerRepository] = None
+        ) -> List[ResolvedRoster]:
+    """Resolves players, starters, taxi and reserve of all rosters.
+
+    Uses one loaded repository and builds a single Player per unique
+    player ID, so players shared between rosters or categories, e.g.
+    team defenses like "DET", are looked up once.
+    """
+    rosters = list(rosters)
+    if repository is None:
+        repository = PlayerRepository.instance()
+    players: Dict[str, Player] = {}
+    for roster in rosters:
+        for player_id in roster.roster_players.player_ids():
+            if player_id not in players and player_id in repository:
+                players[player_id] = Player(player_id, repository)
+    return [roster.resolve(players) for roster in rosters]
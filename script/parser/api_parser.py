@@ -2,10 +2,21 @@
 
 https://docs.sleeper.com/#introduction
 """
-from typing import Dict, Optional, Tuple, Any
-from requests import get
+import time
+from typing import Dict, Iterator, Optional, Sequence, Tuple, Any
 from datetime import datetime
 
+import requests
+
+from script.common import json_backend
+from script.common.session import HTTPSession, get_session, on_retry
+from script.parser.cache import (FINISHED_MATCHUPS, FINISHED_STATS,
+                                 ResponseCache, cache_policy)
+from script.parser.metrics import ParserMetrics, get_metrics
+from script.parser.rate_limit import RateLimiter, get_rate_limiter
+from script.parser.single_flight import SingleFlight, get_single_flight
+from script.parser.streaming import iter_object_items
+
 
 class SleeperAPIParser:
     """Parses data from Sleeper API with HTTP GET using requests library.
@@ -19,18 +30,145 @@ class SleeperAPIParser:
     league_id(str): The ID of the league to retrieve matchups from
     
     week(str): The week these matchups take place
+
+    session(HTTPSession): Pooled HTTP session, defaults to the shared
+    process-wide session.
+
+    cache(ResponseCache): Optional on-disk response cache. Freshness is
+    decided per endpoint, see script.parser.cache.ENDPOINT_POLICIES.
+
+    rate_limiter(RateLimiter): Request rate limiter, defaults to the
+    shared process-wide limiter.
+
+    single_flight(SingleFlight): Coalesces concurrent requests for the
+    same URL, defaults to the shared process-wide group.
+
+    metrics(ParserMetrics): Per-endpoint instrumentation, defaults to the
+    shared process-wide metrics.
     
     """
-    def __init__(self) -> None:
+    def __init__(
+            self, session: Optional[HTTPSession] = None,
+            cache: Optional[ResponseCache] = None,
+            rate_limiter: Optional[RateLimiter] = None,
+            single_flight: Optional[SingleFlight] = None,
+            metrics: Optional[ParserMetrics] = None
+            ) -> None:
         self.base_url = 'https://api.sleeper.app/v1/'
         self.sport = 'nfl'
         self.season = datetime.now().strftime("%Y")
-
-    @staticmethod
-    def _http_get_response_data_json(url: str) -> Dict[str, Any]:
-        """Returns HTTP GET in JSON format."""
-        response = get(url, timeout=None)
-        return response.json() if response.status_code == 200 else None
+        self.session = session if session is not None else get_session()
+        self.cache = cache
+        self.rate_limiter = rate_limiter if rate_limiter is not None \
+            else get_rate_limiter()
+        self.single_flight = single_flight if single_flight is not None \
+            else get_single_flight()
+        self.metrics = metrics if metrics is not None else get_metrics()
+
+    def _get(
+            self, url: str, headers: Optional[Dict[str, str]] = None,
+            stream: bool = False, endpoint: Optional[str] = None
+            ):
+        """HTTP GET through the rate limiter, reporting the outcome to it
+        and to the endpoint metrics. Every retry of the session waits for
+        its own rate limiter slot."""
+        self.rate_limiter.acquire()
+        start = time.perf_counter()
+        with on_retry(self._before_retry):
+            response = self.session.get(
+                url, headers=headers or {}, stream=stream
+                )
+        latency = time.perf_counter() - start
+        self.rate_limiter.record(response.status_code, latency)
+        if stream:
+            try:
+                response_bytes = int(response.headers.get('Content-Length'))
+            except (TypeError, ValueError):
+                response_bytes = 0
+        else:
+            response_bytes = len(response.content)
+        self.metrics.record_request(
+            endpoint, response.status_code, latency, response_bytes
+            )
+        return response
+
+    def _before_retry(self, status_code: Optional[int]) -> None:
+        """Reports a throttled attempt and waits for a slot of the retry."""
+        if status_code == 429:
+            self.rate_limiter.record(429, 0.0)
+        self.rate_limiter.acquire()
+
+    def _decode(self, body: bytes, endpoint: Optional[str]) -> Any:
+        """Decodes a JSON body, recording the decode time."""
+        start = time.perf_counter()
+        data = json_backend.loads(body)
+        self.metrics.record_decode(endpoint, time.perf_counter() - start)
+        return data
+
+    def _http_get_response_data_json(
+            self, url: str, endpoint: Optional[str] = None
+            ) -> Dict[str, Any]:
+        """Returns HTTP GET in JSON format.
+
+        Concurrent calls for the same URL share a single request.
+        """
+        return self.single_flight.do(
+            url, lambda: self._fetch_json(url, endpoint)
+            )
+
+    def _fetch_json(
+            self, url: str, endpoint: Optional[str] = None
+            ) -> Dict[str, Any]:
+        """Returns HTTP GET in JSON format.
+
+        Fresh responses are served from the cache if one is configured.
+        Stale responses of endpoints with a revalidating policy are
+        checked with a conditional GET and reused on 304 Not Modified.
+        """
+        policy = cache_policy(endpoint)
+        use_cache = self.cache is not None and policy.cacheable
+        headers = {}
+        if use_cache:
+            body = self.cache.get(url, policy)
+            self.metrics.record_cache(endpoint, body is not None)
+            if body is not None:
+                return self._decode(body, endpoint)
+            if policy.revalidate:
+                headers = self.cache.validators(url)
+        response = self._get(url, headers, endpoint=endpoint)
+        if response.status_code == 304 and use_cache:
+            body = self.cache.revalidate(url)
+            if body is not None:
+                return self._decode(body, endpoint)
+            response = self._get(url, endpoint=endpoint)
+        if response.status_code != 200:
+            return None
+        if use_cache:
+            self.cache.put(url, response.content, response.headers)
+        return self._decode(response.content, endpoint)
+
+    def is_finished_week(
+            self, week: str, season: Optional[str] = None
+            ) -> bool:
+        """Returns true if given week is completed.
+
+        Without season, the week is one of the current season.
+        """
+        state = self.get_nfl_state()
+        if not state:
+            return False
+        try:
+            if season is not None and \
+                    int(season) != int(state.get('season') or 0):
+                return int(season) < int(state.get('season') or 0)
+        except (TypeError, ValueError):
+            return False
+        if state.get('season_type') in ('post', 'off'):
+            return True
+        try:
+            return int(week) < int(state.get('week') or 0)
+        except (TypeError, ValueError):
+            return False
 
     def get_user(self, user_id: str, user_name: Optional[str] = None):
         """Via the user resource, you can GET the user object by either providing
@@ -53,17 +191,25 @@ class SleeperAPIParser:
         elif user_name is not None:
             user = user_name
 
-        return self._http_get_response_data_json(f"{self.base_url}/user/{user}")
+        return self._http_get_response_data_json(f"{self.base_url}/user/{user}", 'get_user')
 
     def get_avatars(self, avatar_id: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         """Users and leagues have avatar images. There are thumbnail and full-size images for each avatar.
 
         GET https://sleepercdn.com/avatars/<avatar_id>
         """
+        return self.get_avatar(avatar_id), self.get_avatar(avatar_id, True)
+
+    def get_avatar(self, avatar_id: str, thumbnail: bool = False):
+        """Retrieves the full-size or the thumbnail image of an avatar, see
+        get_avatars.
+
+        GET https://sleepercdn.com/avatars/thumbs/<avatar_id>
+        """
         sleeper_url = 'https://sleepercdn.com/avatars'
-        full_size = self._http_get_response_data_json(f"{sleeper_url}/{avatar_id}")
-        thumbnail = self._http_get_response_data_json(f"{sleeper_url}/thumbs/{avatar_id}")
-        return full_size, thumbnail
+        if thumbnail:
+            sleeper_url += '/thumbs'
+        return self._http_get_response_data_json(f"{sleeper_url}/{avatar_id}", 'get_avatars')
 
     def get_all_leagues_for_user(self, user_id: str, season: Optional[str] = None):
         """This endpoint retrieves all leagues.
@@ -106,7 +252,8 @@ class SleeperAPIParser:
         if season is None:
             season = self.season
         return self._http_get_response_data_json(
-            f"{self.base_url}/user/{user_id}/leagues/{self.sport}/{season}"
+            f"{self.base_url}/user/{user_id}/leagues/{self.sport}/{season}",
+            'get_all_leagues_for_user'
         )
 
     def get_specific_league(self, league_id: str):
@@ -130,7 +277,7 @@ class SleeperAPIParser:
         "avatar": "efaefa889ae24046a53265a3c71b8b64"
         }
         """
-        return self._http_get_response_data_json(f"{self.base_url}/league/{league_id}")
+        return self._http_get_response_data_json(f"{self.base_url}/league/{league_id}", 'get_specific_league')
 
     def get_rosters_in_a_league(self, league_id: str):
         """This endpoint retrieves all rosters in a league.
@@ -161,7 +308,8 @@ class SleeperAPIParser:
         ]         
         """
         return self._http_get_response_data_json(
-            f"{self.base_url}/league/{league_id}/rosters"
+            f"{self.base_url}/league/{league_id}/rosters",
+            'get_rosters_in_a_league'
         )
 
     def get_users_in_a_league(self, league_id: str):
@@ -187,10 +335,13 @@ class SleeperAPIParser:
         
         """
         return self._http_get_response_data_json(
-            f"{self.base_url}/league/{league_id}/rosters"
+            f"{self.base_url}/league/{league_id}/rosters",
+            'get_users_in_a_league'
         )
 
-    def get_matchups_in_league(self, league_id: str, week: str):
+    def get_matchups_in_league(
+            self, league_id: str, week: str, season: Optional[str] = None
+            ):
         """This endpoint retrieves all matchups in a league for a given week. Each object in 
         the list represents one team. The two teams with the same 
         matchup_id match up against each other.
@@ -212,9 +363,18 @@ class SleeperAPIParser:
                 "custom_points": null // if commissioner overrides points manually
             }
         ]
+
+        Finished weeks are cached for good. Whether a week is finished
+        is judged within the league's season; callers holding the league
+        pass its season, without it the week is one of the current
+        season.
         """
+        endpoint = 'get_matchups_in_league'
+        if self.cache is not None and self.is_finished_week(week, season):
+            endpoint = FINISHED_MATCHUPS
         return self._http_get_response_data_json(
-            f"{self.base_url}/league/{league_id}/matchups/{week}"
+            f"{self.base_url}/league/{league_id}/matchups/{week}",
+            endpoint
         )
 
     def get_playoff_bracket(self, league_id: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
@@ -250,9 +410,14 @@ class SleeperAPIParser:
         t2_from	object	Where t2 comes from, either winner or loser of the match id, necessary to show bracket progression.
         """
 
-        winners_bracket = self._http_get_response_data_json(f'{self.base_url}/league/{league_id}/winners_bracket')
-        losers_bracket = self._http_get_response_data_json(f'{self.base_url}/league/{league_id}/losers_bracket')
-        return winners_bracket, losers_bracket
+        return (self.get_bracket(league_id, 'winners'),
+                self.get_bracket(league_id, 'losers'))
+
+    def get_bracket(self, league_id: str, bracket: str):
+        """Retrieves the 'winners' or the 'losers' playoff bracket of a
+        league, see get_playoff_bracket.
+        """
+        return self._http_get_response_data_json(f'{self.base_url}/league/{league_id}/{bracket}_bracket', 'get_playoff_bracket')
 
     def get_transactions(self, league_id: str, round: str):
         """This endpoint retrieves all traded picks in a league, including future picks.
@@ -327,7 +492,8 @@ class SleeperAPIParser:
         ]
         """
         return self._http_get_response_data_json(
-            f"{self.base_url}/league/{league_id}/transactions/{round}"
+            f"{self.base_url}/league/{league_id}/transactions/{round}",
+            'get_transactions'
         )
 
     def get_nfl_state(self):
@@ -348,7 +514,27 @@ class SleeperAPIParser:
         }
         """
         return self._http_get_response_data_json(
-            f"{self.base_url}/state/{self.sport}"
+            f"{self.base_url}/state/{self.sport}",
+            'get_nfl_state'
+        )
+
+    def get_weekly_stats(self, season: str, week: str):
+        """This endpoint retrieves the stats of all players for a week of
+        the regular season.
+
+        GET https://api.sleeper.app/v1/stats/<sport>/regular/<season>/<week>
+
+        {
+            "4046": {"pass_yd": 284.0, "pass_td": 3.0, "rush_yd": 12.0, ...},
+            "DET": {"pts_allow": 17.0, "sack": 3.0, ...}
+        }
+        """
+        endpoint = 'get_weekly_stats'
+        if self.cache is not None and self.is_finished_week(week, season):
+            endpoint = FINISHED_STATS
+        return self._http_get_response_data_json(
+            f"{self.base_url}/stats/{self.sport}/regular/{season}/{week}",
+            endpoint
         )
 
     def get_all_drafts_for_user(self, user_id: str, season: Optional[str] = None):
@@ -401,7 +587,8 @@ class SleeperAPIParser:
         if season is None:
             season = self.season
         return self._http_get_response_data_json(
-            f"{self.base_url}/user/{user_id}/{self.sport}/{season}"
+            f"{self.base_url}/user/{user_id}/{self.sport}/{season}",
+            'get_all_drafts_for_user'
         )
 
     def get_all_drafts_for_a_league(self, league_id: str):
@@ -457,7 +644,8 @@ class SleeperAPIParser:
         ]
         """
         return self._http_get_response_data_json(
-            f"{self.base_url}/league/{league_id}/drafts"
+            f"{self.base_url}/league/{league_id}/drafts",
+            'get_all_drafts_for_a_league'
         )
 
     def get_specific_draft(self, draft_id: str):
@@ -469,7 +657,7 @@ class SleeperAPIParser:
         Returns:
             _type_: _description_
         """
-        return self._http_get_response_data_json(f"{self.base_url}/draft/{draft_id}")
+        return self._http_get_response_data_json(f"{self.base_url}/draft/{draft_id}", 'get_specific_draft')
 
     def get_all_picks_in_draft(self, draft_id: str):
         """This endpoint retrieves all picks in a draft.
@@ -481,7 +669,8 @@ class SleeperAPIParser:
             _type_: _description_
         """
         return self._http_get_response_data_json(
-            f"{self.base_url}/draft/{draft_id}/picks"
+            f"{self.base_url}/draft/{draft_id}/picks",
+            'get_all_picks_in_draft'
         )
 
     def get_traded_picks_in_draft(self, draft_id: str):
@@ -494,7 +683,8 @@ class SleeperAPIParser:
             _type_: _description_
         """
         return self._http_get_response_data_json(
-            f"{self.base_url}/draft/{draft_id}/traded_picks"
+            f"{self.base_url}/draft/{draft_id}/traded_picks",
+            'get_traded_picks_in_draft'
         )
 
     def fetch_all_players(self):
@@ -511,7 +701,7 @@ class SleeperAPIParser:
         Returns:
             _type_: _description_
         """
-        return self._http_get_response_data_json(f"{self.base_url}/players/nfl")
+        return self._http_get_response_data_json(f"{self.base_url}/players/nfl", 'fetch_all_players')
 
     def get_trending_players(self, type, lookback_hours: Optional[str] = "24", limit: Optional[str] = "25"):
         """You can use this endpoint to get a list of trending players based on adds or drops in the past 24 hours.
@@ -530,4 +720,40 @@ class SleeperAPIParser:
                 }
             ]
         """
-        return self._http_get_response_data_json(f"{self.base_url}/players/{self.sport}/trending/{type}?lookback_hours=<{lookback_hours}>&limit=<{limit}>")
+        return self._http_get_response_data_json(f"{self.base_url}/players/{self.sport}/trending/{type}?lookback_hours=<{lookback_hours}>&limit=<{limit}>", 'get_trending_players')
+
+    def stream_all_players(
+            self, fields: Optional[Sequence[str]] = None,
+            chunk_size: int = 64 * 1024
+            ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Streams the /players/nfl payload as (player_id, record) pairs.
+
+        Unlike fetch_all_players the response is parsed incrementally, so
+        records are usable before the download finishes and only one
+        record is held in memory at a time. Streamed responses bypass
+        the response cache.
+
+        GET https://api.sleeper.app/v1/players/nfl
+
+        Args:
+            fields (Optional[Sequence[str]]): Only keep these fields of
+            each player record. Defaults to None which keeps all fields.
+            chunk_size (int): Number of bytes read per chunk.
+
+        Raises:
+            requests.HTTPError: The download failed, so a failed fetch
+            is never mistaken for an empty player list.
+        """
+        url = f"{self.base_url}/players/nfl"
+        response = self._get(url, stream=True, endpoint='stream_all_players')
+        try:
+            if response.status_code != 200:
+                raise requests.HTTPError(
+                    f"GET {url} failed with status {response.status_code}",
+                    response=response
+                    )
+            yield from iter_object_items(
+                response.iter_content(chunk_size=chunk_size), fields
+                )
+        finally:
+            response.close()
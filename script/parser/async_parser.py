@@ -0,0 +1,241 @@
+"""Asyncio counterpart of the Sleeper API parser.
+
+https://docs.sleeper.com/#introduction
+"""
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import (Any, Callable, Dict, Iterable, List, Mapping, Optional,
+                    Tuple, TypeVar)
+
+from script.common.session import HTTPSession
+from script.parser.api_parser import SleeperAPIParser
+from script.parser.rate_limit import RateLimiter, get_rate_limiter, prepaid
+from script.parser.single_flight import SingleFlight, get_single_flight
+
+T = TypeVar('T')
+
+
+class AsyncSleeperAPIParser:
+    """Parses data from Sleeper API concurrently using asyncio.
+
+    Every endpoint method mirrors SleeperAPIParser and runs the blocking
+    HTTP GET in a worker thread on the shared pooled session.
+    Calls run on a pool of max_in_flight threads of their own, and the
+    connection pool of the session is grown to max_in_flight, so every
+    request in flight keeps its connection.
+    The number of requests in flight is capped by max_in_flight and
+    tasks asking for the same resource concurrently share one request.
+    Rate limiting is awaited on the event loop before a call is handed
+    to a worker thread, so waiting calls do not occupy the thread pool.
+    Every call sends at most one request: endpoints needing several
+    requests run one call per request, and calls answered by the
+    response cache give their rate limiter slot back.
+
+    parser (SleeperAPIParser): Synchronous parser doing the requests.
+
+    max_in_flight (int): Maximum number of concurrent requests.
+
+    single_flight (SingleFlight): Coalesces duplicate concurrent calls,
+    defaults to the shared process-wide group.
+    """
+    def __init__(
+            self, parser: Optional[SleeperAPIParser] = None,
+            max_in_flight: int = 10,
+            single_flight: Optional[SingleFlight] = None
+            ) -> None:
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1.")
+        self.parser = parser if parser is not None else SleeperAPIParser()
+        self.max_in_flight = max_in_flight
+        self.rate_limiter: RateLimiter = getattr(
+            self.parser, 'rate_limiter', None) or get_rate_limiter()
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_in_flight, thread_name_prefix='sleeper-api'
+            )
+        session = getattr(self.parser, 'session', None)
+        if isinstance(session, HTTPSession):
+            session.ensure_pool_maxsize(max_in_flight)
+        self.single_flight = single_flight if single_flight is not None \
+            else get_single_flight()
+
+    async def _call(self, method: Callable[..., T], *args: Any) -> T:
+        """Runs a parser method in a worker thread, bounded by the cap."""
+        async def _run() -> T:
+            async with self._semaphore:
+                await self.rate_limiter.acquire_async()
+                with prepaid(self.rate_limiter):
+                    context = contextvars.copy_context()
+                    return await asyncio.get_running_loop().run_in_executor(
+                        self._executor,
+                        functools.partial(context.run, method, *args)
+                        )
+        key = (id(self.parser), method.__name__, args)
+        return await self.single_flight.do_async(key, _run)
+
+    def close(self) -> None:
+        """Shuts the worker threads down once their calls finished."""
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self) -> "AsyncSleeperAPIParser":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    async def get_user(self, user_id: str, user_name: Optional[str] = None):
+        """See SleeperAPIParser.get_user."""
+        return await self._call(self.parser.get_user, user_id, user_name)
+
+    async def get_avatars(
+            self, avatar_id: str
+            ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """See SleeperAPIParser.get_avatars."""
+        full_size, thumbnail = await asyncio.gather(
+            self._call(self.parser.get_avatar, avatar_id, False),
+            self._call(self.parser.get_avatar, avatar_id, True)
+            )
+        return full_size, thumbnail
+
+    async def get_all_leagues_for_user(
+            self, user_id: str, season: Optional[str] = None
+            ):
+        """See SleeperAPIParser.get_all_leagues_for_user."""
+        return await self._call(
+            self.parser.get_all_leagues_for_user, user_id, season
+            )
+
+    async def get_specific_league(self, league_id: str):
+        """See SleeperAPIParser.get_specific_league."""
+        return await self._call(self.parser.get_specific_league, league_id)
+
+    async def get_rosters_in_a_league(self, league_id: str):
+        """See SleeperAPIParser.get_rosters_in_a_league."""
+        return await self._call(
+            self.parser.get_rosters_in_a_league, league_id
+            )
+
+    async def get_users_in_a_league(self, league_id: str):
+        """See SleeperAPIParser.get_users_in_a_league."""
+        return await self._call(self.parser.get_users_in_a_league, league_id)
+
+    async def get_matchups_in_league(
+            self, league_id: str, week: str, season: Optional[str] = None
+            ):
+        """See SleeperAPIParser.get_matchups_in_league.
+
+        With a response cache, the NFL state deciding whether the week
+        is finished is fetched in a call of its own first.
+        """
+        if getattr(self.parser, 'cache', None) is not None:
+            await self.get_nfl_state()
+        if season is None:
+            return await self._call(
+                self.parser.get_matchups_in_league, league_id, week
+                )
+        return await self._call(
+            self.parser.get_matchups_in_league, league_id, week, season
+            )
+
+    async def get_playoff_bracket(
+            self, league_id: str
+            ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """See SleeperAPIParser.get_playoff_bracket."""
+        winners, losers = await asyncio.gather(
+            self._call(self.parser.get_bracket, league_id, 'winners'),
+            self._call(self.parser.get_bracket, league_id, 'losers')
+            )
+        return winners, losers
+
+    async def get_transactions(self, league_id: str, round: str):
+        """See SleeperAPIParser.get_transactions."""
+        return await self._call(
+            self.parser.get_transactions, league_id, round
+            )
+
+    async def get_nfl_state(self):
+        """See SleeperAPIParser.get_nfl_state."""
+        return await self._call(self.parser.get_nfl_state)
+
+    async def get_all_drafts_for_user(
+            self, user_id: str, season: Optional[str] = None
+            ):
+        """See SleeperAPIParser.get_all_drafts_for_user."""
+        return await self._call(
+            self.parser.get_all_drafts_for_user, user_id, season
+            )
+
+    async def get_all_drafts_for_a_league(self, league_id: str):
+        """See SleeperAPIParser.get_all_drafts_for_a_league."""
+        return await self._call(
+            self.parser.get_all_drafts_for_a_league, league_id
+            )
+
+    async def get_specific_draft(self, draft_id: str):
+        """See SleeperAPIParser.get_specific_draft."""
+        return await self._call(self.parser.get_specific_draft, draft_id)
+
+    async def get_all_picks_in_draft(self, draft_id: str):
+        """See SleeperAPIParser.get_all_picks_in_draft."""
+        return await self._call(self.parser.get_all_picks_in_draft, draft_id)
+
+    async def get_traded_picks_in_draft(self, draft_id: str):
+        """See SleeperAPIParser.get_traded_picks_in_draft."""
+        return await self._call(
+            self.parser.get_traded_picks_in_draft, draft_id
+            )
+
+    async def fetch_all_players(self):
+        """See SleeperAPIParser.fetch_all_players."""
+        return await self._call(self.parser.fetch_all_players)
+
+    async def get_trending_players(
+            self, type, lookback_hours: Optional[str] = "24",
+            limit: Optional[str] = "25"
+            ):
+        """See SleeperAPIParser.get_trending_players."""
+        return await self._call(
+            self.parser.get_trending_players, type, lookback_hours, limit
+            )
+
+    async def gather_matchups(
+            self, league_weeks: Iterable[Tuple[str, str]],
+            seasons: Optional[Mapping[str, str]] = None
+            ) -> Dict[Tuple[str, str], Any]:
+        """Retrieves matchups for many (league_id, week) pairs concurrently.
+
+        At most max_in_flight requests are running at the same time.
+
+        Args:
+            league_weeks (Iterable[Tuple[str, str]]): (league_id, week) pairs.
+            seasons (Optional[Mapping[str, str]]): Seasons by league ID,
+            deciding which weeks are finished. Leagues without one are
+            judged within the current season.
+
+        Returns:
+            Dict[Tuple[str, str], Any]: Matchups keyed by (league_id, week).
+        """
+        pairs: List[Tuple[str, str]] = list(dict.fromkeys(league_weeks))
+        seasons = seasons or {}
+        results = await asyncio.gather(*(
+            self.get_matchups_in_league(
+                league_id, week, seasons.get(league_id))
+            for league_id, week in pairs
+        ))
+        return dict(zip(pairs, results))
+
+
+def gather_matchups(
+        league_weeks: Iterable[Tuple[str, str]],
+        max_in_flight: int = 10,
+        parser: Optional[SleeperAPIParser] = None,
+        seasons: Optional[Mapping[str, str]] = None
+        ) -> Dict[Tuple[str, str], Any]:
+    """Blocking helper running AsyncSleeperAPIParser.gather_matchups."""
+    async def _run() -> Dict[Tuple[str, str], Any]:
+        async with AsyncSleeperAPIParser(parser, max_in_flight) \
+                as async_parser:
+            return await async_parser.gather_matchups(league_weeks, seasons)
+    return asyncio.run(_run())
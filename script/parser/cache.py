@@ -0,0 +1,347 @@
+"""Persistent on-disk cache of Sleeper API responses.
+
+Responses are stored as raw bodies keyed by URL. How long a stored
+response stays fresh is decided per endpoint by a CachePolicy.
+"""
+import atexit
+import hashlib
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Mapping, Optional
+
+from script.common import json_backend
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'sleeper_buddy'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Freshness policy of an endpoint.
+
+    ttl (Optional[float]): Seconds a response stays fresh.
+    None means it never expires, 0 disables caching.
+
+    revalidate (bool): Revalidate stale responses with a conditional GET
+    (If-None-Match / If-Modified-Since) instead of downloading them again.
+    """
+    ttl: Optional[float]
+    revalidate: bool = False
+
+    @property
+    def cacheable(self) -> bool:
+        """Returns true if responses may be stored."""
+        return self.ttl is None or self.ttl > 0
+
+    def is_fresh(self, stored_at: float, now: float) -> bool:
+        """Returns true if a response stored at given time is fresh."""
+        if self.ttl is None:
+            return True
+        return now - stored_at < self.ttl
+
+
+NO_CACHE = CachePolicy(ttl=0)
+FINISHED_MATCHUPS = 'get_matchups_in_league:finished'
+FINISHED_STATS = 'get_weekly_stats:finished'
+
+ENDPOINT_POLICIES: Dict[str, CachePolicy] = {
+    'get_user': CachePolicy(ttl=10 * MINUTE),
+    'get_avatars': CachePolicy(ttl=DAY),
+    'get_all_leagues_for_user': CachePolicy(ttl=10 * MINUTE),
+    'get_specific_league': CachePolicy(ttl=5 * MINUTE),
+    'get_rosters_in_a_league': CachePolicy(ttl=5 * MINUTE, revalidate=True),
+    'get_users_in_a_league': CachePolicy(ttl=10 * MINUTE),
+    'get_matchups_in_league': CachePolicy(ttl=MINUTE),
+    FINISHED_MATCHUPS: CachePolicy(ttl=None),
+    'get_playoff_bracket': CachePolicy(ttl=5 * MINUTE),
+    'get_transactions': CachePolicy(ttl=MINUTE),
+    'get_nfl_state': CachePolicy(ttl=30),
+    'get_all_drafts_for_user': CachePolicy(ttl=10 * MINUTE),
+    'get_all_drafts_for_a_league': CachePolicy(ttl=10 * MINUTE),
+    'get_specific_draft': CachePolicy(ttl=MINUTE),
+    'get_all_picks_in_draft': CachePolicy(ttl=MINUTE),
+    'get_traded_picks_in_draft': CachePolicy(ttl=MINUTE),
+    'fetch_all_players': CachePolicy(ttl=DAY, revalidate=True),
+    'get_trending_players': CachePolicy(ttl=10 * MINUTE),
+    'get_weekly_stats': CachePolicy(ttl=MINUTE),
+    FINISHED_STATS: CachePolicy(ttl=None),
+}
+
+
+def cache_policy(endpoint: Optional[str]) -> CachePolicy:
+    """Returns the cache policy of an endpoint, no caching if unknown."""
+    return ENDPOINT_POLICIES.get(endpoint, NO_CACHE)
+
+
+@dataclass
+class CacheEntry:
+    """Index entry of a stored response."""
+    url: str
+    file_name: str
+    size: int
+    stored_at: float
+    last_access: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class ResponseCache:
+    """On-disk response cache keyed by URL with LRU eviction.
+
+    directory (Path): Directory holding the bodies and the index.
+
+    max_bytes (int): Size cap of all stored bodies. The least recently
+    used responses are evicted once the cap is exceeded.
+
+    Entries are kept in least recently used order with a running byte
+    total. Stores and evictions are appended to a journal, access times
+    are only kept in memory. The index is rewritten from both once the
+    journal outgrows it, on flush() and on close().
+    """
+    INDEX_FILE = 'index.json'
+    JOURNAL_FILE = 'journal.jsonl'
+    MIN_COMPACT_LINES = 256
+
+    def __init__(
+            self, directory: Path = DEFAULT_CACHE_DIR,
+            max_bytes: int = DEFAULT_MAX_BYTES
+            ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidations = 0
+        self.bytes_saved = 0
+        self._lock = Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._journal_lines = 0
+        self._dirty = False
+        self._entries: "OrderedDict[str, CacheEntry]" = self._read_index()
+        self._total_bytes = sum(
+            entry.size for entry in self._entries.values()
+            )
+        atexit.register(_flush_on_exit, weakref.ref(self))
+
+    def _read_index(self) -> "OrderedDict[str, CacheEntry]":
+        """Reads the index and replays the journal of stored responses."""
+        raw_entries: Dict[str, Dict[str, object]] = {}
+        index_file = self.directory / self.INDEX_FILE
+        if index_file.exists():
+            try:
+                with open(index_file, "rb") as file:
+                    raw_entries = json_backend.loads(file.read())
+            except ValueError:
+                raw_entries = {}
+        journal_file = self.directory / self.JOURNAL_FILE
+        if journal_file.exists():
+            with open(journal_file, "rb") as file:
+                for line in file:
+                    try:
+                        record = json_backend.loads(line)
+                    except ValueError:
+                        continue
+                    self._journal_lines += 1
+                    if 'put' in record:
+                        raw_entries[record['put']['url']] = record['put']
+                    else:
+                        raw_entries.pop(record.get('del'), None)
+        entries = [CacheEntry(**raw_entry)
+                   for raw_entry in raw_entries.values()]
+        entries.sort(key=lambda entry: entry.last_access)
+        return OrderedDict(
+            (entry.url, entry) for entry in entries
+            if (self.directory / entry.file_name).exists()
+        )
+
+    def _append(self, record: Dict[str, object]) -> None:
+        """Appends a store or eviction to the journal."""
+        with open(self.directory / self.JOURNAL_FILE, "ab") as file:
+            file.write(json_backend.dumps(record) + b'\n')
+        self._journal_lines += 1
+        if self._journal_lines > max(self.MIN_COMPACT_LINES,
+                                     len(self._entries)):
+            self._write_index()
+
+    def _write_index(self) -> None:
+        """Writes the index atomically and empties the journal."""
+        index_file = self.directory / self.INDEX_FILE
+        tmp_file = index_file.with_suffix('.tmp')
+        with open(tmp_file, "wb") as file:
+            file.write(json_backend.dumps({
+                url: asdict(entry) for url, entry in self._entries.items()
+                }))
+        tmp_file.replace(index_file)
+        (self.directory / self.JOURNAL_FILE).unlink(missing_ok=True)
+        self._journal_lines = 0
+        self._dirty = False
+
+    def flush(self) -> None:
+        """Writes pending access times and journaled changes to the
+        index."""
+        with self._lock:
+            if self._dirty or self._journal_lines:
+                self._write_index()
+
+    def close(self) -> None:
+        """Flushes the index, the cache stays usable."""
+        self.flush()
+
+    def __enter__(self) -> "ResponseCache":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    @staticmethod
+    def _file_name(url: str) -> str:
+        """Returns the body file name of a URL."""
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    @property
+    def total_bytes(self) -> int:
+        """Size of all stored bodies."""
+        return self._total_bytes
+
+    def _touch(self, entry: CacheEntry, now: float) -> None:
+        """Marks an entry as most recently used."""
+        entry.last_access = now
+        self._entries.move_to_end(entry.url)
+        self._dirty = True
+
+    def get(self, url: str, policy: CachePolicy) -> Optional[bytes]:
+        """Returns the stored body if it is fresh according to policy."""
+        with self._lock:
+            entry = self._entries.get(url)
+            now = time.time()
+            if entry is None or not policy.is_fresh(entry.stored_at, now):
+                self.misses += 1
+                return None
+            body = self._read_body(entry)
+            if body is None:
+                self.misses += 1
+                return None
+            self._touch(entry, now)
+            self.hits += 1
+            return body
+
+    def _read_body(self, entry: CacheEntry) -> Optional[bytes]:
+        """Reads a stored body, dropping the entry if the file is gone."""
+        try:
+            return (self.directory / entry.file_name).read_bytes()
+        except FileNotFoundError:
+            self._drop(entry)
+            return None
+
+    def _drop(self, entry: CacheEntry) -> None:
+        """Forgets an entry and journals its removal."""
+        del self._entries[entry.url]
+        self._total_bytes -= entry.size
+        self._append({'del': entry.url})
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """Returns conditional request headers for a stored response."""
+        with self._lock:
+            entry = self._entries.get(url)
+            headers = {}
+            if entry is None:
+                return headers
+            if entry.etag is not None:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified is not None:
+                headers['If-Modified-Since'] = entry.last_modified
+            return headers
+
+    def revalidate(self, url: str) -> Optional[bytes]:
+        """Marks a stored response as fresh after a 304 Not Modified.
+
+        Returns the stored body and records the bytes not downloaded.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            body = self._read_body(entry)
+            if body is None:
+                return None
+            now = time.time()
+            entry.stored_at = now
+            self._touch(entry, now)
+            self.revalidations += 1
+            self.bytes_saved += entry.size
+            self._append({'put': asdict(entry)})
+            return body
+
+    def put(
+            self, url: str, body: bytes,
+            headers: Optional[Mapping[str, str]] = None
+            ) -> None:
+        """Stores a response body and evicts old entries above the cap."""
+        headers = headers or {}
+        with self._lock:
+            now = time.time()
+            file_name = self._file_name(url)
+            (self.directory / file_name).write_bytes(body)
+            previous = self._entries.pop(url, None)
+            if previous is not None:
+                self._total_bytes -= previous.size
+            entry = CacheEntry(
+                url=url, file_name=file_name, size=len(body),
+                stored_at=now, last_access=now,
+                etag=headers.get('ETag'),
+                last_modified=headers.get('Last-Modified'),
+            )
+            self._entries[url] = entry
+            self._total_bytes += entry.size
+            self._append({'put': asdict(entry)})
+            self._evict()
+
+    def _evict(self) -> None:
+        """Evicts least recently used entries until below the size cap."""
+        while self._total_bytes > self.max_bytes and self._entries:
+            entry = next(iter(self._entries.values()))
+            (self.directory / entry.file_name).unlink(missing_ok=True)
+            self._drop(entry)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Removes all stored responses."""
+        with self._lock:
+            for entry in self._entries.values():
+                (self.directory / entry.file_name).unlink(missing_ok=True)
+            self._entries.clear()
+            self._total_bytes = 0
+            self._write_index()
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit, miss and eviction counters."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'revalidations': self.revalidations,
+            'bytes_saved': self.bytes_saved,
+            'entries': len(self._entries),
+            'bytes': self.total_bytes,
+        }
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _flush_on_exit(reference: "weakref.ref[ResponseCache]") -> None:
+    """Flushes a cache still alive when the process exits."""
+    cache = reference()
+    if cache is not None:
+        cache.flush()
@@ -0,0 +1,202 @@
+"""Per-endpoint instrumentation of the Sleeper API parser.
+
+Records request counts, latency histograms, response sizes, decode
+times, status codes and cache hit ratios per SleeperAPIParser method.
+Use get_metrics() from Python or enable_exit_dump() to write a report
+when the process exits.
+"""
+import atexit
+import sys
+from bisect import bisect_left
+from collections import Counter, deque
+from threading import Lock
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from script.common import json_backend
+
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    float('inf'),
+)
+MAX_SAMPLES = 10000
+
+
+class LatencyHistogram:
+    """Latency histogram with percentiles over the most recent samples."""
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self._samples: Deque[float] = deque(maxlen=MAX_SAMPLES)
+
+    def add(self, seconds: float) -> None:
+        """Adds a latency sample."""
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self._samples.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Returns the latency below which percent of the samples fall."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[rank]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns percentiles and bucket counts."""
+        return {
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'buckets': {
+                str(bucket): count
+                for bucket, count in zip(self.buckets, self.counts)
+                },
+        }
+
+
+class EndpointStats:
+    """Counters of a single parser endpoint."""
+    def __init__(self) -> None:
+        self.requests = 0
+        self.status_codes: Counter = Counter()
+        self.response_bytes = 0
+        self.decode_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.latency = LatencyHistogram()
+
+    @property
+    def cache_hit_ratio(self) -> Optional[float]:
+        """Share of lookups served from the cache, None without lookups."""
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns all counters."""
+        return {
+            'requests': self.requests,
+            'status_codes': {
+                str(status): count
+                for status, count in sorted(self.status_codes.items())
+                },
+            'response_bytes': self.response_bytes,
+            'decode_seconds': self.decode_seconds,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cache_hit_ratio': self.cache_hit_ratio,
+            'latency': self.latency.to_dict(),
+        }
+
+
+class ParserMetrics:
+    """Thread-safe registry of EndpointStats keyed by endpoint name."""
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._endpoints: Dict[str, EndpointStats] = {}
+
+    def _stats(self, endpoint: Optional[str]) -> EndpointStats:
+        name = (endpoint or 'unknown').split(':')[0]
+        stats = self._endpoints.get(name)
+        if stats is None:
+            stats = self._endpoints[name] = EndpointStats()
+        return stats
+
+    def record_request(
+            self, endpoint: Optional[str], status_code: int,
+            latency: float, response_bytes: int
+            ) -> None:
+        """Records an HTTP request of an endpoint."""
+        with self._lock:
+            stats = self._stats(endpoint)
+            stats.requests += 1
+            stats.status_codes[status_code] += 1
+            stats.response_bytes += response_bytes
+            stats.latency.add(latency)
+
+    def record_decode(self, endpoint: Optional[str], seconds: float) -> None:
+        """Records time spent decoding a response."""
+        with self._lock:
+            self._stats(endpoint).decode_seconds += seconds
+
+    def record_cache(self, endpoint: Optional[str], hit: bool) -> None:
+        """Records a cache lookup of an endpoint."""
+        with self._lock:
+            stats = self._stats(endpoint)
+            if hit:
+                stats.cache_hits += 1
+            else:
+                stats.cache_misses += 1
+
+    def endpoint(self, endpoint: str) -> EndpointStats:
+        """Returns the stats of an endpoint."""
+        with self._lock:
+            return self._stats(endpoint)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Returns the counters of all endpoints."""
+        with self._lock:
+            return {
+                name: stats.to_dict()
+                for name, stats in sorted(self._endpoints.items())
+                }
+
+    def reset(self) -> None:
+        """Drops all recorded data."""
+        with self._lock:
+            self._endpoints.clear()
+
+    def dump(self, fmt: str = 'text') -> str:
+        """Returns a report in 'text' or 'json' format."""
+        snapshot = self.snapshot()
+        if fmt == 'json':
+            return json_backend.dumps(snapshot, pretty=True).decode('utf-8')
+        if fmt != 'text':
+            raise ValueError(f"Unknown metrics format {fmt!r}.")
+        lines = [
+            f"{'endpoint':<28} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'p99 ms':>8} {'KiB':>9} {'decode ms':>10} {'hit ratio':>9} "
+            "status codes"
+        ]
+        for name, stats in snapshot.items():
+            latency = stats['latency']
+            hit_ratio = stats['cache_hit_ratio']
+            lines.append(
+                f"{name:<28} {stats['requests']:>8} "
+                f"{_milliseconds(latency['p50']):>8} "
+                f"{_milliseconds(latency['p95']):>8} "
+                f"{_milliseconds(latency['p99']):>8} "
+                f"{stats['response_bytes'] / 1024:>9.1f} "
+                f"{stats['decode_seconds'] * 1000:>10.2f} "
+                f"{'-' if hit_ratio is None else f'{hit_ratio:.2f}':>9} "
+                f"{stats['status_codes']}"
+            )
+        return '\n'.join(lines)
+
+
+def _milliseconds(seconds: Optional[float]) -> str:
+    return '-' if seconds is None else f"{seconds * 1000:.1f}"
+
+
+_shared_metrics = ParserMetrics()
+
+
+def get_metrics() -> ParserMetrics:
+    """Returns the process-wide parser metrics."""
+    return _shared_metrics
+
+
+def enable_exit_dump(output_file: Optional[str] = None, fmt: str = 'text'):
+    """Writes the parser metrics report when the process exits.
+
+    Args:
+        output_file (Optional[str]): File to write to, stderr if None.
+        fmt (str): Either 'text' or 'json'.
+    """
+    def _dump() -> None:
+        report = get_metrics().dump(fmt)
+        if output_file is None:
+            print(report, file=sys.stderr)
+        else:
+            with open(output_file, "w", encoding="utf-8") as file:
+                file.write(report)
+    atexit.register(_dump)
@@ -0,0 +1,197 @@
+"""Client-side rate limiting of Sleeper API requests.
+
+Sleeper asks clients to stay under roughly 1000 calls per minute.
+All parsers in a process share one limiter, see get_rate_limiter().
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Callable, Deque, Dict, Iterator, Optional
+
+SLEEPER_CALLS_PER_MINUTE = 1000
+
+
+class _PrepaidSlot:
+    """A request slot of a limiter taken ahead of the request."""
+    __slots__ = ('limiter', 'used')
+
+    def __init__(self, limiter: "RateLimiter") -> None:
+        self.limiter = limiter
+        self.used = False
+
+
+_prepaid: ContextVar[Optional[_PrepaidSlot]] = ContextVar(
+    'rate_limit_prepaid', default=None
+    )
+
+
+@contextmanager
+def prepaid(limiter: "RateLimiter") -> Iterator[None]:
+    """Marks one request slot of limiter as already taken.
+
+    The next acquire() of limiter in the context returns at once.
+    Worker threads started inside the block with a copy of the context
+    share the mark, so a slot awaited with acquire_async() is not
+    waited for again. A slot no request used, e.g. because the response
+    cache answered, is refunded when the block ends.
+    """
+    slot = _PrepaidSlot(limiter)
+    token = _prepaid.set(slot)
+    try:
+        yield
+    finally:
+        _prepaid.reset(token)
+        if not slot.used:
+            limiter.refund()
+
+
+class RateLimiter:
+    """Adaptive token bucket limiter.
+
+    Tokens refill at the current rate up to burst tokens. The rate is
+    halved on every 429 response and reduced when the recent latency
+    rises well above its long-term baseline. Successful requests slowly
+    raise it again up to max_rate_per_minute.
+
+    max_rate_per_minute (float): Upper bound of the request rate.
+
+    min_rate_per_minute (float): Lower bound when backing off.
+
+    burst (int): Number of requests allowed back to back.
+
+    latency_factor (float): Ratio of recent to baseline latency that
+    is considered congestion.
+    """
+    def __init__(
+            self, max_rate_per_minute: float = SLEEPER_CALLS_PER_MINUTE,
+            min_rate_per_minute: float = 60,
+            burst: int = 20,
+            latency_factor: float = 2.0,
+            clock: Callable[[], float] = time.monotonic,
+            sleep: Callable[[float], None] = time.sleep
+            ) -> None:
+        self.max_rate = max_rate_per_minute / 60
+        self.min_rate = min_rate_per_minute / 60
+        self.burst = burst
+        self.latency_factor = latency_factor
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = Lock()
+        self._rate = self.max_rate
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._latency_recent: Optional[float] = None
+        self._latency_baseline: Optional[float] = None
+        self._recent_requests: Deque[float] = deque()
+        self.requests = 0
+        self.throttled = 0
+        self.waited_seconds = 0.0
+
+    @property
+    def rate_per_minute(self) -> float:
+        """Current allowed request rate per minute."""
+        return self._rate * 60
+
+    def _reserve(self) -> float:
+        """Takes a token and returns the seconds to wait before using it."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self._rate
+                )
+            self._updated = now
+            self._tokens -= 1
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self._rate
+            self.requests += 1
+            self.waited_seconds += wait
+            self._recent_requests.append(now + wait)
+            while self._recent_requests and \
+                    self._recent_requests[0] < now + wait - 60:
+                self._recent_requests.popleft()
+            return wait
+
+    def acquire(self) -> None:
+        """Blocks until a request may be sent, see prepaid()."""
+        slot = _prepaid.get()
+        if slot is not None and slot.limiter is self and not slot.used:
+            slot.used = True
+            return
+        wait = self._reserve()
+        if wait > 0:
+            self._sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """Waits without blocking the event loop until a request may be
+        sent."""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def refund(self) -> None:
+        """Returns a reserved token no request was sent for."""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+            self.requests -= 1
+            if self._recent_requests:
+                self._recent_requests.pop()
+
+    def record(self, status_code: int, latency: float) -> None:
+        """Adapts the rate to the outcome of a request."""
+        with self._lock:
+            if status_code == 429:
+                self.throttled += 1
+                self._rate = max(self.min_rate, self._rate / 2)
+                return
+            if self._latency_baseline is None:
+                self._latency_baseline = latency
+                self._latency_recent = latency
+            else:
+                self._latency_baseline += 0.02 * (
+                    latency - self._latency_baseline
+                    )
+                self._latency_recent += 0.3 * (latency - self._latency_recent)
+            if self._latency_recent > \
+                    self._latency_baseline * self.latency_factor:
+                self._rate = max(self.min_rate, self._rate * 0.9)
+            else:
+                self._rate = min(
+                    self.max_rate, self._rate + self.max_rate * 0.01
+                    )
+
+    def metrics(self) -> Dict[str, float]:
+        """Returns the current rate and request counters."""
+        with self._lock:
+            return {
+                'rate_per_minute': self._rate * 60,
+                'max_rate_per_minute': self.max_rate * 60,
+                'requests_last_minute': len(self._recent_requests),
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'waited_seconds': self.waited_seconds,
+                'latency_recent': self._latency_recent,
+                'latency_baseline': self._latency_baseline,
+            }
+
+
+_shared_limiter: Optional[RateLimiter] = None
+_shared_limiter_lock = Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Returns the process-wide rate limiter."""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter()
+        return _shared_limiter
+
+
+def configure_rate_limiter(limiter: RateLimiter) -> RateLimiter:
+    """Replaces the process-wide rate limiter."""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        _shared_limiter = limiter
+        return _shared_limiter
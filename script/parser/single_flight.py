@@ -0,0 +1,99 @@
+"""Coalescing of duplicate concurrent requests.
+
+While a call for a key is in flight, further callers asking for the same
+key wait for it and receive its result instead of issuing their own.
+"""
+import asyncio
+from threading import Event, Lock
+from typing import (Any, Awaitable, Callable, Dict, Hashable, Optional,
+                    Tuple, TypeVar)
+
+T = TypeVar('T')
+
+
+class _Call:
+    """A call in flight and its outcome."""
+    def __init__(self) -> None:
+        self.done = Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time for threads and tasks.
+
+    Results are shared between all callers of the same key, so they
+    should be treated as read-only.
+    """
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, function: Callable[[], T]) -> T:
+        """Calls function unless a call for key is already in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function()
+            return call.result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(
+            self, key: Hashable, function: Callable[[], Awaitable[T]]
+            ) -> T:
+        """Awaits function unless a call for key is already in flight."""
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        with self._lock:
+            future = self._async_calls.get(loop_key)
+            leader = future is None
+            if leader:
+                future = loop.create_future()
+                self._async_calls[loop_key] = future
+            else:
+                self.coalesced += 1
+        if not leader:
+            return await asyncio.shield(future)
+        try:
+            result = await function()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as error:
+            future.set_exception(error)
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                del self._async_calls[loop_key]
+
+
+_shared_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Returns the process-wide request coalescing group."""
+    return _shared_single_flight
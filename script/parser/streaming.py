@@ -0,0 +1,132 @@
+"""Incremental parsing of large JSON object payloads.
+
+The /players/nfl payload is a single JSON object of close to 5MB
+mapping player IDs to player records. Parsing it incrementally yields
+the records while the download is still running and keeps only one
+record plus the current chunk in memory.
+"""
+import codecs
+import json
+import re
+from typing import (Any, Iterable, Iterator, Optional, Sequence, Tuple,
+                    Union)
+
+from script.common import json_backend
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+
+
+class _StreamBuffer:
+    """Text buffer filled on demand from byte or text chunks."""
+    def __init__(self, chunks: Iterable[Union[bytes, str]]) -> None:
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Appends the next chunk, returns false at end of stream."""
+        if self.eof:
+            return False
+        self.text = self.text[self.pos:]
+        self.pos = 0
+        for chunk in self._chunks:
+            if isinstance(chunk, bytes):
+                chunk = self._utf8.decode(chunk)
+            if chunk:
+                self.text += chunk
+                return True
+        self.text += self._utf8.decode(b'', final=True)
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character, '' at the end."""
+        while True:
+            self.pos = _WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, characters: str) -> str:
+        """Consumes the next character which must be one of characters."""
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(
+                f"Expected one of {characters!r} at offset {self.pos}, "
+                f"got {character!r}."
+                )
+        self.pos += 1
+        return character
+
+    def decode(self) -> Any:
+        """Decodes the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            if end == len(self.text) and self.fill():
+                # A number at the end of the buffer may be truncated.
+                continue
+            self.pos = end
+            return value
+
+
+def _project(record: Any, fields: Optional[Sequence[str]]) -> Any:
+    """Keeps only given fields of a record."""
+    if fields is None or not isinstance(record, dict):
+        return record
+    return {field: record.get(field) for field in fields}
+
+
+def iter_object_items(
+        chunks: Iterable[Union[bytes, str]],
+        fields: Optional[Sequence[str]] = None
+        ) -> Iterator[Tuple[str, Any]]:
+    """Yields (key, value) pairs of a top-level JSON object incrementally.
+
+    Args:
+        chunks (Iterable[Union[bytes, str]]): Chunks of the JSON document,
+        e.g. requests.Response.iter_content().
+        fields (Optional[Sequence[str]]): Only keep these fields of each
+        value. Defaults to None which keeps all fields.
+    """
+    buffer = _StreamBuffer(chunks)
+    buffer.expect('{')
+    if buffer.peek() == '}':
+        return
+    while True:
+        key = buffer.decode()
+        buffer.expect(':')
+        value = buffer.decode()
+        yield key, _project(value, fields)
+        if buffer.expect(',}') == '}':
+            return
+
+
+def write_object_items(
+        items: Iterable[Tuple[str, Any]], output_file: str
+        ) -> int:
+    """Writes (key, value) pairs as one JSON object without buffering it.
+
+    Returns the number of written items.
+    """
+    count = 0
+    with open(output_file, "wb") as file:
+        file.write(b'{')
+        for key, value in items:
+            if count:
+                file.write(b',')
+            file.write(json_backend.dumps(key))
+            file.write(b':')
+            file.write(json_backend.dumps(value))
+            count += 1
+        file.write(b'}')
+    return count
@@ -0,0 +1,247 @@
+"""Compact binary player store opened through mmap.
+
+The store is compiled from the /players/nfl JSON dump and holds:
+    - a header with the row count and section offsets,
+    - fixed-width int32 columns for numeric fields,
+    - uint32 string table offsets for text fields,
+    - a player_id index of row numbers sorted by player ID,
+    - a deduplicated table of length-prefixed UTF-8 strings.
+
+Records are read straight from the mapped pages, so opening the store
+costs no parsing and worker processes share the same pages.
+"""
+import argparse
+import mmap
+import struct
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+from script.common import json_backend
+from script.players.json_store import read_json_players
+
+MAGIC = b'SLPB'
+VERSION = 1
+INT_FIELDS = ('age', 'years_exp', 'number', 'depth_chart_order')
+STR_FIELDS = (
+    'player_id', 'full_name', 'first_name', 'last_name', 'search_full_name',
+    'position', 'team', 'status', 'injury_status', 'college', 'high_school',
+    'birth_date', 'height', 'weight', 'fantasy_positions', 'metadata',
+)
+JSON_FIELDS = frozenset({'fantasy_positions', 'metadata'})
+FIELDS = INT_FIELDS + STR_FIELDS
+
+INT_NONE = -2 ** 31
+STR_NONE = 2 ** 32 - 1
+
+# magic, version, row count, int columns, str columns, index, strings
+_HEADER = struct.Struct('<4sHxxIQQQQ')
+_LENGTH = struct.Struct('<I')
+
+
+def _to_int(value: Any) -> int:
+    """Converts a numeric field to its int32 column value."""
+    if value is None:
+        return INT_NONE
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return INT_NONE
+
+
+def _to_str(field: str, value: Any) -> Optional[str]:
+    """Converts a text field to its string table value."""
+    if value is None:
+        return None
+    if field in JSON_FIELDS:
+        return json_backend.dumps(value).decode('utf-8')
+    return str(value)
+
+
+def compile_player_store(
+        players: Mapping[str, Mapping[str, Any]], output_file: str
+        ) -> int:
+    """Compiles player records into a binary store.
+
+    Returns the number of stored players.
+    """
+    player_ids = list(players)
+    count = len(player_ids)
+    strings: Dict[str, int] = {}
+    string_table = bytearray()
+
+    def string_offset(value: Optional[str]) -> int:
+        if value is None:
+            return STR_NONE
+        offset = strings.get(value)
+        if offset is None:
+            encoded = value.encode('utf-8')
+            offset = strings[value] = len(string_table)
+            string_table.extend(_LENGTH.pack(len(encoded)))
+            string_table.extend(encoded)
+        return offset
+
+    int_columns = bytearray()
+    for field in INT_FIELDS:
+        int_columns.extend(struct.pack(
+            f'<{count}i',
+            *(_to_int(players[player_id].get(field))
+              for player_id in player_ids)
+        ))
+    str_columns = bytearray()
+    for field in STR_FIELDS:
+        offsets = []
+        for player_id in player_ids:
+            value = player_id if field == 'player_id' \
+                else players[player_id].get(field)
+            offsets.append(string_offset(_to_str(field, value)))
+        str_columns.extend(struct.pack(f'<{count}I', *offsets))
+    index = struct.pack(
+        f'<{count}I',
+        *sorted(range(count), key=lambda row: player_ids[row])
+    )
+
+    int_offset = _HEADER.size
+    str_offset = int_offset + len(int_columns)
+    index_offset = str_offset + len(str_columns)
+    strings_offset = index_offset + len(index)
+    with open(output_file, "wb") as file:
+        file.write(_HEADER.pack(
+            MAGIC, VERSION, count,
+            int_offset, str_offset, index_offset, strings_offset,
+        ))
+        file.write(int_columns)
+        file.write(str_columns)
+        file.write(index)
+        file.write(string_table)
+    return count
+
+
+class BinaryPlayerRecord(Mapping[str, Any]):
+    """Read-only view of a single player row of a BinaryPlayerStore."""
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store: "BinaryPlayerStore", row: int) -> None:
+        self._store = store
+        self._row = row
+
+    def __getitem__(self, field: str) -> Any:
+        return self._store.field(self._row, field)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    def __repr__(self) -> str:
+        return f"BinaryPlayerRecord({dict(self)!r})"
+
+
+class BinaryPlayerStore(Mapping[str, BinaryPlayerRecord]):
+    """Memory-mapped binary player store with O(log n) player ID lookup."""
+    def __init__(self, store_file: str) -> None:
+        self._file = open(store_file, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        (magic, version, self._count, int_offset, str_offset,
+         index_offset, self._strings_offset) = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{store_file} is not a version {VERSION} "
+                             "binary player store.")
+        column_size = 4 * self._count
+        self._int_columns = {
+            field: self._buffer[
+                int_offset + i * column_size:
+                int_offset + (i + 1) * column_size].cast('i')
+            for i, field in enumerate(INT_FIELDS)
+        }
+        self._str_columns = {
+            field: self._buffer[
+                str_offset + i * column_size:
+                str_offset + (i + 1) * column_size].cast('I')
+            for i, field in enumerate(STR_FIELDS)
+        }
+        self._index = self._buffer[
+            index_offset:index_offset + column_size].cast('I')
+        self._ids = self._str_columns['player_id']
+
+    def _string(self, offset: int) -> Optional[str]:
+        """Reads a string of the string table."""
+        if offset == STR_NONE:
+            return None
+        start = self._strings_offset + offset
+        (length,) = _LENGTH.unpack_from(self._mmap, start)
+        start += _LENGTH.size
+        return str(self._buffer[start:start + length], 'utf-8')
+
+    def field(self, row: int, field: str) -> Any:
+        """Reads a field of a row straight from the mapped buffer."""
+        column = self._int_columns.get(field)
+        if column is not None:
+            value = column[row]
+            return None if value == INT_NONE else value
+        column = self._str_columns.get(field)
+        if column is None:
+            raise KeyError(field)
+        value = self._string(column[row])
+        if value is not None and field in JSON_FIELDS:
+            return json_backend.loads(value)
+        return value
+
+    def _find_row(self, player_id: str) -> Optional[int]:
+        """Binary search of the sorted player ID index."""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            row = self._index[middle]
+            current = self._string(self._ids[row])
+            if current == player_id:
+                return row
+            if current < player_id:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def __getitem__(self, player_id: str) -> BinaryPlayerRecord:
+        row = self._find_row(player_id)
+        if row is None:
+            raise KeyError(player_id)
+        return BinaryPlayerRecord(self, row)
+
+    def __contains__(self, player_id: object) -> bool:
+        return isinstance(player_id, str) and \
+            self._find_row(player_id) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for row in self._index:
+            yield self._string(self._ids[row])
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        """Releases the mapping and the file."""
+        for view in (list(getattr(self, '_int_columns', {}).values()) +
+                     list(getattr(self, '_str_columns', {}).values()) +
+                     [getattr(self, '_index', None), self._buffer]):
+            if view is not None:
+                view.release()
+        self._mmap.close()
+        self._file.close()
+
+
+def main(database: str, output: str) -> None:
+    """Entry point for compiling the JSON player database."""
+    players: Dict[str, Any] = read_json_players(database)
+    print(compile_player_store(players, output))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default='script/resources/players_db.json',
+                        help='JSON player database input')
+    parser.add_argument('--output', default='script/resources/players_db.bin',
+                        help='Binary player store output')
+    args = parser.parse_args()
+    main(args.db, args.output)
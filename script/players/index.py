@@ -0,0 +1,129 @@
+"""Secondary indexes over the player database.
+
+Player IDs are grouped once per value of position, team, each fantasy
+position, status and years_exp, so filters like "active rookie WRs"
+become set intersections instead of scans over every player record.
+"""
+from typing import (AbstractSet, Any, Dict, FrozenSet, Iterable, List,
+                    Mapping, Optional, Set, Tuple)
+
+from script.players.sync import PlayerChanges
+
+INDEXED_FIELDS = ('position', 'team', 'fantasy_positions', 'status',
+                  'years_exp')
+ROOKIE_YEARS_EXP = 0
+
+_IndexKey = Tuple[str, Any]
+
+
+def _index_keys(record: Mapping[str, Any]) -> List[_IndexKey]:
+    """Returns the (field, value) keys a player record is indexed by."""
+    keys = []
+    for field in INDEXED_FIELDS:
+        value = record.get(field)
+        if value is None:
+            continue
+        if field == 'fantasy_positions':
+            keys.extend((field, position) for position in value)
+        else:
+            keys.append((field, value))
+    return keys
+
+
+class PlayerIndex:
+    """Player IDs grouped by position, team, fantasy position, status
+    and years_exp.
+
+    Example, all active rookie WRs:
+        index.select(position='WR', status='Active', rookies=True)
+    """
+    def __init__(
+            self, players: Optional[Mapping[str, Mapping[str, Any]]] = None
+            ) -> None:
+        self._ids: Dict[_IndexKey, Set[str]] = {}
+        self._keys: Dict[str, List[_IndexKey]] = {}
+        if players is not None:
+            self.add(players.items())
+
+    def add(self, items: Iterable[Tuple[str, Mapping[str, Any]]]) -> None:
+        """Indexes (player ID, record) pairs, replacing known players."""
+        for player_id, record in items:
+            self._remove(player_id)
+            keys = _index_keys(record)
+            self._keys[player_id] = keys
+            for key in keys:
+                self._ids.setdefault(key, set()).add(player_id)
+
+    def remove(self, player_ids: Iterable[str]) -> None:
+        """Drops players from the index."""
+        for player_id in player_ids:
+            self._remove(player_id)
+
+    def _remove(self, player_id: str) -> None:
+        for key in self._keys.pop(player_id, ()):
+            ids = self._ids[key]
+            ids.discard(player_id)
+            if not ids:
+                del self._ids[key]
+
+    def apply_changes(self, changes: PlayerChanges) -> None:
+        """Re-indexes only the players of a player DB sync."""
+        self.remove(changes.removed)
+        self.add(changes.added.items())
+        self.add(changes.changed.items())
+
+    def lookup(self, field: str, value: Any) -> FrozenSet[str]:
+        """Returns the IDs of players whose field equals value.
+
+        For fantasy_positions, value is a single fantasy position.
+        """
+        if field not in INDEXED_FIELDS:
+            raise KeyError(f"{field!r} is not indexed, "
+                           f"indexed fields: {INDEXED_FIELDS}.")
+        return frozenset(self._ids.get((field, value), ()))
+
+    def values(self, field: str) -> List[Any]:
+        """Returns the distinct indexed values of a field."""
+        return sorted((value for key_field, value in self._ids
+                       if key_field == field), key=str)
+
+    def select(
+            self, position: Optional[str] = None,
+            team: Optional[str] = None,
+            fantasy_position: Optional[str] = None,
+            status: Optional[str] = None,
+            years_exp: Optional[int] = None,
+            rookies: bool = False
+            ) -> Set[str]:
+        """Returns the IDs of players matching all given filters.
+
+        Intersections start from the smallest matching group. Without
+        any filter all indexed players are returned.
+        """
+        filters = [(field, value) for field, value in (
+            ('position', position), ('team', team),
+            ('fantasy_positions', fantasy_position), ('status', status),
+            ('years_exp', years_exp)) if value is not None]
+        if rookies:
+            filters.append(('years_exp', ROOKIE_YEARS_EXP))
+        if not filters:
+            return set(self._keys)
+        groups: List[AbstractSet[str]] = sorted(
+            (self._ids.get(key, set()) for key in filters), key=len
+        )
+        result = set(groups[0])
+        for group in groups[1:]:
+            if not result:
+                break
+            result &= group
+        return result
+
+    def rookies(self) -> FrozenSet[str]:
+        """Returns the IDs of all rookies."""
+        return self.lookup('years_exp', ROOKIE_YEARS_EXP)
+
+    def __contains__(self, player_id: str) -> bool:
+        return player_id in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
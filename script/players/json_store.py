@@ -0,0 +1,77 @@
+"""Journaled JSON player database.
+
+A JSON file can only be written as a whole, so syncs append the changed
+records to a journal next to the database instead, e.g.
+players_db.json.journal.jsonl. Every line holds the upserted records and
+the removed player IDs of one sync. Readers replay the journal over the
+database. Once the journal grows past COMPACT_SHARE of the database
+size, both are merged into the database and the journal is removed.
+"""
+from pathlib import Path
+from typing import Any, Dict, Iterable, Mapping
+
+from script.common import json_backend
+from script.common.common import read_json_from_file, write_json_to_file
+
+JOURNAL_SUFFIX = '.journal.jsonl'
+COMPACT_SHARE = 0.25
+
+
+def journal_file(database_file: str) -> Path:
+    """Returns the journal of a JSON player database."""
+    database = Path(database_file)
+    return database.with_name(database.name + JOURNAL_SUFFIX)
+
+
+def read_json_players(database_file: str) -> Dict[str, Any]:
+    """Reads a JSON player database with its journal replayed.
+
+    Raises FileNotFoundError if neither exists.
+    """
+    journal = journal_file(database_file)
+    if not journal.exists():
+        return read_json_from_file(database_file)
+    players: Dict[str, Any] = {}
+    if Path(database_file).exists():
+        players = read_json_from_file(database_file)
+    with open(journal, "rb") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            entry = json_backend.loads(line)
+            players.update(entry.get('put', {}))
+            for player_id in entry.get('del', []):
+                players.pop(player_id, None)
+    return players
+
+
+def append_json_changes(
+        database_file: str, upserted: Mapping[str, Any],
+        removed: Iterable[str]
+        ) -> bool:
+    """Journals upserted and removed players of a JSON player database.
+
+    Returns true if the journal was compacted into the database.
+    """
+    journal = journal_file(database_file)
+    with open(journal, "ab") as file:
+        file.write(json_backend.dumps(
+            {'put': dict(upserted), 'del': list(removed)}) + b'\n')
+    database = Path(database_file)
+    if database.exists() and journal.stat().st_size <= \
+            COMPACT_SHARE * database.stat().st_size:
+        return False
+    compact_json_players(database_file)
+    return True
+
+
+def compact_json_players(database_file: str) -> None:
+    """Merges the journal into the JSON player database."""
+    journal = journal_file(database_file)
+    if not journal.exists():
+        return
+    players = read_json_players(database_file)
+    tmp_file = Path(database_file).with_suffix('.tmp')
+    write_json_to_file(players, str(tmp_file))
+    tmp_file.replace(database_file)
+    journal.unlink()
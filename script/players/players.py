@@ -1,22 +1,24 @@
 """All data related to players."""
-from typing import Dict, List, Any
-from script.common.common import read_json_from_file
+import os
+import sys
+from pathlib import Path
+from threading import Lock
+from typing import (Dict, Iterable, Iterator, List, Any, Mapping, Optional,
+                    Tuple, Type)
+from script.players.binary_store import BinaryPlayerStore
+from script.players.index import PlayerIndex
+from script.players.json_store import read_json_players
+from script.players.search import NameMatch, PlayerNameIndex
+from script.players.sqlite_store import SQLitePlayerStore
+from script.players.sync import PlayerChanges
 from dataclasses import dataclass
 from enum import Enum
 
-class PlayerPersonal:
-    ''' Class for personal player data. '''
-    def __init__(self,  player_db: Dict[str, Any]) -> None:
-        self.full_name = player_db['full_name']
-        self.age = player_db['age']
-        self.weight = player_db['weight']
-        self.height = player_db['height']
-        self.birth_date = player_db['birth_date']
-        self.college = player_db['college']
-        self.high_school = player_db['high_school']
-
 class PlayerPersonal:
     """Class for personal player data."""
+    __slots__ = ('_full_name', '_age', '_weight', '_height', '_birth_date',
+                 '_college', '_high_school')
+
     def __init__(self,  player: Dict[str, Any]) -> None:
         self._full_name: str = player.get('full_name')
         self._age: int = player.get('age')
@@ -62,34 +64,139 @@ class PlayerPersonal:
         return self._high_school
 
     def get_first_name(self) -> str:
-        ''' Returns the last name of the player. '''
-        return str(self.full_name.split(" "))[0]
+        ''' Returns the first name of the player. '''
+        names = (self.full_name or '').split(maxsplit=1)
+        return names[0] if names else ''
 
     def get_last_name(self) -> str:
-        ''' Returns the first name of the player. '''
-        return str(self.full_name.split(" "))[1]
+        ''' Returns the last name of the player, empty for single names. '''
+        names = (self.full_name or '').split(maxsplit=1)
+        return names[1] if len(names) > 1 else ''
+
+
+class _PlayerValue(str, Enum):
+    """Enum of a repeated player record value.
 
+    Members compare and hash like their string value, so coded records
+    stay interchangeable with raw Sleeper records and serialize to JSON
+    unchanged.
+    """
+    __hash__ = str.__hash__
 
-class Position(Enum):
+    def __str__(self) -> str:
+        return self.value
+
+
+class Position(_PlayerValue):
     QB = "QB"
     WR = "WR"
     RB = "RB"
     TE = "TE"
     K = "K"
-
-class Status(Enum):
+    DEF = "DEF"
+    DL = "DL"
+    LB = "LB"
+    DB = "DB"
+    OL = "OL"
+    P = "P"
+    LS = "LS"
+
+class Status(_PlayerValue):
     ACTIVE = "Active"
     INACTIVE = "Inactive"
+    INJURED_RESERVE = "Injured Reserve"
+    PHYSICALLY_UNABLE_TO_PERFORM = "Physically Unable to Perform"
+    PRACTICE_SQUAD = "Practice Squad"
+    NON_FOOTBALL_INJURY = "Non Football Injury"
 
-class Team(Enum):
-    KANSAS_CITY = 'KC'
+class Team(_PlayerValue):
     ARIZONA = 'ARI'
-
-
+    ATLANTA = 'ATL'
+    BALTIMORE = 'BAL'
+    BUFFALO = 'BUF'
+    CAROLINA = 'CAR'
+    CHICAGO = 'CHI'
+    CINCINNATI = 'CIN'
+    CLEVELAND = 'CLE'
+    DALLAS = 'DAL'
+    DENVER = 'DEN'
+    DETROIT = 'DET'
+    GREEN_BAY = 'GB'
+    HOUSTON = 'HOU'
+    INDIANAPOLIS = 'IND'
+    JACKSONVILLE = 'JAX'
+    KANSAS_CITY = 'KC'
+    LAS_VEGAS = 'LV'
+    LOS_ANGELES_CHARGERS = 'LAC'
+    LOS_ANGELES_RAMS = 'LAR'
+    MIAMI = 'MIA'
+    MINNESOTA = 'MIN'
+    NEW_ENGLAND = 'NE'
+    NEW_ORLEANS = 'NO'
+    NEW_YORK_GIANTS = 'NYG'
+    NEW_YORK_JETS = 'NYJ'
+    PHILADELPHIA = 'PHI'
+    PITTSBURGH = 'PIT'
+    SAN_FRANCISCO = 'SF'
+    SEATTLE = 'SEA'
+    TAMPA_BAY = 'TB'
+    TENNESSEE = 'TEN'
+    WASHINGTON = 'WAS'
+
+
+CODED_FIELDS: Dict[str, Type[_PlayerValue]] = {
+    'position': Position,
+    'fantasy_positions': Position,
+    'status': Status,
+    'team': Team,
+}
+INTERNED_FIELDS = ('college', 'injury_status', 'depth_chart_position')
+
+
+def _code_value(enum: Type[_PlayerValue], value: Any) -> Any:
+    """Returns the enum member of a value, else the interned string."""
+    if not isinstance(value, str):
+        return value
+    member = enum._value2member_map_.get(value)
+    return member if member is not None else sys.intern(value)
+
+
+def intern_record(record: Mapping[str, Any]) -> Dict[str, Any]:
+    """Returns a player record with repeated values shared.
+
+    Team, position, status and fantasy positions become Position,
+    Status and Team members (interned strings for values without a
+    member), college and injury fields interned strings.
+    """
+    record = dict(record)
+    for field, enum in CODED_FIELDS.items():
+        value = record.get(field)
+        if isinstance(value, list):
+            record[field] = [_code_value(enum, item) for item in value]
+        elif value is not None:
+            record[field] = _code_value(enum, value)
+    for field in INTERNED_FIELDS:
+        value = record.get(field)
+        if isinstance(value, str):
+            record[field] = sys.intern(value)
+    return record
+
+
+def intern_players(
+        items: Iterable[Tuple[str, Mapping[str, Any]]]
+        ) -> Dict[str, Dict[str, Any]]:
+    """Returns interned player records keyed by player ID."""
+    return {
+        sys.intern(player_id): intern_record(record)
+        for player_id, record in items
+        }
 
 
 class PlayerProfessional:
     """Class for professional player data."""
+    __slots__ = ('_years_exp', '_team', '_number', '_position', '_status',
+                 '_depth_chart_order')
+
     def __init__(self,  player: Dict[str, Any]) -> None:
         self._years_exp: int = player.get('years_exp')
         self._team: Team = player.get('team')
@@ -130,44 +237,223 @@ class PlayerProfessional:
 
 
 class PlayerSleeper:
-    """Class for player data related to Sleeper.""" 
+    """Class for player data related to Sleeper."""
+    __slots__ = ('_player_id', '_metadata', '_fantasy_positions')
+
     def __init__(self,  player: Dict[str, Any]) -> None:
         self._player_id: str = player.get('player_id')
         self._metadata: Dict[str, str] = player.get('metadata')
-        self._fantasy_positions: List[Position] = player['fantasy_positions']
+        self._fantasy_positions: List[Position] = player.get('fantasy_positions')
 
     @property
     def player_id(self) -> str:
         """Sleeper ID of the player."""
-        return self.player_id
+        return self._player_id
 
     @property
     def metadata(self) -> Dict[str, str]:
         """Sleeper metadata of the player."""
-        return self.metadata
+        return self._metadata
 
     @property
     def fantasy_positions(self) -> List[Position]:
         """Sleeper fantasy positions of the player."""
-        return self.fantasy_positions
+        return self._fantasy_positions
 
 @dataclass
 class PlayerDB:
     player_db: str = "script/resources/players_db.json"
-    
+    player_store: str = "script/resources/players_db.bin"
+    player_sqlite: str = "script/resources/players_db.sqlite"
+    environment_variable: str = "SLEEPER_PLAYER_DB"
+
+    @classmethod
+    def default(cls) -> str:
+        """Returns the player database selected by SLEEPER_PLAYER_DB,
+        else the JSON DB.
+
+        The binary store and the SQLite DB are opt-in: the binary store
+        only holds a fixed set of fields, so it is never picked up just
+        because the file exists.
+        """
+        return os.environ.get(cls.environment_variable) or cls.player_db
+
+
+def read_player_database(database_file: str) -> Mapping[str, Any]:
+    """Opens a binary player store (.bin), a SQLite player DB (.sqlite)
+    or reads a JSON player DB and its journal with interned records."""
+    suffix = Path(database_file).suffix
+    if suffix == '.bin':
+        return BinaryPlayerStore(database_file)
+    if suffix in ('.sqlite', '.db'):
+        return SQLitePlayerStore(database_file)
+    return intern_players(read_json_players(database_file).items())
+
+
+def close_player_database(players: Mapping[str, Any]) -> None:
+    """Closes a binary or SQLite player store, JSON DBs need nothing."""
+    close = getattr(players, 'close', None)
+    if close is not None:
+        close()
+
+
+class PlayerRepository:
+    """Process-wide access to the player database.
+
+    The database is parsed once per file and shared by every Player and
+    RosterPlayers lookup, giving O(1) access by player ID.
+    Compiled binary stores (.bin) are memory-mapped and SQLite databases
+    (.sqlite) are queried instead of parsed.
+    Use PlayerRepository.instance() to get the shared repository.
+    """
+    _instances: Dict[str, "PlayerRepository"] = {}
+    _instances_lock = Lock()
+
+    def __init__(self, database_file: str = PlayerDB.player_db) -> None:
+        self._database_file = str(database_file)
+        self._players: Optional[Mapping[str, Mapping[str, Any]]] = None
+        self._index: Optional[PlayerIndex] = None
+        self._name_index: Optional[PlayerNameIndex] = None
+        self._lock = Lock()
+
+    @classmethod
+    def instance(
+            cls, database_file: Optional[str] = None
+            ) -> "PlayerRepository":
+        """Returns the shared repository for given database file."""
+        key = str(database_file or PlayerDB.default())
+        with cls._instances_lock:
+            repository = cls._instances.get(key)
+            if repository is None:
+                repository = cls(key)
+                cls._instances[key] = repository
+        return repository
+
+    @classmethod
+    def clear_instances(cls) -> None:
+        """Drops all shared repositories, e.g. between test cases."""
+        with cls._instances_lock:
+            cls._instances.clear()
+
+    @property
+    def database_file(self) -> str:
+        """Path of the player database."""
+        return self._database_file
+
+    @property
+    def players(self) -> Mapping[str, Mapping[str, Any]]:
+        """All player records keyed by player ID, loaded on first use."""
+        if self._players is None:
+            with self._lock:
+                if self._players is None:
+                    self._players = read_player_database(self._database_file)
+        return self._players
+
+    @property
+    def index(self) -> PlayerIndex:
+        """Secondary indexes of the players, built on first use."""
+        if self._index is None:
+            players = self.players
+            with self._lock:
+                if self._index is None:
+                    self._index = PlayerIndex(players)
+        return self._index
+
+    @property
+    def name_index(self) -> PlayerNameIndex:
+        """Name search index of the players, built on first use."""
+        if self._name_index is None:
+            players = self.players
+            with self._lock:
+                if self._name_index is None:
+                    self._name_index = PlayerNameIndex(players)
+        return self._name_index
+
+    def search(self, query: str, limit: int = 10) -> List[NameMatch]:
+        """Returns up to limit players ranked by name similarity."""
+        return self.name_index.search(query, limit)
+
+    def reload(self) -> None:
+        """Re-reads the player database from file."""
+        with self._lock:
+            if self._players is not None:
+                close_player_database(self._players)
+            self._players = read_player_database(self._database_file)
+            self._index = None
+            self._name_index = None
+
+    def apply_changes(self, changes: PlayerChanges) -> None:
+        """Applies the changes of a player DB sync to the loaded players.
+
+        JSON repositories are updated in place for the changed players
+        only, other backends are closed and re-opened on next use. Built
+        indexes are updated for the changed players only.
+        """
+        with self._lock:
+            if self._index is not None:
+                self._index.apply_changes(changes)
+            if self._name_index is not None:
+                self._name_index.apply_changes(changes)
+            if self._players is None:
+                return
+            if not isinstance(self._players, dict):
+                close_player_database(self._players)
+                self._players = None
+                return
+            self._players.update(intern_players(changes.added.items()))
+            self._players.update(intern_players(changes.changed.items()))
+            for player_id in changes.removed:
+                self._players.pop(player_id, None)
+
+    def load_items(
+            self, items: Iterable[Tuple[str, Dict[str, Any]]]
+            ) -> None:
+        """Replaces the loaded players with streamed (ID, record) pairs,
+        e.g. from SleeperAPIParser.stream_all_players()."""
+        players = intern_players(items)
+        with self._lock:
+            self._players = players
+            self._index = None
+            self._name_index = None
+
+    def get(self, player_id: str) -> Optional[Mapping[str, Any]]:
+        """Returns the raw player record or None if unknown."""
+        return self.players.get(player_id)
+
+    def items(self) -> Iterator[Tuple[str, Mapping[str, Any]]]:
+        """Iterates over (player ID, player record) pairs."""
+        return iter(self.players.items())
+
+    def __contains__(self, player_id: str) -> bool:
+        return player_id in self.players
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.players)
+
 
 class Player:
-    ''' Constructs player data based on the player ID. '''
-    def __init__(self, player_id: str) -> None:
+    ''' Constructs player data based on the player ID.
+
+    The personal, professional and Sleeper data are built from the
+    player record on first access. '''
+    __slots__ = ('_id', '_record', '_personal', '_professional',
+                 '_sleeper_data')
+    player_db = PlayerDB
+
+    def __init__(
+            self, player_id: str,
+            repository: Optional[PlayerRepository] = None
+            ) -> None:
         self._id = player_id
-        self.player_db = PlayerDB
-        db = read_json_from_file(self.player_db.player_db)
-        if self._id in db:
-            found_player = db.get(self.id)
-            self._personal = PlayerPersonal(found_player)
-            self._professional = PlayerProfessional(found_player)
-            self._sleeper_data = PlayerSleeper(found_player)
-
+        if repository is None:
+            repository = PlayerRepository.instance(self.player_db.default())
+        self._record: Optional[Mapping[str, Any]] = repository.get(self._id)
+        self._personal: Optional[PlayerPersonal] = None
+        self._professional: Optional[PlayerProfessional] = None
+        self._sleeper_data: Optional[PlayerSleeper] = None
 
     @property
     def id(self) -> str:
@@ -175,17 +461,23 @@ class Player:
         return self._id
 
     @property
-    def personal(self) -> PlayerPersonal:
-        """Personal data of the Player."""
+    def personal(self) -> Optional[PlayerPersonal]:
+        """Personal data of the Player, None if the player is unknown."""
+        if self._personal is None and self._record is not None:
+            self._personal = PlayerPersonal(self._record)
         return self._personal
 
     @property
-    def professional(self) -> PlayerProfessional:
-        """Professional data of the Player."""
+    def professional(self) -> Optional[PlayerProfessional]:
+        """Professional data of the Player, None if the player is unknown."""
+        if self._professional is None and self._record is not None:
+            self._professional = PlayerProfessional(self._record)
         return self._professional
 
     @property
-    def sleeper(self) -> PlayerProfessional:
-        """Sleeper data of the Player."""
+    def sleeper(self) -> Optional[PlayerSleeper]:
+        """Sleeper data of the Player, None if the player is unknown."""
+        if self._sleeper_data is None and self._record is not None:
+            self._sleeper_data = PlayerSleeper(self._record)
         return self._sleeper_data
 
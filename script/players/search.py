@@ -0,0 +1,244 @@
+"""Fuzzy player name search.
+
+Names are normalized like Sleeper's search_full_name (lower case
+letters and digits only) and indexed twice:
+    - a sorted token list answering prefix queries through bisection,
+      e.g. "mah" or "sam how",
+    - trigram postings of every name word and of the whole name,
+      ranking misspelled names, e.g. "mahommes", by the share of query
+      trigrams they contain.
+Trigrams are only searched when no name matches the query prefixes.
+Names holding every query word as a whole word rank above names the
+query words are only prefixes of, shorter names first. Ranking keys are
+computed once when a player is indexed, and the best matches of one and
+two letter prefixes are cached until the index changes. The index is
+updated per player when the player DB syncs.
+"""
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from typing import (Any, Dict, Iterable, List, Mapping, NamedTuple, Optional,
+                    Set, Tuple)
+
+from script.players.sync import PlayerChanges
+
+MIN_TRIGRAM_SIMILARITY = 0.5
+SHORT_PREFIX_LENGTH = 2
+CACHED_PREFIX_MATCHES = 64
+
+_NON_ALPHANUMERIC = re.compile(r'[^a-z0-9]+')
+# Sorts after every character of a normalized token.
+_AFTER_TOKEN_CHARS = '{'
+
+
+def normalize_name(name: str) -> str:
+    """Returns the lower case letters and digits of a name."""
+    return _NON_ALPHANUMERIC.sub('', name.lower())
+
+
+def name_tokens(name: str) -> List[str]:
+    """Returns the normalized words of a name."""
+    return [token for token in (
+        normalize_name(word) for word in name.split()) if token]
+
+
+def trigrams(name: str) -> Set[str]:
+    """Returns the trigrams of a normalized name, padded at both ends."""
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def display_name(record: Mapping[str, Any]) -> Optional[str]:
+    """Returns full_name, or first and last name, e.g. of defenses."""
+    full_name = record.get('full_name')
+    if full_name:
+        return full_name
+    name = ' '.join(part for part in (
+        record.get('first_name'), record.get('last_name')) if part)
+    return name or None
+
+
+class NameMatch(NamedTuple):
+    """A ranked result of a name search."""
+    player_id: str
+    full_name: str
+    score: float
+
+
+class PlayerNameIndex:
+    """Prefix and trigram index over player names.
+
+    Exact word matches of every query word rank first, then prefix
+    matches, then trigram matches.
+    """
+    def __init__(
+            self, players: Optional[Mapping[str, Mapping[str, Any]]] = None
+            ) -> None:
+        self._names: Dict[str, str] = {}
+        self._ranking: Dict[str, Tuple[int, str, str]] = {}
+        self._short_prefixes: Dict[str, List[NameMatch]] = {}
+        self._keys: Dict[str, Tuple[List[str], Set[str]]] = {}
+        self._token_ids: Dict[str, Set[str]] = {}
+        self._sorted_tokens: List[str] = []
+        self._trigram_ids: Dict[str, Set[str]] = {}
+        if players is not None:
+            self.add(players.items())
+
+    def add(self, items: Iterable[Tuple[str, Mapping[str, Any]]]) -> None:
+        """Indexes (player ID, record) pairs, replacing known players."""
+        new_tokens: List[str] = []
+        self._short_prefixes.clear()
+        for player_id, record in items:
+            self._remove(player_id)
+            name = display_name(record)
+            if name is None:
+                continue
+            normalized = record.get('search_full_name') or normalize_name(name)
+            tokens = list(dict.fromkeys(name_tokens(name) + [normalized]))
+            grams = trigrams(normalized).union(*map(trigrams, tokens))
+            self._names[player_id] = name
+            self._ranking[player_id] = (len(normalized), name, player_id)
+            self._keys[player_id] = (tokens, grams)
+            for token in tokens:
+                ids = self._token_ids.get(token)
+                if ids is None:
+                    ids = self._token_ids[token] = set()
+                    new_tokens.append(token)
+                ids.add(player_id)
+            for gram in grams:
+                self._trigram_ids.setdefault(gram, set()).add(player_id)
+        if len(new_tokens) > 64:
+            self._sorted_tokens = sorted(self._token_ids)
+        else:
+            for token in new_tokens:
+                if token in self._token_ids:
+                    insort(self._sorted_tokens, token)
+
+    def remove(self, player_ids: Iterable[str]) -> None:
+        """Drops players from the index."""
+        for player_id in player_ids:
+            self._remove(player_id)
+
+    def _remove(self, player_id: str) -> None:
+        keys = self._keys.pop(player_id, None)
+        if keys is None:
+            return
+        self._short_prefixes.clear()
+        del self._names[player_id]
+        del self._ranking[player_id]
+        tokens, grams = keys
+        for token in tokens:
+            ids = self._token_ids[token]
+            ids.discard(player_id)
+            if not ids:
+                del self._token_ids[token]
+                position = bisect_left(self._sorted_tokens, token)
+                if position < len(self._sorted_tokens) and \
+                        self._sorted_tokens[position] == token:
+                    del self._sorted_tokens[position]
+        for gram in grams:
+            ids = self._trigram_ids[gram]
+            ids.discard(player_id)
+            if not ids:
+                del self._trigram_ids[gram]
+
+    def apply_changes(self, changes: PlayerChanges) -> None:
+        """Re-indexes only the players of a player DB sync."""
+        self.remove(changes.removed)
+        self.add(changes.added.items())
+        self.add(changes.changed.items())
+
+    def _prefix_ids(self, prefix: str) -> Set[str]:
+        """Returns the IDs of players with a name token starting with
+        prefix."""
+        start = bisect_left(self._sorted_tokens, prefix)
+        end = bisect_left(self._sorted_tokens, prefix + _AFTER_TOKEN_CHARS,
+                          start)
+        return set().union(*map(self._token_ids.__getitem__,
+                                self._sorted_tokens[start:end]))
+
+    def search(self, query: str, limit: int = 10) -> List[NameMatch]:
+        """Returns up to limit players ranked by name similarity."""
+        tokens = name_tokens(query)
+        if not tokens or limit <= 0:
+            return []
+        normalized = ''.join(tokens)
+
+        if len(tokens) == 1 and len(normalized) <= SHORT_PREFIX_LENGTH \
+                and limit <= CACHED_PREFIX_MATCHES:
+            matches = self._short_prefixes.get(normalized)
+            if matches is None:
+                matches = self._short_prefixes[normalized] = \
+                    self._rank_prefix_matches(
+                        tokens, normalized, CACHED_PREFIX_MATCHES)
+            return matches[:limit]
+
+        matches = self._rank_prefix_matches(tokens, normalized, limit)
+        if matches or len(normalized) < 3:
+            return matches
+        return self._rank_trigram_matches(normalized, limit)
+
+    def _rank_prefix_matches(
+            self, tokens: List[str], normalized: str, limit: int
+            ) -> List[NameMatch]:
+        """Ranks players whose name words start with every query word.
+
+        Players holding every query word as a whole word, or the whole
+        query as their name, come first and score 2.5 to 3.0, the other
+        ones score 2.0 to 2.5. Within both, the larger the share of the
+        name the query covers, the higher the score, exact names score
+        3.0.
+        """
+        exact_ids = set(self._token_ids.get(tokens[0], ()))
+        prefix_ids = self._prefix_ids(tokens[0])
+        for token in tokens[1:]:
+            if not prefix_ids:
+                break
+            exact_ids &= self._token_ids.get(token, set())
+            prefix_ids &= self._prefix_ids(token)
+        exact_ids |= self._token_ids.get(normalized, set())
+        ranked = [(2.5, key) for key in heapq.nsmallest(
+            limit, map(self._ranking.__getitem__, exact_ids))]
+        if len(ranked) < limit:
+            ranked += [(2.0, key) for key in heapq.nsmallest(
+                limit - len(ranked),
+                map(self._ranking.__getitem__, prefix_ids - exact_ids))]
+        return [NameMatch(player_id, name,
+                          base + len(normalized) / length / 2)
+                for base, (length, name, player_id) in ranked]
+
+    def _rank_trigram_matches(
+            self, normalized: str, limit: int
+            ) -> List[NameMatch]:
+        """Ranks players by the share of query trigrams they contain.
+
+        A player reaching MIN_TRIGRAM_SIMILARITY holds at least needed
+        query trigrams, so it is in the postings of one of the
+        len(query) - needed + 1 rarest query trigrams. Only these
+        postings are collected as candidates.
+        """
+        query_grams = sorted(
+            trigrams(normalized),
+            key=lambda gram: len(self._trigram_ids.get(gram, ()))
+        )
+        needed = math.ceil(MIN_TRIGRAM_SIMILARITY * len(query_grams))
+        candidates: Set[str] = set()
+        for gram in query_grams[:len(query_grams) - needed + 1]:
+            candidates.update(self._trigram_ids.get(gram, ()))
+        grams = set(query_grams)
+        scored = []
+        for player_id in candidates:
+            similarity = len(grams & self._keys[player_id][1]) / len(grams)
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                scored.append((-similarity, self._names[player_id],
+                               player_id))
+        return [NameMatch(player_id, name, -negative)
+                for negative, name, player_id in heapq.nsmallest(
+                    limit, scored)]
+
+    def __contains__(self, player_id: str) -> bool:
+        return player_id in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
@@ -0,0 +1,201 @@
+"""Dated snapshots of the player database.
+
+Every snapshot is stored as the field level delta against the previous
+snapshot, with a full keyframe every keyframe_interval snapshots so a
+lookup never replays more than keyframe_interval - 1 deltas. Files are
+gzip compressed JSON listed in an index.json of the snapshot directory.
+
+as_of(date) returns the players as of the latest snapshot at or before
+the date, e.g. to score a past week with the team, position and status
+players had at that time. Reconstructed snapshots are cached and later
+dates of the same keyframe are rebuilt from the closest cached one.
+"""
+import gzip
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+from threading import Lock
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Union
+
+from script.common import json_backend
+from script.players.sqlite_store import PlayerItems, player_items
+from script.players.sync import diff_players
+
+INDEX_FILE = 'index.json'
+KEYFRAME_INTERVAL = 7
+MAX_CACHED = 4
+
+Players = Mapping[str, Mapping[str, Any]]
+SnapshotDate = Union[date, str]
+
+
+def _write(path: Path, data: Any) -> None:
+    with gzip.open(path, "wb") as file:
+        file.write(json_backend.dumps(data))
+
+
+def _read(path: Path) -> Any:
+    with gzip.open(path, "rb") as file:
+        return json_backend.loads(file.read())
+
+
+def make_delta(previous: Players, current: Players) -> Dict[str, Any]:
+    """Returns the field level delta between two player databases."""
+    changes = diff_players(previous, current)
+    delta: Dict[str, Any] = {
+        'added': changes.added, 'changed': {}, 'unset': {},
+        'removed': changes.removed,
+    }
+    for player_id, fields in changes.changed_fields.items():
+        record = changes.changed[player_id]
+        delta['changed'][player_id] = {
+            field: record[field] for field in fields if field in record
+            }
+        unset = [field for field in fields if field not in record]
+        if unset:
+            delta['unset'][player_id] = unset
+    return delta
+
+
+def apply_delta(
+        players: Players, delta: Mapping[str, Any]
+        ) -> Dict[str, Dict[str, Any]]:
+    """Returns the players with a delta applied, players is unchanged."""
+    result: Dict[str, Any] = dict(players)
+    for player_id in delta['removed']:
+        result.pop(player_id, None)
+    result.update(delta['added'])
+    for player_id, fields in delta['changed'].items():
+        record = dict(result[player_id])
+        record.update(fields)
+        for field in delta['unset'].get(player_id, ()):
+            record.pop(field, None)
+        result[player_id] = record
+    return result
+
+
+class PlayerSnapshotStore:
+    """Delta compressed, dated snapshots of the player database.
+
+    directory (str): Directory holding the index and snapshot files.
+    keyframe_interval (int): Number of snapshots per full keyframe.
+    max_cached (int): Number of reconstructed snapshots kept in memory.
+    """
+    def __init__(
+            self, directory: str,
+            keyframe_interval: int = KEYFRAME_INTERVAL,
+            max_cached: int = MAX_CACHED
+            ) -> None:
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._keyframe_interval = max(1, keyframe_interval)
+        self._max_cached = max_cached
+        self._lock = Lock()
+        self._cache: "OrderedDict[str, Players]" = OrderedDict()
+        self._entries: List[Dict[str, Any]] = []
+        index_file = self._directory / INDEX_FILE
+        if index_file.exists():
+            with open(index_file, "rb") as file:
+                self._entries = json_backend.loads(file.read())
+
+    @property
+    def dates(self) -> List[str]:
+        """ISO dates of all snapshots, oldest first."""
+        return [entry['date'] for entry in self._entries]
+
+    def add_snapshot(
+            self, snapshot_date: SnapshotDate, players: PlayerItems
+            ) -> bool:
+        """Stores the players as of a date.
+
+        A snapshot of the latest date is replaced, earlier dates raise
+        ValueError. Returns true if the snapshot was stored as keyframe.
+        """
+        day = _iso_date(snapshot_date)
+        current = dict(player_items(players))
+        with self._lock:
+            if self._entries and day < self._entries[-1]['date']:
+                raise ValueError(
+                    f"Snapshot {day} is older than the latest snapshot "
+                    f"{self._entries[-1]['date']}."
+                    )
+            if self._entries and day == self._entries[-1]['date']:
+                self._entries.pop()
+                self._cache.pop(day, None)
+            previous = len(self._entries) - 1
+            keyframe = True
+            if previous >= 0:
+                segment = previous + 1 - self._keyframe_position(previous)
+                keyframe = segment >= self._keyframe_interval
+            if keyframe:
+                data: Any = current
+            else:
+                data = make_delta(self._reconstruct(previous), current)
+            file_name = f"{day}.json.gz"
+            _write(self._directory / file_name, data)
+            self._entries.append(
+                {'date': day, 'file': file_name, 'keyframe': keyframe}
+                )
+            with open(self._directory / INDEX_FILE, "wb") as file:
+                file.write(json_backend.dumps(self._entries, pretty=True))
+            self._remember(day, MappingProxyType(current))
+        return keyframe
+
+    def as_of(self, snapshot_date: SnapshotDate) -> Players:
+        """Returns the players of the latest snapshot at or before date.
+
+        Raises KeyError if there is no snapshot that old. The returned
+        mapping is shared with the cache and must not be modified.
+        """
+        day = _iso_date(snapshot_date)
+        with self._lock:
+            position = bisect_right(self.dates, day) - 1
+            if position < 0:
+                raise KeyError(f"No player snapshot at or before {day}.")
+            return self._reconstruct(position)
+
+    def _keyframe_position(self, position: int) -> int:
+        """Returns the position of the keyframe a snapshot is based on."""
+        while position > 0 and not self._entries[position]['keyframe']:
+            position -= 1
+        return position
+
+    def _reconstruct(self, position: int) -> Players:
+        """Rebuilds a snapshot from its keyframe or a cached snapshot."""
+        day = self._entries[position]['date']
+        cached = self._cache.get(day)
+        if cached is not None:
+            self._cache.move_to_end(day)
+            return cached
+        start = position
+        players: Optional[Players] = None
+        keyframe = self._keyframe_position(position)
+        while start > keyframe:
+            players = self._cache.get(self._entries[start - 1]['date'])
+            if players is not None:
+                break
+            start -= 1
+        if players is None:
+            players = _read(self._directory / self._entries[keyframe]['file'])
+            start = keyframe + 1
+        for entry in self._entries[start:position + 1]:
+            delta = _read(self._directory / entry['file'])
+            players = apply_delta(players, delta)
+        players = MappingProxyType(players)
+        self._remember(day, players)
+        return players
+
+    def _remember(self, day: str, players: Players) -> None:
+        self._cache[day] = players
+        self._cache.move_to_end(day)
+        while len(self._cache) > self._max_cached:
+            self._cache.popitem(last=False)
+
+
+def _iso_date(snapshot_date: SnapshotDate) -> str:
+    """Returns the ISO date of a date or ISO date string."""
+    if isinstance(snapshot_date, date):
+        return snapshot_date.isoformat()
+    return date.fromisoformat(snapshot_date).isoformat()
@@ -0,0 +1,197 @@
+"""SQLite-backed player database with secondary indexes.
+
+The /players/nfl dump is imported into a players table holding the
+full record plus indexed columns for position, team, status and
+years_exp, and a fantasy_positions table indexed per position.
+Filters like "all active rookie WRs" become indexed lookups instead of
+scanning every record in Python.
+"""
+import argparse
+import sqlite3
+from threading import Lock
+from typing import (Any, Dict, Iterable, Iterator, List, Mapping, Optional,
+                    Tuple, Union)
+
+from script.common import json_backend
+from script.players.json_store import read_json_players
+
+COLUMNS = (
+    'full_name', 'position', 'team', 'status', 'years_exp', 'age',
+    'number', 'depth_chart_order',
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    player_id TEXT PRIMARY KEY,
+    full_name TEXT,
+    position TEXT,
+    team TEXT,
+    status TEXT,
+    years_exp INTEGER,
+    age INTEGER,
+    number INTEGER,
+    depth_chart_order INTEGER,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fantasy_positions (
+    player_id TEXT NOT NULL REFERENCES players(player_id) ON DELETE CASCADE,
+    fantasy_position TEXT NOT NULL,
+    PRIMARY KEY (player_id, fantasy_position)
+);
+CREATE INDEX IF NOT EXISTS players_position ON players(position);
+CREATE INDEX IF NOT EXISTS players_team ON players(team);
+CREATE INDEX IF NOT EXISTS players_status ON players(status);
+CREATE INDEX IF NOT EXISTS players_years_exp ON players(years_exp);
+CREATE INDEX IF NOT EXISTS fantasy_positions_position
+    ON fantasy_positions(fantasy_position, player_id);
+"""
+
+PlayerItems = Union[Mapping[str, Mapping[str, Any]],
+                    Iterable[Tuple[str, Mapping[str, Any]]]]
+
+
+def player_items(
+        players: PlayerItems
+        ) -> Iterable[Tuple[str, Mapping[str, Any]]]:
+    """Returns (player_id, record) pairs of a mapping or pair iterable."""
+    if isinstance(players, Mapping):
+        return players.items()
+    return players
+
+
+class SQLitePlayerStore(Mapping[str, Dict[str, Any]]):
+    """Player database stored in SQLite, keyed by player ID."""
+    def __init__(self, database_file: str) -> None:
+        self._connection = sqlite3.connect(
+            str(database_file), check_same_thread=False
+            )
+        self._connection.execute('PRAGMA foreign_keys = ON')
+        self._connection.executescript(_SCHEMA)
+        self._lock = Lock()
+
+    def import_players(self, players: PlayerItems) -> int:
+        """Replaces all players with the /players/nfl dump.
+
+        Returns the number of imported players.
+        """
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM fantasy_positions')
+            self._connection.execute('DELETE FROM players')
+            return self._insert(player_items(players))
+
+    def upsert_players(self, players: PlayerItems) -> int:
+        """Inserts or replaces given players, returns their number."""
+        with self._lock, self._connection:
+            return self._insert(player_items(players))
+
+    def delete_players(self, player_ids: Iterable[str]) -> int:
+        """Removes given players, returns the number of removed players."""
+        with self._lock, self._connection:
+            cursor = self._connection.executemany(
+                'DELETE FROM players WHERE player_id = ?',
+                ((player_id,) for player_id in player_ids)
+                )
+            return cursor.rowcount
+
+    def _insert(self, items: Iterable[Tuple[str, Mapping[str, Any]]]) -> int:
+        count = 0
+        for player_id, record in items:
+            self._connection.execute(
+                'DELETE FROM players WHERE player_id = ?', (player_id,)
+                )
+            self._connection.execute(
+                f'INSERT INTO players (player_id, {", ".join(COLUMNS)}, record)'
+                f' VALUES (?, {", ".join("?" * len(COLUMNS))}, ?)',
+                (player_id,
+                 *(record.get(column) for column in COLUMNS),
+                 json_backend.dumps(record).decode('utf-8'))
+                )
+            self._connection.executemany(
+                'INSERT OR IGNORE INTO fantasy_positions VALUES (?, ?)',
+                ((player_id, position)
+                 for position in record.get('fantasy_positions') or ())
+                )
+            count += 1
+        return count
+
+    def query(
+            self, position: Optional[str] = None,
+            team: Optional[str] = None,
+            status: Optional[str] = None,
+            fantasy_position: Optional[str] = None,
+            years_exp: Optional[int] = None
+            ) -> List[str]:
+        """Returns the IDs of players matching all given filters.
+
+        Example, all active rookie WRs:
+            store.query(position='WR', status='Active', years_exp=0)
+        """
+        conditions = []
+        parameters: List[Any] = []
+        for column, value in (('position', position), ('team', team),
+                              ('status', status), ('years_exp', years_exp)):
+            if value is not None:
+                conditions.append(f'p.{column} = ?')
+                parameters.append(value)
+        join = ''
+        if fantasy_position is not None:
+            join = 'JOIN fantasy_positions f ON f.player_id = p.player_id'
+            conditions.append('f.fantasy_position = ?')
+            parameters.append(fantasy_position)
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+        with self._lock:
+            rows = self._connection.execute(
+                f'SELECT p.player_id FROM players p {join} {where} '
+                'ORDER BY p.player_id', parameters
+                ).fetchall()
+        return [row[0] for row in rows]
+
+    def __getitem__(self, player_id: str) -> Dict[str, Any]:
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT record FROM players WHERE player_id = ?', (player_id,)
+                ).fetchone()
+        if row is None:
+            raise KeyError(player_id)
+        return json_backend.loads(row[0])
+
+    def __contains__(self, player_id: object) -> bool:
+        with self._lock:
+            return self._connection.execute(
+                'SELECT 1 FROM players WHERE player_id = ?', (player_id,)
+                ).fetchone() is not None
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT player_id FROM players ORDER BY player_id'
+                ).fetchall()
+        return iter(row[0] for row in rows)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                'SELECT COUNT(*) FROM players'
+                ).fetchone()[0]
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        self._connection.close()
+
+
+def main(database: str, output: str) -> None:
+    """Entry point for importing the JSON player database."""
+    store = SQLitePlayerStore(output)
+    print(store.import_players(read_json_players(database)))
+    store.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default='script/resources/players_db.json',
+                        help='JSON player database input')
+    parser.add_argument('--output',
+                        default='script/resources/players_db.sqlite',
+                        help='SQLite player database output')
+    args = parser.parse_args()
+    main(args.db, args.output)
@@ -0,0 +1,174 @@
+"""Incremental synchronisation of the player database.
+
+The fetched /players/nfl dump is diffed per player against the stored
+database and only added, changed or removed records are written. Every
+sync appends one compact line to a change log and notifies listeners
+with the changed player IDs, so downstream caches only drop players
+that actually changed.
+
+A fetch without players or one removing more than max_removed_share
+of the stored players is refused with UnsafeSyncError and nothing is
+written, since that is a failed download far more often than a real
+change.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set
+
+from script.common import json_backend
+from script.players.json_store import append_json_changes, read_json_players
+from script.players.sqlite_store import (PlayerItems, SQLitePlayerStore,
+                                         player_items)
+
+SQLITE_SUFFIXES = ('.sqlite', '.db')
+MAX_REMOVED_SHARE = 0.1
+
+
+class UnsafeSyncError(ValueError):
+    """A fetched player list that must not be applied."""
+
+
+@dataclass
+class PlayerChanges:
+    """Per-player difference between two player databases."""
+    added: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    changed: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    changed_fields: Dict[str, List[str]] = field(default_factory=dict)
+    removed: List[str] = field(default_factory=list)
+
+    @property
+    def player_ids(self) -> Set[str]:
+        """IDs of all added, changed and removed players."""
+        return set(self.added) | set(self.changed) | set(self.removed)
+
+    def is_empty(self) -> bool:
+        """Returns true if nothing changed."""
+        return not (self.added or self.changed or self.removed)
+
+    def to_log_entry(self) -> Dict[str, Any]:
+        """Returns a compact change log entry."""
+        return {
+            'synced_at': datetime.now(timezone.utc).isoformat(
+                timespec='seconds'),
+            'added': sorted(self.added),
+            'changed': dict(sorted(self.changed_fields.items())),
+            'removed': sorted(self.removed),
+        }
+
+
+def diff_players(
+        stored: Mapping[str, Mapping[str, Any]], fetched: PlayerItems
+        ) -> PlayerChanges:
+    """Diffs fetched player records against the stored ones."""
+    changes = PlayerChanges()
+    seen = set()
+    for player_id, record in player_items(fetched):
+        seen.add(player_id)
+        old_record = stored.get(player_id)
+        if old_record is None:
+            changes.added[player_id] = dict(record)
+            continue
+        old_record = dict(old_record)
+        if old_record != record:
+            changes.changed[player_id] = dict(record)
+            changes.changed_fields[player_id] = sorted(
+                key for key in set(old_record) | set(record)
+                if old_record.get(key) != record.get(key)
+            )
+    changes.removed = [
+        player_id for player_id in stored if player_id not in seen
+        ]
+    return changes
+
+
+SyncListener = Callable[[PlayerChanges], None]
+
+
+class PlayerDBSync:
+    """Applies fetched player records to a stored player database.
+
+    database_file (str): SQLite (.sqlite) or JSON player database.
+    SQLite databases are updated in place record by record. The changed
+    records of JSON databases are appended to their journal, which is
+    only merged into the file once it has grown, see
+    script.players.json_store.
+
+    changelog_file (Optional[str]): JSON lines file the changes of every
+    sync are appended to.
+
+    max_removed_share (float): Largest share of the stored players a
+    sync may remove.
+    """
+    def __init__(
+            self, database_file: str,
+            changelog_file: Optional[str] = None,
+            listeners: Iterable[SyncListener] = (),
+            max_removed_share: float = MAX_REMOVED_SHARE
+            ) -> None:
+        self.database_file = str(database_file)
+        self.changelog_file = changelog_file
+        self.max_removed_share = max_removed_share
+        self._listeners: List[SyncListener] = list(listeners)
+
+    def add_listener(self, listener: SyncListener) -> None:
+        """Registers a callback receiving the changes of every sync."""
+        self._listeners.append(listener)
+
+    def sync(self, fetched: PlayerItems) -> PlayerChanges:
+        """Diffs and applies fetched player records.
+
+        Returns the applied changes. Raises UnsafeSyncError without
+        writing anything if the fetch holds no players or removes too
+        many of them.
+        """
+        if Path(self.database_file).suffix in SQLITE_SUFFIXES:
+            changes = self._sync_sqlite(fetched)
+        else:
+            changes = self._sync_json(fetched)
+        if self.changelog_file is not None:
+            with open(self.changelog_file, "ab") as file:
+                file.write(json_backend.dumps(changes.to_log_entry()) + b'\n')
+        if not changes.is_empty():
+            for listener in self._listeners:
+                listener(changes)
+        return changes
+
+    def _check(self, stored: int, changes: PlayerChanges) -> None:
+        """Refuses empty fetches and mass removals."""
+        fetched = stored - len(changes.removed) + len(changes.added)
+        if fetched == 0:
+            raise UnsafeSyncError(
+                "Fetched no players, refusing to empty the player DB."
+                )
+        if len(changes.removed) > self.max_removed_share * stored:
+            raise UnsafeSyncError(
+                f"Sync would remove {len(changes.removed)} of {stored} "
+                f"players, more than {self.max_removed_share:.0%}."
+                )
+
+    def _sync_sqlite(self, fetched: PlayerItems) -> PlayerChanges:
+        store = SQLitePlayerStore(self.database_file)
+        try:
+            changes = diff_players(store, fetched)
+            self._check(len(store), changes)
+            store.upsert_players({**changes.added, **changes.changed})
+            store.delete_players(changes.removed)
+        finally:
+            store.close()
+        return changes
+
+    def _sync_json(self, fetched: PlayerItems) -> PlayerChanges:
+        stored: Dict[str, Any] = {}
+        try:
+            stored = read_json_players(self.database_file)
+        except FileNotFoundError:
+            pass
+        changes = diff_players(stored, fetched)
+        self._check(len(stored), changes)
+        if not changes.is_empty():
+            append_json_changes(self.database_file,
+                                {**changes.added, **changes.changed},
+                                changes.removed)
+        return changes
+
@@ -0,0 +1,149 @@
+"""Scoring one week of stats under the rules of many leagues.
+
+The weight vectors of all distinct scoring configurations are stacked
+into a stats x configurations matrix, so a week is scored for every
+league with a single matrix product. Leagues with equivalent
+scoring_settings share one column, see scoring_fingerprint().
+"""
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from script.scoring.engine import (SettingsLike, StatMatrix, StatVocabulary,
+                                   WeeklyStats, compile_weights,
+                                   scoring_fingerprint)
+
+
+class LeaguePoints:
+    """Points of players under the scoring of several leagues.
+
+    values is the players x leagues table, columns of leagues with
+    equivalent scoring share the same scored column.
+    """
+    def __init__(
+            self, player_ids: Sequence[str], league_ids: Sequence[str],
+            unique_points: np.ndarray, league_columns: np.ndarray
+            ) -> None:
+        self._player_ids = list(player_ids)
+        self._league_ids = list(league_ids)
+        self._rows = {
+            player_id: row for row, player_id in enumerate(self._player_ids)
+            }
+        self._leagues = {
+            league_id: column
+            for column, league_id in enumerate(self._league_ids)
+            }
+        self._unique_points = unique_points
+        self._league_columns = league_columns
+
+    @property
+    def player_ids(self) -> List[str]:
+        """Player IDs in row order."""
+        return self._player_ids
+
+    @property
+    def league_ids(self) -> List[str]:
+        """League IDs in column order."""
+        return self._league_ids
+
+    @property
+    def values(self) -> np.ndarray:
+        """The players x leagues points table."""
+        return self._unique_points[:, self._league_columns]
+
+    @property
+    def unique_points(self) -> np.ndarray:
+        """The players x distinct scoring configurations points table."""
+        return self._unique_points
+
+    def league_points(self, league_id: str) -> np.ndarray:
+        """Points of all players in a league, in player_ids order."""
+        column = self._league_columns[self._leagues[league_id]]
+        return self._unique_points[:, column]
+
+    def league(self, league_id: str) -> Dict[str, float]:
+        """Points of all players in a league keyed by player ID."""
+        return dict(zip(self._player_ids,
+                        self.league_points(league_id).tolist()))
+
+    def player(self, player_id: str) -> Dict[str, float]:
+        """Points of a player keyed by league ID, empty without stats."""
+        row = self._rows.get(player_id)
+        if row is None:
+            return {}
+        points = self._unique_points[row, self._league_columns].tolist()
+        return dict(zip(self._league_ids, points))
+
+
+class MultiLeagueScorer:
+    """Scores stat matrices under the scoring_settings of many leagues.
+
+    leagues (Mapping[str, SettingsLike]): scoring_settings by league ID.
+    vocabulary (StatVocabulary): Stat columns, defaults to the default
+    vocabulary extended by the keys of all leagues.
+    """
+    def __init__(
+            self, leagues: Mapping[str, SettingsLike],
+            vocabulary: Optional[StatVocabulary] = None
+            ) -> None:
+        if vocabulary is None:
+            vocabulary = StatVocabulary.for_settings(*leagues.values())
+        self._vocabulary = vocabulary
+        self._league_ids = list(leagues)
+        self._fingerprints: List[str] = []
+        columns: Dict[str, int] = {}
+        weights: List[np.ndarray] = []
+        league_columns = []
+        for settings in leagues.values():
+            fingerprint = scoring_fingerprint(settings)
+            column = columns.get(fingerprint)
+            if column is None:
+                column = columns[fingerprint] = len(weights)
+                weights.append(compile_weights(settings, vocabulary))
+                self._fingerprints.append(fingerprint)
+            league_columns.append(column)
+        self._weights = np.column_stack(weights) if weights \
+            else np.zeros((len(vocabulary), 0))
+        self._league_columns = np.array(league_columns, dtype=np.intp)
+        self._columns_by_league = dict(zip(self._league_ids, league_columns))
+
+    @property
+    def vocabulary(self) -> StatVocabulary:
+        """Stat columns of the weight matrix."""
+        return self._vocabulary
+
+    @property
+    def weights(self) -> np.ndarray:
+        """The stats x distinct scoring configurations weight matrix."""
+        return self._weights
+
+    @property
+    def fingerprints(self) -> List[str]:
+        """Fingerprints of the distinct scoring configurations."""
+        return self._fingerprints
+
+    @property
+    def league_ids(self) -> List[str]:
+        """IDs of the scored leagues."""
+        return self._league_ids
+
+    def league_column(self, league_id: str) -> int:
+        """Returns the weight matrix column scoring a league."""
+        return self._columns_by_league[league_id]
+
+    def stat_matrix(self, stats: WeeklyStats) -> StatMatrix:
+        """Builds a stat matrix over the vocabulary of this scorer."""
+        return StatMatrix.from_stats(stats, self._vocabulary)
+
+    def score(self, stats: StatMatrix) -> LeaguePoints:
+        """Scores a stat matrix for every league at once."""
+        if stats.vocabulary != self._vocabulary:
+            raise ValueError("Stat matrix and scorer use different stat "
+                             "vocabularies, see stat_matrix().")
+        return LeaguePoints(stats.player_ids, self._league_ids,
+                            stats.values @ self._weights,
+                            self._league_columns)
+
+    def score_stats(self, stats: WeeklyStats) -> LeaguePoints:
+        """Scores a week's {player_id: {stat: value}} for every league."""
+        return self.score(self.stat_matrix(stats))
@@ -0,0 +1,178 @@
+"""Bucket and threshold scoring rules.
+
+Some scoring_settings score ranges of a raw value instead of the value
+itself:
+    - buckets, exactly one bin per value: points allowed by a team
+      defense (pts_allow_0 ... pts_allow_35p), field goal distances
+      (fgm_0_19 ... fgm_50p) or yardage games (bonus_rush_yd_100 for
+      100-199 yards, bonus_rush_yd_200 for 200 or more),
+    - thresholds, every threshold a value reaches: long touchdowns
+      (rush_td_40p, rush_td_50p).
+
+Sleeper reports most of these as indicator stats, but raw values like
+pts_allow or per kick distances are turned into the same indicators
+here. All values of a rule are binned at once with np.searchsorted
+over the sorted bin edges, for the whole slate.
+
+A raw value is either a number or a list of per event numbers, e.g.
+{'fgm_distances': [23, 47, 52]}.
+"""
+from dataclasses import dataclass
+from typing import (TYPE_CHECKING, Dict, FrozenSet, List, Sequence, Tuple,
+                    Union)
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from script.scoring.engine import StatVocabulary
+
+
+@dataclass(frozen=True)
+class BucketRule:
+    """Counts a value in [edges[i], edges[i + 1]) as stats[i].
+
+    Values below the first edge are not counted, the last bin is open.
+    """
+    source: str
+    edges: Tuple[float, ...]
+    stats: Tuple[str, ...]
+
+    def __post_init__(self) -> None:
+        _check_rule(self.source, self.edges, self.stats)
+
+    def counts(self, rows: np.ndarray, values: np.ndarray,
+               row_count: int) -> np.ndarray:
+        """Returns the row_count x stats counts of binned event values."""
+        counts = np.zeros((row_count, len(self.stats)))
+        bins = np.searchsorted(self.edges, values, side='right') - 1
+        counted = bins >= 0
+        np.add.at(counts, (rows[counted], bins[counted]), 1)
+        return counts
+
+
+@dataclass(frozen=True)
+class ThresholdRule:
+    """Counts a value reaching thresholds[i] as stats[i], cumulative."""
+    source: str
+    thresholds: Tuple[float, ...]
+    stats: Tuple[str, ...]
+
+    def __post_init__(self) -> None:
+        _check_rule(self.source, self.thresholds, self.stats)
+
+    def counts(self, rows: np.ndarray, values: np.ndarray,
+               row_count: int) -> np.ndarray:
+        """Returns the row_count x stats counts of event values."""
+        counts = np.zeros((row_count, len(self.stats)))
+        reached = np.searchsorted(self.thresholds, values, side='right')
+        counted = reached > 0
+        np.add.at(counts, (rows[counted], reached[counted] - 1), 1)
+        return np.cumsum(counts[:, ::-1], axis=1)[:, ::-1]
+
+
+ScoringRule = Union[BucketRule, ThresholdRule]
+
+
+def _check_rule(source: str, edges: Tuple[float, ...],
+                stats: Tuple[str, ...]) -> None:
+    if len(edges) != len(stats):
+        raise ValueError(f"Rule {source!r} needs one stat per edge.")
+    if list(edges) != sorted(edges):
+        raise ValueError(f"Edges of rule {source!r} must be sorted.")
+
+
+_FIELD_GOAL_EDGES = (0, 20, 30, 40, 50)
+
+DEFAULT_RULES: Tuple[ScoringRule, ...] = (
+    BucketRule('pts_allow', (0, 1, 7, 14, 21, 28, 35), (
+        'pts_allow_0', 'pts_allow_1_6', 'pts_allow_7_13', 'pts_allow_14_20',
+        'pts_allow_21_27', 'pts_allow_28_34', 'pts_allow_35p')),
+    BucketRule('yds_allow', (0, 100, 200, 300, 350, 400, 450, 500, 550), (
+        'yds_allow_0_100', 'yds_allow_100_199', 'yds_allow_200_299',
+        'yds_allow_300_349', 'yds_allow_350_399', 'yds_allow_400_449',
+        'yds_allow_450_499', 'yds_allow_500_549', 'yds_allow_550p')),
+    BucketRule('fgm_distances', _FIELD_GOAL_EDGES, (
+        'fgm_0_19', 'fgm_20_29', 'fgm_30_39', 'fgm_40_49', 'fgm_50p')),
+    BucketRule('fgmiss_distances', _FIELD_GOAL_EDGES, (
+        'fgmiss_0_19', 'fgmiss_20_29', 'fgmiss_30_39', 'fgmiss_40_49',
+        'fgmiss_50p')),
+    BucketRule('rec_lengths', (0, 5, 10, 20, 30, 40), (
+        'rec_0_4', 'rec_5_9', 'rec_10_19', 'rec_20_29', 'rec_30_39',
+        'rec_40p')),
+    ThresholdRule('pass_td_lengths', (40, 50), ('pass_td_40p', 'pass_td_50p')),
+    ThresholdRule('rush_td_lengths', (40, 50), ('rush_td_40p', 'rush_td_50p')),
+    ThresholdRule('rec_td_lengths', (40, 50), ('rec_td_40p', 'rec_td_50p')),
+    BucketRule('pass_yd', (300, 400),
+               ('bonus_pass_yd_300', 'bonus_pass_yd_400')),
+    BucketRule('rush_yd', (100, 200),
+               ('bonus_rush_yd_100', 'bonus_rush_yd_200')),
+    BucketRule('rec_yd', (100, 200),
+               ('bonus_rec_yd_100', 'bonus_rec_yd_200')),
+)
+
+
+def scored_columns(
+        rule: ScoringRule, vocabulary: "StatVocabulary"
+        ) -> Tuple[List[int], List[int]]:
+    """Returns the indexes of the rule stats in the vocabulary and their
+    vocabulary columns."""
+    indexes: List[int] = []
+    columns: List[int] = []
+    for index, stat in enumerate(rule.stats):
+        column = vocabulary.column(stat)
+        if column is not None:
+            indexes.append(index)
+            columns.append(column)
+    return indexes, columns
+
+
+class RuleEvents:
+    """Raw values of the rules collected while reading a week's stats."""
+    def __init__(self, rules: Sequence[ScoringRule]) -> None:
+        self._rules: Dict[str, ScoringRule] = {
+            rule.source: rule for rule in rules
+            }
+        self._rows: Dict[str, List[int]] = {
+            source: [] for source in self._rules
+            }
+        self._event_rows: Dict[str, List[int]] = {
+            source: [] for source in self._rules
+            }
+        self._values: Dict[str, List[float]] = {
+            source: [] for source in self._rules
+            }
+
+    @property
+    def sources(self) -> FrozenSet[str]:
+        """Stat keys holding raw values of a rule."""
+        return frozenset(self._rules)
+
+    def add(self, source: str, row: int,
+            value: Union[float, Sequence[float], None]) -> None:
+        """Adds the raw value of a rule source of a matrix row."""
+        if value is None:
+            return
+        rows = self._rows[source]
+        rows.append(row)
+        events = value if isinstance(value, (list, tuple)) else (value,)
+        self._event_rows[source].extend([len(rows) - 1] * len(events))
+        self._values[source].extend(events)
+
+    def apply(self, matrix: np.ndarray,
+              vocabulary: "StatVocabulary") -> None:
+        """Writes the derived stats into the rows with a raw value.
+
+        Derived stats replace reported indicator stats of these rows,
+        so nothing is counted twice.
+        """
+        for source, rule in self._rules.items():
+            rows = self._rows[source]
+            if not rows:
+                continue
+            counts = rule.counts(
+                np.array(self._event_rows[source], dtype=np.intp),
+                np.array(self._values[source], dtype=float), len(rows)
+                )
+            indexes, columns = scored_columns(rule, vocabulary)
+            if columns:
+                matrix[np.ix_(rows, columns)] = counts[:, indexes]
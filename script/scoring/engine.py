@@ -0,0 +1,298 @@
+"""Vectorized fantasy scoring.
+
+Sleeper scores a player as the sum of every weekly stat times the
+league's scoring_settings weight of the same key. Bucketed rules like
+pts_allow_7_13 or fgm_40_49 are counted as stats of their own, so the
+score of a week is linear in the stats:
+
+    points = stats @ weights
+
+A league's scoring_settings are compiled into a dense weight vector
+over a fixed stat vocabulary and a week's stats into a players x stats
+matrix, so scoring every player of a week is one matrix-vector product.
+"""
+import hashlib
+import json
+from typing import (Any, Dict, Iterable, List, Mapping, Optional, Sequence,
+                    Tuple, Union)
+
+import numpy as np
+
+from script.leagues.leagues import ScoringSettings
+from script.scoring.buckets import DEFAULT_RULES, RuleEvents, ScoringRule
+
+DEFAULT_STATS: Tuple[str, ...] = (
+    # Passing
+    'pass_yd', 'pass_td', 'pass_2pt', 'pass_int', 'pass_int_td',
+    'pass_cmp', 'pass_att', 'pass_inc', 'pass_sack', 'pass_fd',
+    'pass_cmp_40p', 'pass_td_40p', 'pass_td_50p',
+    'bonus_pass_yd_300', 'bonus_pass_yd_400', 'bonus_pass_cmp_25',
+    # Rushing
+    'rush_yd', 'rush_td', 'rush_2pt', 'rush_att', 'rush_fd',
+    'rush_40p', 'rush_td_40p', 'rush_td_50p',
+    'bonus_rush_yd_100', 'bonus_rush_yd_200', 'bonus_rush_att_20',
+    # Receiving
+    'rec', 'rec_yd', 'rec_td', 'rec_2pt', 'rec_fd', 'rec_40p',
+    'rec_td_40p', 'rec_td_50p', 'rec_0_4', 'rec_5_9', 'rec_10_19',
+    'rec_20_29', 'rec_30_39', 'bonus_rec_yd_100', 'bonus_rec_yd_200',
+    'bonus_rec_rb', 'bonus_rec_wr', 'bonus_rec_te',
+    # Fumbles
+    'fum', 'fum_lost', 'fum_rec', 'fum_rec_td', 'ff',
+    # Team defense and IDP
+    'def_td', 'def_st_td', 'def_st_ff', 'def_st_fum_rec', 'def_2pt',
+    'def_pass_def', 'int', 'int_ret_yd', 'sack', 'sack_yd', 'safe',
+    'blk_kick', 'tkl', 'tkl_solo', 'tkl_ast', 'tkl_loss', 'qb_hit',
+    'pts_allow_0', 'pts_allow_1_6', 'pts_allow_7_13', 'pts_allow_14_20',
+    'pts_allow_21_27', 'pts_allow_28_34', 'pts_allow_35p',
+    'yds_allow_0_100', 'yds_allow_100_199', 'yds_allow_200_299',
+    'yds_allow_300_349', 'yds_allow_350_399', 'yds_allow_400_449',
+    'yds_allow_450_499', 'yds_allow_500_549', 'yds_allow_550p',
+    # Special teams
+    'st_td', 'st_ff', 'st_fum_rec', 'kr_yd', 'pr_yd',
+    # Kicking
+    'fgm', 'fgm_yds', 'fgm_0_19', 'fgm_20_29', 'fgm_30_39', 'fgm_40_49',
+    'fgm_50p', 'fgmiss', 'fgmiss_0_19', 'fgmiss_20_29', 'fgmiss_30_39',
+    'fgmiss_40_49', 'fgmiss_50p', 'xpm', 'xpmiss',
+)
+
+SettingsLike = Union[ScoringSettings, Mapping[str, float]]
+WeeklyStats = Mapping[str, Mapping[str, Any]]
+
+
+def settings_mapping(scoring_settings: SettingsLike) -> Mapping[str, float]:
+    """Returns the raw scoring_settings of a ScoringSettings or mapping."""
+    if isinstance(scoring_settings, ScoringSettings):
+        return scoring_settings.settings
+    return scoring_settings
+
+
+def scoring_fingerprint(scoring_settings: SettingsLike) -> str:
+    """Returns a stable hash of the scoring rules.
+
+    Key order, int versus float weights and zero weights do not change
+    the fingerprint, so equivalent settings share it. The rules are
+    encoded with the standard library json module, not json_backend,
+    so the fingerprint does not depend on the installed JSON backend.
+    """
+    rules = sorted(
+        (stat, float(weight))
+        for stat, weight in settings_mapping(scoring_settings).items()
+        if weight
+    )
+    encoded = json.dumps(rules, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class StatVocabulary:
+    """Fixed order of stat keys, the columns of stat matrices."""
+    def __init__(self, stats: Iterable[str] = DEFAULT_STATS) -> None:
+        self._stats: Tuple[str, ...] = tuple(dict.fromkeys(stats))
+        self._columns: Dict[str, int] = {
+            stat: column for column, stat in enumerate(self._stats)
+            }
+
+    @classmethod
+    def for_settings(
+            cls, *scoring_settings: SettingsLike
+            ) -> "StatVocabulary":
+        """Returns the default vocabulary extended by all setting keys."""
+        stats = list(DEFAULT_STATS)
+        for settings in scoring_settings:
+            stats.extend(settings_mapping(settings))
+        return cls(stats)
+
+    @property
+    def stats(self) -> Tuple[str, ...]:
+        """Stat keys in column order."""
+        return self._stats
+
+    def column(self, stat: str) -> Optional[int]:
+        """Returns the column of a stat, None if not in the vocabulary."""
+        return self._columns.get(stat)
+
+    def __contains__(self, stat: str) -> bool:
+        return stat in self._columns
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, StatVocabulary) and \
+            self._stats == other._stats
+
+    def __hash__(self) -> int:
+        return hash(self._stats)
+
+
+DEFAULT_VOCABULARY = StatVocabulary()
+
+
+def compile_weights(
+        scoring_settings: SettingsLike,
+        vocabulary: StatVocabulary = DEFAULT_VOCABULARY
+        ) -> np.ndarray:
+    """Compiles scoring_settings into a weight vector over a vocabulary.
+
+    Settings of stats outside the vocabulary are ignored, see
+    unscored_settings().
+    """
+    weights = np.zeros(len(vocabulary))
+    for stat, weight in settings_mapping(scoring_settings).items():
+        column = vocabulary.column(stat)
+        if column is not None and weight is not None:
+            weights[column] = weight
+    return weights
+
+
+def unscored_settings(
+        scoring_settings: SettingsLike,
+        vocabulary: StatVocabulary = DEFAULT_VOCABULARY
+        ) -> List[str]:
+    """Returns the setting keys a vocabulary cannot score."""
+    return sorted(stat for stat in settings_mapping(scoring_settings)
+                  if stat not in vocabulary)
+
+
+class StatMatrix:
+    """Weekly stats of players as a dense players x stats matrix."""
+    def __init__(
+            self, player_ids: Sequence[str], values: np.ndarray,
+            vocabulary: StatVocabulary = DEFAULT_VOCABULARY
+            ) -> None:
+        if values.shape != (len(player_ids), len(vocabulary)):
+            raise ValueError(
+                f"Stat matrix of shape {values.shape} does not match "
+                f"{len(player_ids)} players and {len(vocabulary)} stats."
+                )
+        self._player_ids: List[str] = list(player_ids)
+        self._rows: Dict[str, int] = {
+            player_id: row for row, player_id in enumerate(self._player_ids)
+            }
+        self._values = values
+        self._vocabulary = vocabulary
+
+    @classmethod
+    def from_stats(
+            cls, stats: WeeklyStats,
+            vocabulary: StatVocabulary = DEFAULT_VOCABULARY,
+            rules: Sequence[ScoringRule] = DEFAULT_RULES
+            ) -> "StatMatrix":
+        """Builds the matrix of a week's {player_id: {stat: value}}.
+
+        Raw values of bucket and threshold rules, e.g. pts_allow or
+        fgm_distances, are binned into their indicator stats, see
+        script.scoring.buckets. Stats outside the vocabulary are dropped.
+        """
+        player_ids = list(stats)
+        rows: List[int] = []
+        columns: List[int] = []
+        values: List[float] = []
+        events = RuleEvents(rules)
+        sources = events.sources
+        column_of = vocabulary.column
+        for row, player_id in enumerate(player_ids):
+            for stat, value in stats[player_id].items():
+                if stat in sources:
+                    events.add(stat, row, value)
+                column = column_of(stat)
+                if column is not None and value:
+                    rows.append(row)
+                    columns.append(column)
+                    values.append(value)
+        matrix = np.zeros((len(player_ids), len(vocabulary)))
+        matrix[rows, columns] = values
+        events.apply(matrix, vocabulary)
+        return cls(player_ids, matrix, vocabulary)
+
+    @property
+    def player_ids(self) -> List[str]:
+        """Player IDs in row order."""
+        return self._player_ids
+
+    @property
+    def values(self) -> np.ndarray:
+        """The players x stats matrix."""
+        return self._values
+
+    @property
+    def vocabulary(self) -> StatVocabulary:
+        """Stat keys of the columns."""
+        return self._vocabulary
+
+    def row(self, player_id: str) -> Optional[int]:
+        """Returns the row of a player, None if the player has no stats."""
+        return self._rows.get(player_id)
+
+    def __len__(self) -> int:
+        return len(self._player_ids)
+
+
+class ScoringEngine:
+    """Scores stat matrices under one league's scoring_settings.
+
+    Example:
+        engine = ScoringEngine(league.scoring_settings)
+        points = engine.score_stats(parser_stats)
+    """
+    def __init__(
+            self, scoring_settings: SettingsLike,
+            vocabulary: StatVocabulary = DEFAULT_VOCABULARY
+            ) -> None:
+        self._vocabulary = vocabulary
+        self._weights = compile_weights(scoring_settings, vocabulary)
+        self._unscored = unscored_settings(scoring_settings, vocabulary)
+
+    @property
+    def weights(self) -> np.ndarray:
+        """Weight vector over the vocabulary."""
+        return self._weights
+
+    @property
+    def vocabulary(self) -> StatVocabulary:
+        """Stat keys of the weight vector."""
+        return self._vocabulary
+
+    @property
+    def unscored(self) -> List[str]:
+        """Setting keys outside the vocabulary, scored as zero."""
+        return self._unscored
+
+    def score(self, stats: StatMatrix) -> np.ndarray:
+        """Returns the points of every row of a stat matrix."""
+        if stats.vocabulary != self._vocabulary:
+            raise ValueError("Stat matrix and scoring engine use "
+                             "different stat vocabularies.")
+        return stats.values @ self._weights
+
+    def score_stats(self, stats: WeeklyStats) -> Dict[str, float]:
+        """Returns the points of a week's stats keyed by player ID."""
+        matrix = StatMatrix.from_stats(stats, self._vocabulary)
+        return dict(zip(matrix.player_ids, self.score(matrix).tolist()))
+
+    def validate(
+            self, stats: StatMatrix, players_points: Mapping[str, float],
+            tolerance: float = 0.01
+            ) -> Dict[str, Tuple[float, float]]:
+        """Compares computed points with the players_points of Sleeper.
+
+        Returns (computed, expected) of every player off by more than
+        tolerance. Players without stats are expected to score zero.
+        """
+        points = self.score(stats)
+        mismatches = {}
+        for player_id, expected in players_points.items():
+            row = stats.row(player_id)
+            computed = 0.0 if row is None else float(points[row])
+            if abs(computed - expected) > tolerance:
+                mismatches[player_id] = (computed, expected)
+        return mismatches
+
+
+def players_points_from_matchups(
+        matchups: Iterable[Mapping[str, Any]]
+        ) -> Dict[str, float]:
+    """Collects the players_points of a week's league matchups."""
+    players_points: Dict[str, float] = {}
+    for matchup in matchups:
+        players_points.update(matchup.get('players_points') or {})
+    return players_points
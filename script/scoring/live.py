@@ -0,0 +1,203 @@
+"""Incremental live scoring from stat deltas.
+
+Points are linear in the stats, so a stat change of a player changes
+the player's points in every league by the change times the weights:
+
+    points[player] += (new_stats - old_stats) @ weights
+
+LiveScorer keeps the stats and points of all players of a slate and
+the lineup totals of every tracked league. apply_deltas() only touches
+the rows of the changed players and the lineups they start in, instead
+of rescoring the whole slate for every poll. Bucket and threshold rules
+are re-binned for the changed player only.
+
+Incremental updates accumulate floating point rounding, load_stats()
+rescores from scratch, e.g. once per game.
+"""
+from typing import (Any, Dict, Iterable, List, Mapping, Optional, Sequence,
+                    Set, Tuple)
+
+import numpy as np
+
+from script.scoring.batch import MultiLeagueScorer
+from script.scoring.buckets import (DEFAULT_RULES, ScoringRule,
+                                    scored_columns)
+from script.scoring.engine import (SettingsLike, StatMatrix, StatVocabulary,
+                                   WeeklyStats)
+
+Lineups = Mapping[str, Mapping[str, Sequence[str]]]
+LineupKey = Tuple[str, str]
+
+_INITIAL_ROWS = 64
+
+
+def _add_raw(current: Any, change: Any) -> Any:
+    """Adds a raw rule value change, lists of events are extended."""
+    if isinstance(change, (list, tuple)):
+        return list(current or ()) + list(change)
+    return (current or 0) + change
+
+
+class LiveScorer:
+    """Live points of players and lineups across leagues.
+
+    leagues (Mapping[str, SettingsLike]): scoring_settings by league ID.
+    lineups (Lineups): Starters by roster ID by league ID.
+    vocabulary (StatVocabulary): Stat columns, see MultiLeagueScorer.
+    rules (Sequence[ScoringRule]): Bucket and threshold rules.
+    """
+    def __init__(
+            self, leagues: Mapping[str, SettingsLike],
+            lineups: Optional[Lineups] = None,
+            vocabulary: Optional[StatVocabulary] = None,
+            rules: Sequence[ScoringRule] = DEFAULT_RULES
+            ) -> None:
+        self._scorer = MultiLeagueScorer(leagues, vocabulary)
+        self._vocabulary = self._scorer.vocabulary
+        self._weights = self._scorer.weights
+        self._rules = list(rules)
+        self._rule_columns = {
+            rule.source: scored_columns(rule, self._vocabulary)
+            for rule in self._rules
+            }
+        self._rules_by_source = {rule.source: rule for rule in self._rules}
+        self._rows: Dict[str, int] = {}
+        self._stats = np.zeros((_INITIAL_ROWS, len(self._vocabulary)))
+        self._points = np.zeros((_INITIAL_ROWS, self._weights.shape[1]))
+        self._raw: List[Dict[str, Any]] = []
+        self._lineups: Dict[str, Dict[str, List[str]]] = {}
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._memberships: Dict[str, Set[LineupKey]] = {}
+        for league_id, rosters in (lineups or {}).items():
+            for roster_id, starters in rosters.items():
+                self.set_lineup(league_id, roster_id, starters)
+
+    @property
+    def league_ids(self) -> List[str]:
+        """IDs of the tracked leagues."""
+        return self._scorer.league_ids
+
+    def load_stats(self, stats: WeeklyStats) -> None:
+        """Scores a full slate from scratch, replacing all stats."""
+        matrix = StatMatrix.from_stats(stats, self._vocabulary, self._rules)
+        self._rows = {
+            player_id: row for row, player_id in enumerate(matrix.player_ids)
+            }
+        self._stats = matrix.values.copy()
+        self._points = self._stats @ self._weights
+        self._raw = [
+            {stat: value for stat, value in stats[player_id].items()
+             if stat in self._rules_by_source}
+            for player_id in matrix.player_ids
+            ]
+        for league_id, rosters in self._lineups.items():
+            for roster_id in rosters:
+                self._totals[league_id][roster_id] = \
+                    self._lineup_points(league_id, roster_id)
+
+    def set_lineup(
+            self, league_id: str, roster_id: str, starters: Iterable[str]
+            ) -> None:
+        """Tracks or replaces the starters of a roster in a league."""
+        self._scorer.league_column(league_id)
+        key = (league_id, roster_id)
+        for player_id in self._lineups.get(league_id, {}).get(roster_id, ()):
+            self._memberships.get(player_id, set()).discard(key)
+        starters = list(dict.fromkeys(starters))
+        self._lineups.setdefault(league_id, {})[roster_id] = starters
+        for player_id in starters:
+            self._memberships.setdefault(player_id, set()).add(key)
+        self._totals.setdefault(league_id, {})[roster_id] = \
+            self._lineup_points(league_id, roster_id)
+
+    def _lineup_points(self, league_id: str, roster_id: str) -> float:
+        column = self._scorer.league_column(league_id)
+        rows = [self._rows[player_id]
+                for player_id in self._lineups[league_id][roster_id]
+                if player_id in self._rows]
+        return float(self._points[rows, column].sum())
+
+    def _row(self, player_id: str) -> int:
+        """Returns the row of a player, adding a zero row if unknown."""
+        row = self._rows.get(player_id)
+        if row is not None:
+            return row
+        row = self._rows[player_id] = len(self._raw)
+        self._raw.append({})
+        if row >= len(self._stats):
+            size = max(_INITIAL_ROWS, 2 * len(self._stats))
+            self._stats = np.resize(self._stats, (size, self._stats.shape[1]))
+            self._points = np.resize(
+                self._points, (size, self._points.shape[1]))
+            self._stats[row:] = 0
+            self._points[row:] = 0
+        return row
+
+    def apply_deltas(self, deltas: WeeklyStats) -> Set[LineupKey]:
+        """Adds per player stat changes, e.g. {'4046': {'pass_yd': 12}}.
+
+        Raw rule values are added too, lists of events are extended.
+        Returns the (league ID, roster ID) of all lineups whose total
+        changed.
+        """
+        changed_lineups: Set[LineupKey] = set()
+        column_of = self._vocabulary.column
+        for player_id, delta in deltas.items():
+            row = self._row(player_id)
+            stats = self._stats[row]
+            before = stats.copy()
+            raw = self._raw[row]
+            rebin = []
+            for stat, change in delta.items():
+                if stat in self._rules_by_source:
+                    raw[stat] = _add_raw(raw.get(stat), change)
+                    rebin.append(stat)
+                column = column_of(stat)
+                if column is not None and \
+                        not isinstance(change, (list, tuple)):
+                    stats[column] += change
+            for source in rebin:
+                self._rebin(stats, source, raw[source])
+            difference = stats - before
+            changed = np.flatnonzero(difference)
+            if not changed.size:
+                continue
+            points = difference[changed] @ self._weights[changed]
+            self._points[row] += points
+            for league_id, roster_id in self._memberships.get(player_id, ()):
+                self._totals[league_id][roster_id] += float(
+                    points[self._scorer.league_column(league_id)])
+                changed_lineups.add((league_id, roster_id))
+        return changed_lineups
+
+    def _rebin(self, stats: np.ndarray, source: str, value: Any) -> None:
+        """Recomputes the derived stats of a rule for one player."""
+        indexes, columns = self._rule_columns[source]
+        if not columns:
+            return
+        events = value if isinstance(value, (list, tuple)) else (value,)
+        counts = self._rules_by_source[source].counts(
+            np.zeros(len(events), dtype=np.intp),
+            np.array(events, dtype=float), 1
+            )
+        stats[columns] = counts[0, indexes]
+
+    def points(self, player_id: str) -> Dict[str, float]:
+        """Points of a player keyed by league ID, empty without stats."""
+        row = self._rows.get(player_id)
+        if row is None:
+            return {}
+        return {
+            league_id: float(
+                self._points[row, self._scorer.league_column(league_id)])
+            for league_id in self.league_ids
+            }
+
+    def lineup_total(self, league_id: str, roster_id: str) -> float:
+        """Current points of a tracked lineup."""
+        return self._totals[league_id][roster_id]
+
+    def leaderboard(self, league_id: str) -> List[Tuple[str, float]]:
+        """(roster ID, total) of all tracked lineups, highest first."""
+        return sorted(self._totals.get(league_id, {}).items(),
+                      key=lambda item: (-item[1], item[0]))
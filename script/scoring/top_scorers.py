@@ -0,0 +1,140 @@
+"""Top scorers per position.
+
+The rows of a scored week are grouped by position once. A query picks
+the depth best rows of every selected position with np.partition,
+in linear time per group, and only sorts the picked rows. Rows tied
+with the last picked row are gathered before sorting, so ties are
+always broken the same way: by points, then by tie_break values
+(higher first), then by player ID.
+"""
+from typing import (Dict, Iterable, List, Mapping, NamedTuple, Optional,
+                    Sequence)
+
+import numpy as np
+
+from script.players.index import PlayerIndex
+from script.scoring.week_cache import ScoredWeek
+
+DEFAULT_POSITIONS = ('QB', 'RB', 'WR', 'TE', 'K', 'DEF')
+DEFAULT_DEPTH = 3
+
+
+class TopScorer(NamedTuple):
+    """A ranked player of a position."""
+    rank: int
+    player_id: str
+    points: float
+
+
+def top_k(
+        points: np.ndarray, k: int,
+        tie_keys: Sequence[np.ndarray] = (),
+        include_ties: bool = False
+        ) -> np.ndarray:
+    """Returns the indexes of the k highest points, best first.
+
+    tie_keys break ties, the last key first, lower values rank higher.
+    With include_ties, every index tied with the k-th is returned too.
+    """
+    if k <= 0 or not len(points):
+        return np.empty(0, dtype=np.intp)
+    if k < len(points):
+        cutoff = np.partition(points, len(points) - k)[len(points) - k]
+        candidates = np.flatnonzero(points >= cutoff)
+    else:
+        candidates = np.arange(len(points))
+    order = np.lexsort(
+        [key[candidates] for key in tie_keys] + [-points[candidates]]
+        )
+    ranked = candidates[order]
+    if include_ties and len(ranked) > k:
+        return ranked[points[ranked] >= points[ranked[k - 1]]]
+    return ranked[:k]
+
+
+class TopScorerQuery:
+    """Top-K players per position of one scored week.
+
+    player_ids (Sequence[str]): Player IDs of the scored rows.
+    points (np.ndarray): Points of the rows.
+    groups (Mapping[str, Iterable[str]]): Player IDs by position, e.g.
+    {'QB': index.lookup('position', 'QB')}. Players without points are
+    skipped.
+    tie_break (Mapping[str, float]): Optional values ranking tied
+    players, higher first, e.g. season points.
+    """
+    def __init__(
+            self, player_ids: Sequence[str], points: np.ndarray,
+            groups: Mapping[str, Iterable[str]],
+            tie_break: Optional[Mapping[str, float]] = None
+            ) -> None:
+        self._player_ids = np.asarray(player_ids, dtype=str)
+        self._points = np.asarray(points, dtype=float)
+        if self._points.shape != (len(self._player_ids),):
+            raise ValueError(
+                f"{len(self._player_ids)} player IDs do not match "
+                f"points of shape {self._points.shape}."
+                )
+        rows = {
+            player_id: row
+            for row, player_id in enumerate(self._player_ids.tolist())
+            }
+        id_ranks = np.empty(len(self._player_ids), dtype=np.intp)
+        id_ranks[np.argsort(self._player_ids, kind='stable')] = \
+            np.arange(len(self._player_ids))
+        self._tie_keys: List[np.ndarray] = [id_ranks]
+        if tie_break is not None:
+            self._tie_keys.append(np.array(
+                [-tie_break.get(player_id, 0.0)
+                 for player_id in self._player_ids.tolist()], dtype=float
+                ))
+        self._groups: Dict[str, np.ndarray] = {}
+        for position, player_ids in groups.items():
+            group = np.array(sorted(
+                rows[player_id] for player_id in player_ids
+                if player_id in rows), dtype=np.intp)
+            self._groups[position] = group
+
+    @classmethod
+    def from_week(
+            cls, scored: ScoredWeek, index: PlayerIndex,
+            positions: Iterable[str] = DEFAULT_POSITIONS,
+            rookies: bool = False,
+            tie_break: Optional[Mapping[str, float]] = None
+            ) -> "TopScorerQuery":
+        """Groups a scored week by the positions of a player index."""
+        groups = {position: index.select(position=position, rookies=rookies)
+                  for position in positions}
+        return cls(scored.player_ids, scored.points, groups, tie_break)
+
+    @property
+    def positions(self) -> List[str]:
+        """Positions of the query groups."""
+        return list(self._groups)
+
+    def top(
+            self, positions: Optional[Iterable[str]] = None,
+            depth: int = DEFAULT_DEPTH, include_ties: bool = False
+            ) -> Dict[str, List[TopScorer]]:
+        """Returns the depth best players of every selected position.
+
+        Raises KeyError for positions without a group. Players with
+        equal points share a rank. With include_ties, players tied with
+        the last ranked player are listed too.
+        """
+        result: Dict[str, List[TopScorer]] = {}
+        for position in self.positions if positions is None else positions:
+            rows = self._groups[position]
+            picked = rows[top_k(
+                self._points[rows], depth,
+                [key[rows] for key in self._tie_keys], include_ties
+                )]
+            scorers: List[TopScorer] = []
+            for player_id, points in zip(self._player_ids[picked].tolist(),
+                                         self._points[picked].tolist()):
+                rank = len(scorers) + 1
+                if scorers and scorers[-1].points == points:
+                    rank = scorers[-1].rank
+                scorers.append(TopScorer(rank, player_id, points))
+            result[position] = scorers
+        return result
@@ -0,0 +1,196 @@
+"""Persistent cache of scored weeks.
+
+Stats of a finished week never change, so neither do the points they
+score. The players x points table of a finished week is stored on disk
+keyed by the scoring_fingerprint() of the scoring_settings, the season
+and the week. Every league with equivalent scoring reuses the stored
+table, and a season range report only scores the weeks not stored yet,
+usually just the current one.
+
+Tables are stored as .npz files of the player IDs and their points,
+one file per key. Tables without players are never stored: a week
+without stats is a failed fetch, not a final result. FORMAT_VERSION is
+part of every key and is raised whenever the scoring engine changes the
+points it computes.
+"""
+import os
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from typing import (Callable, Dict, Iterable, List, Mapping, NamedTuple,
+                    Optional)
+
+import numpy as np
+
+from script.parser.cache import DEFAULT_CACHE_DIR
+from script.scoring.batch import MultiLeagueScorer
+from script.scoring.engine import (SettingsLike, WeeklyStats,
+                                   scoring_fingerprint)
+
+FORMAT_VERSION = 2
+DEFAULT_WEEK_CACHE_DIR = DEFAULT_CACHE_DIR / 'scored_weeks'
+
+StatsLoader = Callable[[str, int], WeeklyStats]
+
+
+class ScoredWeek(NamedTuple):
+    """Points of all players with stats in one week."""
+    player_ids: np.ndarray
+    points: np.ndarray
+
+    def as_dict(self) -> Dict[str, float]:
+        """Returns the points keyed by player ID."""
+        return dict(zip(self.player_ids.tolist(), self.points.tolist()))
+
+
+def week_key(fingerprint: str, season: str, week: int) -> str:
+    """Returns the cache key of a scored week."""
+    return f"v{FORMAT_VERSION}-{fingerprint}-{season}-{int(week)}"
+
+
+class ScoredWeekCache:
+    """On-disk cache of the points of finished weeks.
+
+    directory (Path): Directory holding one file per scored week.
+    """
+    def __init__(self, directory: Path = DEFAULT_WEEK_CACHE_DIR) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.scored = 0
+        self._lock = Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.npz"
+
+    def get(
+            self, scoring_settings: SettingsLike, season: str, week: int
+            ) -> Optional[ScoredWeek]:
+        """Returns a stored week scored under equivalent settings."""
+        return self._get(scoring_fingerprint(scoring_settings), season, week)
+
+    def _get(
+            self, fingerprint: str, season: str, week: int
+            ) -> Optional[ScoredWeek]:
+        path = self._path(week_key(fingerprint, season, week))
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                scored = ScoredWeek(data['player_ids'], data['points'])
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            scored = None
+        if scored is None or not len(scored.player_ids):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return scored
+
+    def put(
+            self, scoring_settings: SettingsLike, season: str, week: int,
+            points: Mapping[str, float]
+            ) -> ScoredWeek:
+        """Stores the points of a finished week.
+
+        Raises ValueError for a week without players.
+        """
+        scored = ScoredWeek(
+            np.array(list(points), dtype=str),
+            np.array(list(points.values()), dtype=float)
+            )
+        self._put(scoring_fingerprint(scoring_settings), season, week, scored)
+        return scored
+
+    def _put(
+            self, fingerprint: str, season: str, week: int,
+            scored: ScoredWeek
+            ) -> None:
+        """Writes a table atomically, concurrent readers never see
+        partial files."""
+        if not len(scored.player_ids):
+            raise ValueError(
+                f"Refusing to store week {week} of {season} without "
+                "players."
+                )
+        path = self._path(week_key(fingerprint, season, week))
+        with NamedTemporaryFile(
+                dir=self.directory, suffix='.tmp', delete=False) as file:
+            np.savez(file, player_ids=scored.player_ids.astype(str),
+                     points=scored.points)
+        os.replace(file.name, path)
+
+    def league_weeks(
+            self, leagues: Mapping[str, SettingsLike], season: str,
+            weeks: Iterable[int], load_stats: StatsLoader,
+            current_week: Optional[int] = None
+            ) -> Dict[str, Dict[int, ScoredWeek]]:
+        """Returns the scored weeks of every league, by league ID and week.
+
+        Weeks before current_week are finished: they are read from the
+        cache and stored after scoring. The current week and later
+        weeks are scored on every call. load_stats(season, week) is only
+        called for weeks missing a distinct scoring, which is then
+        scored for all distinct scorings at once. Finished weeks whose
+        stats hold no players raise ValueError and are not stored.
+        """
+        scorer = MultiLeagueScorer(leagues)
+        fingerprints = scorer.fingerprints
+        result: Dict[str, Dict[int, ScoredWeek]] = {
+            league_id: {} for league_id in scorer.league_ids
+            }
+        for week in weeks:
+            finished = current_week is None or week < current_week
+            by_column: List[Optional[ScoredWeek]] = [
+                self._get(fingerprint, season, week) if finished else None
+                for fingerprint in fingerprints
+                ]
+            if any(scored is None for scored in by_column):
+                points = scorer.score_stats(load_stats(season, week))
+                player_ids = np.array(points.player_ids, dtype=str)
+                unique_points = points.unique_points
+                for column, fingerprint in enumerate(fingerprints):
+                    if by_column[column] is not None:
+                        continue
+                    scored = ScoredWeek(player_ids, unique_points[:, column])
+                    by_column[column] = scored
+                    if finished:
+                        self._put(fingerprint, season, week, scored)
+                with self._lock:
+                    self.scored += 1
+            for league_id in scorer.league_ids:
+                result[league_id][week] = \
+                    by_column[scorer.league_column(league_id)]
+        return result
+
+    def league_week(
+            self, scoring_settings: SettingsLike, season: str, week: int,
+            load_stats: StatsLoader, finished: bool = True
+            ) -> ScoredWeek:
+        """Returns the scored week of one league, see league_weeks()."""
+        current_week = None if finished else week
+        return self.league_weeks(
+            {'league': scoring_settings}, season, [week], load_stats,
+            current_week
+            )['league'][week]
+
+    def clear(self) -> None:
+        """Removes all stored weeks."""
+        with self._lock:
+            for path in self.directory.glob('*.npz'):
+                path.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit, miss and scored week counters."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'scored': self.scored,
+            'entries': len(self),
+        }
+
+    def __contains__(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.directory.glob('*.npz'))
@@ -0,0 +1,89 @@
+''' Synchronises the player database with the Sleeper API. '''
+import argparse
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+from script.parser.api_parser import SleeperAPIParser
+from script.players.binary_store import compile_player_store
+from script.players.json_store import read_json_players
+from script.players.players import PlayerDB, PlayerRepository
+from script.players.snapshots import PlayerSnapshotStore
+from script.players.sqlite_store import PlayerItems
+from script.players.sync import PlayerChanges, PlayerDBSync, UnsafeSyncError
+
+CHANGELOG = "script/resources/players_changelog.jsonl"
+
+
+def rebuild_player_store(source: str, store: str) -> int:
+    ''' Recompiles a binary player store from its JSON source.
+
+    The store is replaced atomically, so processes still mapping the
+    old file keep reading it until they reopen. '''
+    tmp_store = Path(store).with_suffix('.tmp')
+    count = compile_player_store(read_json_players(source), str(tmp_store))
+    tmp_store.replace(store)
+    return count
+
+
+def sync_player_database(
+        database: str, players: PlayerItems,
+        changelog: Optional[str] = None, source: Optional[str] = None
+        ) -> PlayerChanges:
+    ''' Applies fetched players to the database the repository loads.
+
+    SQLite databases are synced in place, JSON databases through their
+    journal, see script.players.json_store. A binary store only
+    holds a fixed set of fields, so its JSON source, by default
+    PlayerDB.player_db, is synced and the store is recompiled from it.
+    The shared repository of the database is updated with the
+    changes. '''
+    target = database
+    if Path(database).suffix == '.bin':
+        target = source or PlayerDB.player_db
+    sync = PlayerDBSync(target, changelog)
+    sync.add_listener(PlayerRepository.instance(database).apply_changes)
+    changes = sync.sync(players)
+    if target != database and \
+            (not changes.is_empty() or not Path(database).exists()):
+        rebuild_player_store(target, database)
+    return changes
+
+
+def main(
+        database: Optional[str], changelog: str,
+        snapshots: Optional[str] = None
+        ):
+    ''' Entry point for the daily player database sync.
+
+    Without a database, the one PlayerRepository loads by default is
+    synced. With a snapshot directory, the synced players are also
+    stored as today's dated snapshot. A failed or suspicious fetch
+    aborts the sync without writing anything. '''
+    database = database or PlayerDB.default()
+    try:
+        players = SleeperAPIParser().stream_all_players()
+        if snapshots is not None:
+            players = dict(players)
+        changes = sync_player_database(database, players, changelog)
+    except (requests.HTTPError, UnsafeSyncError) as error:
+        raise SystemExit(f"Player DB sync aborted: {error}") from error
+    print(f"added: {len(changes.added)}, changed: {len(changes.changed)}, "
+          f"removed: {len(changes.removed)}")
+    if snapshots is not None:
+        PlayerSnapshotStore(snapshots).add_snapshot(date.today(), players)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db',
+                        help='Player database (.json, .sqlite or .bin), '
+                             'defaults to the one the repository loads')
+    parser.add_argument('--changelog', default=CHANGELOG,
+                        help='Change log output')
+    parser.add_argument('--snapshots',
+                        help='Directory of dated player DB snapshots')
+    args = parser.parse_args()
+    main(args.db, args.changelog, args.snapshots)
@@ -1,12 +1,14 @@
-from sleeperpy import Players
-import json
-#from script.common.common import http_get_response_data_json, write_json_to_file
-#from script.common.common import write_json_to_file
-players = Players()
-player_data = players.get_all_players()
-output_file = "C:/Users/Linus\Desktop/Programming/sleeper_highest_scorer/script/resources/players_db.json"
+import argparse
 
-with open(output_file, "w") as out:
-    json.dump(player_data, out, indent=4)
+from script.parser.api_parser import SleeperAPIParser
+from script.parser.streaming import write_object_items
 
-#write_json_to_file(player_data, output_file)
\ No newline at end of file
+output_file = "script/resources/players_db.json"
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default=output_file, help='Player database output')
+    args = parser.parse_args()
+    # Streams the players payload straight to file instead of holding it in memory.
+    players = SleeperAPIParser().stream_all_players()
+    print(write_object_items(players, args.db))
@@ -0,0 +1,32 @@
+from pathlib import Path
+import pytest
+
+from script.common import json_backend
+from script.common.common import read_json_from_file, write_json_to_file
+
+
+@pytest.fixture(name="backend", params=json_backend.available_backends())
+def backend_fixture(request):
+    """Runs a test once per installed JSON backend."""
+    default_backend = json_backend.get_backend()
+    json_backend.set_backend(request.param)
+    yield request.param
+    json_backend.set_backend(default_backend)
+
+
+def test_json_round_trip(backend: str, tmp_path: Path):
+    """Test writing and reading JSON files with every backend."""
+    data = read_json_from_file('test/resources/test_single_roster.json')
+    output = tmp_path / 'roster.json'
+    write_json_to_file(data, output)
+    assert read_json_from_file(output) == data
+    assert b'\n' not in output.read_bytes()
+    write_json_to_file(data, output, pretty=True)
+    assert read_json_from_file(output) == data
+    assert b'\n' in output.read_bytes()
+
+
+def test_unknown_json_backend():
+    """Test selecting a backend that is not installed."""
+    with pytest.raises(ValueError):
+        json_backend.set_backend('unknown')
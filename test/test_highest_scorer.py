@@ -1,5 +1,7 @@
+import json
 from pathlib import Path
 from typing import List
+from unittest.mock import Mock
 import pytest
 
 from script.common.common import write_json_to_file, read_json_from_file
@@ -8,9 +10,15 @@ from script.avatars.avatar import SleeperAvatar
 from script.leagues.rosters import (LeagueRoster,
                                     RosterMetadata, RosterSettings,
                                     RosterWaiverData, RosterTotalPoints,
-                                    RosterPlayers)
+                                    RosterPlayers, resolve_rosters)
 from script.leagues.leagues import League, LeagueParse
-from script.players.players import Player, PlayerPersonal, PlayerProfessional, PlayerSleeper
+from script.get_highest_scorers import highest_scorers
+from script.parser.api_parser import SleeperAPIParser
+from script.parser.cache import ResponseCache
+from script.scoring.top_scorers import TopScorer
+from script.scoring.week_cache import ScoredWeekCache
+from script.players.players import (Player, PlayerPersonal, PlayerProfessional,
+                                    PlayerRepository, PlayerSleeper)
 
 
 class Setup:
@@ -123,6 +131,106 @@ def test_get_roster(setup: Setup):
     assert isinstance(setup.roster.roster_players, RosterPlayers)
     assert setup.roster.roster_id == 1
 
+def test_resolve_rosters_in_one_pass(setup: Setup):
+    ''' Test resolving all rosters of a league against one repository. '''
+    rosters_data = read_json_from_file('test_rosters.json')
+    rosters_data[0]['taxi'] = ['1049']
+    rosters_data[0]['reserve'] = ['DET']
+    rosters_data[1]['starters'][-1] = 'DET'
+    rosters = [LeagueRoster(roster) for roster in rosters_data]
+    repository = PlayerRepository('test_rosters_db.json')
+    repository.load_items(
+        (player_id, {'player_id': player_id})
+        for player_id in ('1049', '4046', '9509', 'DET')
+        )
+    resolved = resolve_rosters(rosters, repository)
+    assert [roster.roster_id for roster in resolved] == list(range(1, 9))
+    assert [player.id for player in resolved[0].taxi] == ['1049']
+    assert resolved[0].reserve[0] is resolved[1].starters[-1]
+    assert {player.id for player in resolved[0].starters} == {'4046', '9509'}
+    roster_players = RosterPlayers(['00000000', '01010101'], ['00000000'],
+                                   ['01010101'])
+    taxi = roster_players.get_taxi_players(str(setup.players_path))
+    assert [player.id for player in taxi] == ['01010101']
+
+
+def test_highest_scorers_per_position(tmp_path: Path):
+    ''' Test ranking a week under a league's scoring settings. '''
+    league = read_json_from_file('test_league.json')
+    bodies = {
+        '/state/nfl': {'week': 5, 'season': '2023',
+                       'season_type': 'regular'},
+        f"/league/{league['league_id']}": league,
+        '/regular/2023/2': {
+            '4046': {'pass_yd': 300, 'pass_td': 2},
+            '1049': {'pass_yd': 200, 'pass_td': 1},
+            '9509': {'rec': 6, 'rec_yd': 70},
+            '9756': {'rec': 6, 'rec_yd': 70},
+        },
+    }
+    session = Mock()
+    session.get.side_effect = lambda url, **kwargs: next(
+        Mock(status_code=200, content=json.dumps(body).encode(), headers={})
+        for suffix, body in bodies.items() if url.endswith(suffix)
+        )
+    repository = PlayerRepository('test_highest_scorers_db.json')
+    repository.load_items([
+        ('4046', {'position': 'QB', 'years_exp': 6}),
+        ('1049', {'position': 'QB', 'years_exp': 0}),
+        ('9509', {'position': 'WR', 'years_exp': 0}),
+        ('9756', {'position': 'WR', 'years_exp': 0}),
+    ])
+    api = SleeperAPIParser(session, ResponseCache(tmp_path / 'responses'))
+    week_cache = ScoredWeekCache(tmp_path / 'weeks')
+    scorers = highest_scorers(api, league['league_id'], '2023', 2,
+                              ['QB', 'WR'], 1, repository,
+                              week_cache=week_cache)
+    assert scorers == {'QB': [TopScorer(1, '4046', 24.0)],
+                       'WR': [TopScorer(1, '9509', 13.0)]}
+    rookies = highest_scorers(api, league['league_id'], '2023', 2,
+                              ['QB', 'WR'], 2, repository, rookies=True,
+                              week_cache=week_cache)
+    assert [scorer.player_id for scorer in rookies['QB']] == ['1049']
+    assert [scorer.rank for scorer in rookies['WR']] == [1, 1]
+    assert week_cache.stats()['scored'] == 1
+
+
+def test_highest_scorers_never_cache_missing_stats(tmp_path: Path):
+    ''' Test a failed stats fetch is raised instead of being stored as
+    an empty finished week. '''
+    league = read_json_from_file('test_league.json')
+    bodies = {
+        '/state/nfl': {'week': 5, 'season': '2023',
+                       'season_type': 'regular'},
+        f"/league/{league['league_id']}": league,
+        '/regular/2023/2': {'4046': {'pass_yd': 300, 'pass_td': 2}},
+    }
+    failures = {'/regular/2023/2': 1}
+
+    def get(url, **kwargs):
+        suffix = next(suffix for suffix in bodies if url.endswith(suffix))
+        if failures.get(suffix):
+            failures[suffix] -= 1
+            return Mock(status_code=503, content=b'', headers={})
+        return Mock(status_code=200, content=json.dumps(
+            bodies[suffix]).encode(), headers={})
+
+    session = Mock()
+    session.get.side_effect = get
+    repository = PlayerRepository('test_highest_scorers_db.json')
+    repository.load_items([('4046', {'position': 'QB', 'years_exp': 6})])
+    api = SleeperAPIParser(session, ResponseCache(tmp_path / 'responses'))
+    week_cache = ScoredWeekCache(tmp_path / 'weeks')
+    with pytest.raises(ValueError):
+        highest_scorers(api, league['league_id'], '2023', 2, ['QB'], 1,
+                        repository, week_cache=week_cache)
+    assert len(week_cache) == 0
+    scorers = highest_scorers(api, league['league_id'], '2023', 2, ['QB'],
+                              1, repository, week_cache=week_cache)
+    assert scorers == {'QB': [TopScorer(1, '4046', 24.0)]}
+    assert len(week_cache) == 1
+
+
 def test_player(setup: Setup):
     player = Player("8130")
     assert isinstance(player.professional, PlayerProfessional)
@@ -1,7 +1,21 @@
 from pathlib import Path
+import pytest
 from pytest import MonkeyPatch, fixture
 from script.parser.api_parser import SleeperAPIParser
+from script.parser.async_parser import AsyncSleeperAPIParser, gather_matchups
+from script.parser.single_flight import SingleFlight
+from script.parser.streaming import iter_object_items, write_object_items
+import asyncio
+from script.parser.cache import CachePolicy, ResponseCache
+import script.parser.cache as cache_module
+from script.parser.rate_limit import RateLimiter
+from script.parser.metrics import ParserMetrics
+from script.common.session import HTTPSession, SessionConfig
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import requests
+import threading
+import time
 
 from unittest.mock import MagicMock, Mock
 
@@ -27,6 +41,21 @@ class Setup:
         
         #TODO: MonkeyPatch
 
+class FakeSession:
+    ''' HTTP session returning canned JSON bodies per URL suffix. '''
+    def __init__(self, bodies) -> None:
+        self.bodies = bodies
+        self.requests = []
+
+    def get(self, url, **kwargs):
+        self.requests.append((url, kwargs))
+        for suffix, body in self.bodies.items():
+            if url.endswith(suffix):
+                content = body.encode('utf-8')
+                return Mock(status_code=200, content=content, headers={})
+        return Mock(status_code=404, content=b'', headers={})
+
+
 @fixture(name="setup")
 def setup_fixture():
     ''' Pytest decorator to use shared Setup class for testing. '''
@@ -70,6 +99,398 @@ def test_get_players_using_mock(setup: Setup):
 
 
 
+def test_parser_uses_pooled_session(setup: Setup, monkeypatch: MonkeyPatch):
+    ''' Test that parser requests go through the configured session. '''
+    session = HTTPSession(SessionConfig(connect_timeout=1, read_timeout=2))
+    captured = {}
+
+    def fake_get(url, **kwargs):
+        captured['url'] = url
+        captured.update(kwargs)
+        return Mock(status_code=200, content=json.dumps(setup.test_user_data).encode())
+
+    monkeypatch.setattr(session._session, "get", fake_get)
+    adapter = session._session.get_adapter('https://api.sleeper.app')
+    assert adapter.max_retries.total == 3
+    assert 429 in adapter.max_retries.status_forcelist
+
+    user = SleeperAPIParser(session).get_user(setup.user_id)
+    assert user == setup.test_user_data
+    assert captured['timeout'] == (1, 2)
+    assert captured['url'].endswith(setup.user_id)
+
+
+def test_gather_matchups_caps_in_flight_requests():
+    ''' Test that batch matchups are fetched with bounded concurrency. '''
+    lock = threading.Lock()
+    in_flight = {'current': 0, 'max': 0}
+
+    class FakeParser:
+        def get_matchups_in_league(self, league_id, week):
+            with lock:
+                in_flight['current'] += 1
+                in_flight['max'] = max(in_flight['max'], in_flight['current'])
+            time.sleep(0.01)
+            with lock:
+                in_flight['current'] -= 1
+            return [{'league_id': league_id, 'week': week}]
+
+    pairs = [(str(league), str(week)) for league in range(5) for week in range(1, 5)]
+    matchups = gather_matchups(pairs, max_in_flight=3, parser=FakeParser())
+    assert len(matchups) == 20
+    assert matchups[('2', '3')] == [{'league_id': '2', 'week': '3'}]
+    assert 1 < in_flight['max'] <= 3
+
+
+def test_async_parser_awaits_rate_limiter():
+    ''' Test that async calls wait on the event loop, not in threads. '''
+    def blocking_sleep(seconds):
+        raise AssertionError("worker thread blocked on the rate limiter")
+
+    limiter = RateLimiter(max_rate_per_minute=6000, burst=1,
+                          sleep=blocking_sleep)
+
+    class FakeParser:
+        rate_limiter = limiter
+
+        def get_matchups_in_league(self, league_id, week):
+            self.rate_limiter.acquire()
+            return [{'league_id': league_id, 'week': week}]
+
+    pairs = [('1', str(week)) for week in range(1, 6)]
+    matchups = gather_matchups(pairs, parser=FakeParser())
+    assert len(matchups) == 5
+    assert limiter.requests == 5
+    assert limiter.waited_seconds > 0
+
+
+def test_async_parser_sizes_threads_and_connections():
+    ''' Test that calls run on max_in_flight threads of their own with
+    a connection per request in flight. '''
+    session = HTTPSession(SessionConfig(pool_maxsize=4))
+    parser = SleeperAPIParser(session)
+
+    async def _run():
+        async with AsyncSleeperAPIParser(parser, 16) as async_parser:
+            return await asyncio.gather(*(
+                async_parser._call(
+                    lambda call: threading.current_thread().name, call)
+                for call in range(20)))
+
+    names = asyncio.run(_run())
+    assert all(name.startswith('sleeper-api') for name in names)
+    assert len(set(names)) <= 16
+    adapter = session._session.get_adapter('https://api.sleeper.app')
+    assert adapter._pool_maxsize == 16
+    assert session.config.pool_maxsize == 16
+    AsyncSleeperAPIParser(parser, 2).close()
+    assert session.config.pool_maxsize == 16
+    session.close()
+
+
+def test_async_parser_refunds_slots_of_cached_calls():
+    ''' Test that calls sending no request give their slot back and
+    multi-request endpoints wait for every slot on the event loop. '''
+    def blocking_sleep(seconds):
+        raise AssertionError("worker thread blocked on the rate limiter")
+
+    limiter = RateLimiter(max_rate_per_minute=6000, burst=1,
+                          sleep=blocking_sleep)
+    session = FakeSession({'/winners_bracket': '[{"r": 1}]',
+                           '/losers_bracket': '[{"r": 2}]'})
+    parser = SleeperAPIParser(session, rate_limiter=limiter,
+                              single_flight=SingleFlight())
+
+    async def _run():
+        async with AsyncSleeperAPIParser(parser) as async_parser:
+            cached = await async_parser._call(lambda: 'cached')
+            bracket = await async_parser.get_playoff_bracket('1')
+        return cached, bracket
+
+    cached, bracket = asyncio.run(_run())
+    assert cached == 'cached'
+    assert bracket == ([{'r': 1}], [{'r': 2}])
+    assert limiter.requests == 2
+    assert len(session.requests) == 2
+
+
+def test_session_retries_wait_for_the_rate_limiter():
+    ''' Test that every retry of a throttled request takes a slot. '''
+    statuses = [429, 200]
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status = statuses.pop(0)
+            body = b'{"week": 5}' if status == 200 else b''
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    limiter = RateLimiter(max_rate_per_minute=6000)
+    session = HTTPSession(SessionConfig(retries=2, backoff_factor=0))
+    try:
+        parser = SleeperAPIParser(session, rate_limiter=limiter)
+        parser.base_url = f"http://127.0.0.1:{server.server_port}/v1/"
+        assert parser.get_nfl_state() == {'week': 5}
+    finally:
+        session.close()
+        server.shutdown()
+        server.server_close()
+    assert limiter.requests == 2
+    assert limiter.throttled == 1
+
+
+def test_cache_serves_fresh_responses(tmp_path: Path):
+    ''' Test that repeated calls are served from the on-disk cache. '''
+    session = FakeSession({'/league/1': '{"league_id": "1"}'})
+    parser = SleeperAPIParser(session, ResponseCache(tmp_path))
+    assert parser.get_specific_league('1') == {'league_id': '1'}
+    assert parser.get_specific_league('1') == {'league_id': '1'}
+    assert len(session.requests) == 1
+
+    reopened = SleeperAPIParser(session, ResponseCache(tmp_path))
+    assert reopened.get_specific_league('1') == {'league_id': '1'}
+    assert len(session.requests) == 1
+    assert reopened.cache.stats()['hits'] == 1
+
+
+def test_cache_uses_endpoint_policies(tmp_path: Path, monkeypatch: MonkeyPatch):
+    ''' Test that finished matchup weeks never expire. '''
+    session = FakeSession({
+        '/state/nfl': '{"week": 5, "season_type": "regular"}',
+        '/matchups/3': '[{"roster_id": 1}]',
+        '/matchups/5': '[{"roster_id": 2}]',
+    })
+    parser = SleeperAPIParser(session, ResponseCache(tmp_path))
+    parser.get_matchups_in_league('1', '3')
+    parser.get_matchups_in_league('1', '5')
+    later = time.time() + 3600
+    monkeypatch.setattr(cache_module.time, "time", lambda: later)
+    parser.get_matchups_in_league('1', '3')
+    parser.get_matchups_in_league('1', '5')
+    urls = [url for url, _ in session.requests]
+    assert sum(url.endswith('/matchups/3') for url in urls) == 1
+    assert sum(url.endswith('/matchups/5') for url in urls) == 2
+    assert CachePolicy(ttl=None).is_fresh(0, 10 ** 12)
+    assert not CachePolicy(ttl=30).is_fresh(0, 31)
+    assert not CachePolicy(ttl=0).cacheable
+
+
+def test_finished_matchups_use_the_league_season(
+        tmp_path: Path, monkeypatch: MonkeyPatch):
+    ''' Test that matchup weeks of past season leagues never expire. '''
+    session = FakeSession({
+        '/state/nfl': '{"week": 2, "season": "2023", '
+                      '"season_type": "regular"}',
+        '/matchups/9': '[{"roster_id": 1}]',
+    })
+    parser = SleeperAPIParser(session, ResponseCache(tmp_path))
+    gather_matchups([('old', '9'), ('new', '9')], parser=parser,
+                    seasons={'old': '2022'})
+    later = time.time() + 3600
+    monkeypatch.setattr(cache_module.time, "time", lambda: later)
+    parser.get_matchups_in_league('old', '9', '2022')
+    parser.get_matchups_in_league('new', '9', '2023')
+    urls = [url for url, _ in session.requests]
+    assert sum(url.endswith('/old/matchups/9') for url in urls) == 1
+    assert sum(url.endswith('/new/matchups/9') for url in urls) == 2
+    assert not any(url.endswith('/league/old') for url in urls)
+
+
+def test_weekly_stats_of_finished_weeks_never_expire(
+        tmp_path: Path, monkeypatch: MonkeyPatch):
+    ''' Test that stats of past seasons and weeks are cached for good. '''
+    session = FakeSession({
+        '/state/nfl': '{"week": 5, "season": "2023", '
+                      '"season_type": "regular"}',
+        '/regular/2022/17': '{"4046": {"pass_yd": 300}}',
+        '/regular/2023/5': '{"4046": {"pass_yd": 12}}',
+    })
+    parser = SleeperAPIParser(session, ResponseCache(tmp_path))
+    assert parser.is_finished_week('17', '2022')
+    assert not parser.is_finished_week('5', '2023')
+    assert parser.get_weekly_stats('2022', '17') == {
+        '4046': {'pass_yd': 300}}
+    parser.get_weekly_stats('2023', '5')
+    later = time.time() + 3600
+    monkeypatch.setattr(cache_module.time, "time", lambda: later)
+    parser.get_weekly_stats('2022', '17')
+    parser.get_weekly_stats('2023', '5')
+    urls = [url for url, _ in session.requests]
+    assert sum(url.endswith('/regular/2022/17') for url in urls) == 1
+    assert sum(url.endswith('/regular/2023/5') for url in urls) == 2
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path):
+    ''' Test the size cap of the response cache. '''
+    cache = ResponseCache(tmp_path, max_bytes=10)
+    policy = CachePolicy(ttl=None)
+    cache.put('a', b'123456')
+    cache.put('b', b'123456')
+    assert 'a' not in cache
+    assert cache.get('b', policy) == b'123456'
+    assert cache.get('a', policy) is None
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_cache_journals_puts_and_flushes_access_order(tmp_path: Path):
+    ''' Test that gets do not rewrite the index and reopening keeps
+    stored responses and their LRU order. '''
+    policy = CachePolicy(ttl=None)
+    cache = ResponseCache(tmp_path, max_bytes=18)
+    for url in ('a', 'b', 'c'):
+        cache.put(url, b'123456')
+    assert not (tmp_path / ResponseCache.INDEX_FILE).exists()
+    assert cache.get('a', policy) == b'123456'
+    assert not (tmp_path / ResponseCache.INDEX_FILE).exists()
+    assert len(ResponseCache(tmp_path)) == 3
+    cache.close()
+    reopened = ResponseCache(tmp_path, max_bytes=18)
+    assert reopened.total_bytes == 18
+    reopened.put('d', b'123456')
+    assert 'b' not in reopened
+    assert 'a' in reopened
+
+
+def test_stale_players_are_revalidated(tmp_path: Path, monkeypatch: MonkeyPatch):
+    ''' Test conditional GET reuse of the stored players payload. '''
+    body = b'{"4046": {"full_name": "Patrick Mahomes"}}'
+    sent_headers = []
+
+    class ConditionalSession:
+        def get(self, url, headers=None, **kwargs):
+            sent_headers.append(headers or {})
+            if (headers or {}).get('If-None-Match') == '"v1"':
+                return Mock(status_code=304, content=b'', headers={})
+            return Mock(status_code=200, content=body, headers={'ETag': '"v1"'})
+
+    parser = SleeperAPIParser(ConditionalSession(), ResponseCache(tmp_path))
+    players = parser.fetch_all_players()
+    later = time.time() + 2 * 24 * 3600
+    monkeypatch.setattr(cache_module.time, "time", lambda: later)
+    assert parser.fetch_all_players() == players
+    assert sent_headers == [{}, {'If-None-Match': '"v1"'}]
+    assert parser.cache.stats()['revalidations'] == 1
+    assert parser.cache.stats()['bytes_saved'] == len(body)
+
+
+def test_rate_limiter_backs_off_on_throttling():
+    ''' Test the token bucket and its adaptation to 429 responses. '''
+    now = [0.0]
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(max_rate_per_minute=60, min_rate_per_minute=6,
+                          burst=2, clock=lambda: now[0], sleep=fake_sleep)
+    limiter.acquire()
+    limiter.acquire()
+    assert sleeps == []
+    limiter.acquire()
+    assert sleeps == [1.0]
+
+    limiter.record(429, 0.1)
+    assert limiter.rate_per_minute == 30
+    limiter.record(200, 0.1)
+    assert 30 < limiter.rate_per_minute <= 60
+    metrics = limiter.metrics()
+    assert metrics['throttled'] == 1
+    assert metrics['requests'] == 3
+    assert metrics['requests_last_minute'] == 3
+
+
+def test_concurrent_duplicate_requests_are_coalesced():
+    ''' Test single-flight coalescing for threads and asyncio tasks. '''
+    class SlowSession(FakeSession):
+        def get(self, url, **kwargs):
+            time.sleep(0.05)
+            return super().get(url, **kwargs)
+
+    session = SlowSession({'/state/nfl': '{"week": 5}'})
+    parser = SleeperAPIParser(session, single_flight=SingleFlight())
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(parser.get_nfl_state()))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [{'week': 5}] * 5
+    assert len(session.requests) == 1
+    assert parser.single_flight.coalesced == 4
+
+    async def fetch_concurrently():
+        async_parser = AsyncSleeperAPIParser(parser, single_flight=SingleFlight())
+        return await asyncio.gather(*(async_parser.get_nfl_state() for _ in range(5)))
+
+    assert asyncio.run(fetch_concurrently()) == [{'week': 5}] * 5
+    assert len(session.requests) == 2
+
+
+def test_streaming_players_parser(tmp_path: Path):
+    ''' Test incremental parsing of the players payload. '''
+    raw = Path('test/resources/test_player_data.json').read_bytes()
+    chunks = [raw[i:i + 7] for i in range(0, len(raw), 7)]
+    assert dict(iter_object_items(chunks)) == json.loads(raw)
+
+    projected = dict(iter_object_items(chunks, fields=('full_name', 'position')))
+    assert projected['00000000'] == {'full_name': 'Benjamin Watson', 'position': 'TE'}
+
+    response = Mock(status_code=200, iter_content=Mock(return_value=iter(chunks)))
+    session = Mock(get=Mock(return_value=response))
+    streamed = SleeperAPIParser(session).stream_all_players(fields=('age',))
+    output = tmp_path / 'players.json'
+    assert write_object_items(streamed, output) == 2
+    assert json.loads(output.read_text())['00000000'] == {'age': 41}
+    assert session.get.call_args.kwargs['stream'] is True
+    assert response.close.called
+
+
+def test_streaming_players_raises_on_server_error():
+    ''' Test that a failed players download raises instead of
+    yielding no players. '''
+    response = Mock(status_code=503, headers={})
+    session = Mock(get=Mock(return_value=response))
+    streamed = SleeperAPIParser(session).stream_all_players()
+    with pytest.raises(requests.HTTPError):
+        list(streamed)
+    assert response.close.called
+
+
+def test_parser_records_endpoint_metrics(tmp_path: Path):
+    ''' Test per-endpoint request, cache and latency metrics. '''
+    session = FakeSession({'/league/1': '{"league_id": "1"}'})
+    metrics = ParserMetrics()
+    parser = SleeperAPIParser(session, ResponseCache(tmp_path), metrics=metrics)
+    for _ in range(3):
+        parser.get_specific_league('1')
+    parser.get_specific_draft('404')
+
+    league = metrics.snapshot()['get_specific_league']
+    assert league['requests'] == 1
+    assert league['status_codes'] == {'200': 1}
+    assert league['response_bytes'] == len(b'{"league_id": "1"}')
+    assert league['cache_hits'] == 2
+    assert league['cache_hit_ratio'] == 2 / 3
+    assert league['latency']['p50'] is not None
+    assert metrics.snapshot()['get_specific_draft']['status_codes'] == {'404': 1}
+    assert json.loads(metrics.dump('json')) == metrics.snapshot()
+    assert 'get_specific_league' in metrics.dump('text')
+
+
+
+
 '''
 def test(setup: Setup, monkeypatch: MonkeyPatch):
     def mock_get(*args, **kwargs):
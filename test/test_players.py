@@ -1,5 +1,19 @@
+import json
+from pathlib import Path
 import pytest
-from script.players.players import Player
+import script.players.players as players_module
+from script.common.common import read_json_from_file
+from script.players.binary_store import BinaryPlayerStore, compile_player_store
+from script.players.index import PlayerIndex
+from script.players.json_store import journal_file, read_json_players
+from script.players.search import PlayerNameIndex
+from script.players.players import (Player, PlayerDB, PlayerPersonal,
+                                    PlayerRepository, Position, Status,
+                                    intern_record)
+from script.players.snapshots import PlayerSnapshotStore
+from script.players.sqlite_store import SQLitePlayerStore
+from script.players.sync import PlayerDBSync, UnsafeSyncError, diff_players
+from script.sync_players import sync_player_database
 
 class Setup:
     def __init__(self) -> None:
@@ -9,3 +23,368 @@ class Setup:
 @pytest.fixture()
 def setup():
     return Setup
+
+
+PLAYER_DB = "test/resources/test_player_data.json"
+
+
+@pytest.fixture(name="repository")
+def repository_fixture():
+    """Shared player repository over the test player database."""
+    PlayerRepository.clear_instances()
+    yield PlayerRepository.instance(PLAYER_DB)
+    PlayerRepository.clear_instances()
+
+
+def test_repository_is_shared(repository: PlayerRepository):
+    """Test that one repository is shared per database file."""
+    assert PlayerRepository.instance(PLAYER_DB) is repository
+    assert len(repository) == 2
+    assert '00000000' in repository
+    assert repository.get('unknown') is None
+
+
+def test_repository_parses_database_once(
+        repository: PlayerRepository, monkeypatch: pytest.MonkeyPatch):
+    """Test that player lookups do not re-read the database."""
+    calls = []
+    original = players_module.read_json_players
+
+    def counting_read(input_file):
+        calls.append(input_file)
+        return original(input_file)
+
+    monkeypatch.setattr(players_module, "read_json_players", counting_read)
+    for _ in range(10):
+        Player('00000000', repository)
+    assert len(calls) == 1
+    repository.reload()
+    assert len(calls) == 2
+
+
+def test_player_from_repository(repository: PlayerRepository):
+    """Test hydrating a Player from the repository."""
+    player = Player('00000000', repository)
+    assert player.personal.full_name == 'Benjamin Watson'
+    assert player.professional.position == 'TE'
+
+
+def test_repository_load_streamed_items():
+    """Test feeding streamed player records into a repository."""
+    repository = PlayerRepository(PLAYER_DB)
+    repository.load_items(iter([('1', {'full_name': 'Sam Howell'})]))
+    assert len(repository) == 1
+    assert repository.get('1') == {'full_name': 'Sam Howell'}
+
+
+def test_binary_player_store(tmp_path: Path):
+    """Test compiling and memory-mapping the binary player store."""
+    store_file = tmp_path / 'players_db.bin'
+    players = read_json_from_file(PLAYER_DB)
+    assert compile_player_store(players, store_file) == 2
+
+    store = BinaryPlayerStore(store_file)
+    assert len(store) == 2
+    assert list(store) == sorted(players)
+    assert '01010101' in store and 'unknown' not in store
+    record = store['00000000']
+    assert record['full_name'] == 'Benjamin Watson'
+    assert record['age'] == 41
+    assert record['depth_chart_order'] is None
+    assert record['fantasy_positions'] == ['TE']
+    assert record.get('team') is None
+    store.close()
+
+    repository = PlayerRepository(store_file)
+    player = Player('00000000', repository)
+    assert player.personal.college == 'Georgia'
+    assert player.professional.years_exp == 18
+
+
+def test_binary_store_is_opt_in(tmp_path: Path, monkeypatch):
+    """Test that an existing binary store is not used unless selected."""
+    store_file = tmp_path / 'players_db.bin'
+    compile_player_store(read_json_from_file(PLAYER_DB), store_file)
+    monkeypatch.setattr(PlayerDB, 'player_store', str(store_file))
+    monkeypatch.delenv(PlayerDB.environment_variable, raising=False)
+    assert PlayerDB.default() == PlayerDB.player_db
+    monkeypatch.setenv(PlayerDB.environment_variable, str(store_file))
+    assert PlayerDB.default() == str(store_file)
+
+
+def test_sqlite_player_store(tmp_path: Path):
+    """Test indexed player queries and hydration from SQLite."""
+    store_file = tmp_path / 'players_db.sqlite'
+    store = SQLitePlayerStore(store_file)
+    players = read_json_from_file(PLAYER_DB)
+    players['1'] = {'full_name': 'Rookie Receiver', 'position': 'WR',
+                    'team': 'KC', 'status': 'Active', 'years_exp': 0,
+                    'fantasy_positions': ['WR']}
+    assert store.import_players(players) == 3
+    assert store.query(position='WR', status='Active', years_exp=0) == ['1']
+    assert store.query(team='KC') == ['1']
+    assert store.query(fantasy_position='TE') == sorted(
+        player_id for player_id in players if player_id != '1')
+    assert store.delete_players(['1']) == 1
+    assert store.query(team='KC') == []
+    store.close()
+
+    repository = PlayerRepository(store_file)
+    assert len(repository) == 2
+    player = Player('00000000', repository)
+    assert player.personal.full_name == 'Benjamin Watson'
+    assert player.sleeper.fantasy_positions == ['TE']
+
+
+@pytest.mark.parametrize("database_name", ["players_db.sqlite", "players_db.json"])
+def test_incremental_player_sync(tmp_path: Path, database_name: str):
+    """Test that a sync applies only added, changed and removed players."""
+    database = tmp_path / database_name
+    changelog = tmp_path / 'changelog.jsonl'
+    players = read_json_from_file(PLAYER_DB)
+    notified = []
+    sync = PlayerDBSync(database, changelog, listeners=[notified.append],
+                        max_removed_share=0.5)
+    assert set(sync.sync(players).added) == set(players)
+
+    fetched = {'00000000': dict(players['00000000'], team='KC'),
+               '1': {'full_name': 'Sam Howell', 'position': 'QB'}}
+    changes = sync.sync(fetched)
+    assert list(changes.added) == ['1']
+    assert changes.changed_fields == {'00000000': ['team']}
+    assert changes.removed == ['01010101']
+    assert changes.player_ids == {'00000000', '1', '01010101'}
+    assert sync.sync(fetched).is_empty()
+    assert len(notified) == 2
+
+    repository = PlayerRepository(database)
+    assert set(repository) == {'00000000', '1'}
+    assert repository.get('00000000')['team'] == 'KC'
+    log = [json.loads(line) for line in changelog.read_text().splitlines()]
+    assert len(log) == 3
+    assert log[1]['changed'] == {'00000000': ['team']}
+
+
+@pytest.mark.parametrize("database_name", ["players_db.sqlite", "players_db.json"])
+def test_sync_refuses_empty_and_mass_removals(tmp_path: Path,
+                                              database_name: str):
+    """Test that failed fetches never empty the player database."""
+    database = tmp_path / database_name
+    players = read_json_from_file(PLAYER_DB)
+    sync = PlayerDBSync(database)
+    sync.sync(players)
+    notified = []
+    sync.add_listener(notified.append)
+    with pytest.raises(UnsafeSyncError):
+        sync.sync({})
+    with pytest.raises(UnsafeSyncError):
+        sync.sync({'00000000': players['00000000']})
+    assert notified == []
+    assert set(PlayerRepository(database)) == set(players)
+
+
+def test_sync_rebuilds_binary_store(tmp_path: Path):
+    """Test that syncing a binary store updates its source, the store
+    and the shared repository."""
+    source = tmp_path / 'players_db.json'
+    store = tmp_path / 'players_db.bin'
+    players = read_json_from_file(PLAYER_DB)
+    sync_player_database(str(store), players, source=str(source))
+    PlayerRepository.clear_instances()
+    repository = PlayerRepository.instance(str(store))
+    assert repository.get('00000000')['team'] is None
+    fetched = dict(players)
+    fetched['00000000'] = dict(players['00000000'], team='KC')
+    changes = sync_player_database(str(store), fetched, source=str(source))
+    assert changes.changed_fields == {'00000000': ['team']}
+    assert repository.get('00000000')['team'] == 'KC'
+    assert read_json_players(source)['00000000']['team'] == 'KC'
+    PlayerRepository.clear_instances()
+
+
+def test_json_sync_appends_to_journal(tmp_path: Path, monkeypatch):
+    """Test that JSON syncs journal the changed records and only
+    rewrite the database when compacting."""
+    database = tmp_path / 'players_db.json'
+    players = read_json_from_file(PLAYER_DB)
+    sync = PlayerDBSync(database)
+    sync.sync(players)
+    written = database.read_bytes()
+    assert not journal_file(database).exists()
+
+    fetched = dict(players)
+    fetched['00000000'] = dict(players['00000000'], team='KC')
+    monkeypatch.setattr('script.players.json_store.COMPACT_SHARE', 10.0)
+    assert sync.sync(fetched).changed_fields == {'00000000': ['team']}
+    assert database.read_bytes() == written
+    assert journal_file(database).exists()
+    assert PlayerRepository(database).get('00000000')['team'] == 'KC'
+    assert sync.sync(fetched).is_empty()
+
+    monkeypatch.setattr('script.players.json_store.COMPACT_SHARE', 0.0)
+    fetched['1'] = {'full_name': 'Sam Howell', 'position': 'QB'}
+    sync.sync(fetched)
+    assert not journal_file(database).exists()
+    assert read_json_from_file(database) == fetched
+
+
+def test_sync_closes_replaced_stores(tmp_path: Path):
+    """Test that synced binary stores release their mapping."""
+    source = tmp_path / 'players_db.json'
+    store = tmp_path / 'players_db.bin'
+    players = read_json_from_file(PLAYER_DB)
+    sync_player_database(str(store), players, source=str(source))
+    repository = PlayerRepository.instance(str(store))
+    opened = repository.players
+    fetched = dict(players)
+    fetched['00000000'] = dict(players['00000000'], team='KC')
+    sync_player_database(str(store), fetched, source=str(source))
+    assert opened._mmap.closed
+    assert repository.get('00000000')['team'] == 'KC'
+    PlayerRepository.clear_instances()
+
+
+def test_repository_applies_sync_changes(repository: PlayerRepository):
+    """Test updating only the changed players of a loaded repository."""
+    changes = diff_players(repository.players, {'1': {'full_name': 'Sam Howell'}})
+    repository.apply_changes(changes)
+    assert list(repository) == ['1']
+
+
+def test_player_hydrates_lazily(repository: PlayerRepository):
+    """Test that Player sub-objects are only built on first access."""
+    player = Player('00000000', repository)
+    assert not hasattr(player, '__dict__')
+    assert player._personal is None and player._professional is None
+    professional = player.professional
+    assert player.professional is professional
+    assert player._personal is None
+    assert Player('unknown', repository).personal is None
+
+
+def test_player_index_intersections():
+    """Test selecting players through the secondary indexes."""
+    index = PlayerIndex({
+        '1': {'position': 'WR', 'team': 'WAS', 'status': 'Active',
+              'years_exp': 0, 'fantasy_positions': ['WR']},
+        '2': {'position': 'WR', 'team': 'KC', 'status': 'Active',
+              'years_exp': 4, 'fantasy_positions': ['WR', 'RB']},
+        '3': {'position': 'QB', 'team': 'WAS', 'status': 'Inactive',
+              'years_exp': 0, 'fantasy_positions': ['QB']},
+    })
+    assert index.select(position='WR', status='Active', rookies=True) == {'1'}
+    assert index.select(fantasy_position='RB') == {'2'}
+    assert index.select(team='WAS') == {'1', '3'}
+    assert index.select(position='TE', team='WAS') == set()
+    assert index.select() == {'1', '2', '3'}
+    assert index.rookies() == {'1', '3'}
+    with pytest.raises(KeyError):
+        index.lookup('college', 'LSU')
+
+
+def test_repository_index_follows_sync(repository: PlayerRepository):
+    """Test that a sync re-indexes only the changed players."""
+    assert repository.index.select(position='TE') == {'00000000', '01010101'}
+    fetched = dict(repository.players)
+    fetched['00000000'] = dict(fetched['00000000'], position='WR')
+    repository.apply_changes(diff_players(repository.players, fetched))
+    assert repository.index.select(position='TE') == {'01010101'}
+    assert '00000000' in repository.index.select(position='WR')
+
+
+def test_player_name_search():
+    """Test prefix, multi-word and misspelled name searches."""
+    index = PlayerNameIndex({
+        '1': {'full_name': 'Patrick Mahomes'},
+        '2': {'full_name': 'Sam Howell'},
+        '3': {'full_name': 'Sammy Watkins'},
+        'KC': {'first_name': 'Kansas City', 'last_name': 'Chiefs'},
+    })
+    assert [match.player_id for match in index.search('Mahomes')] == ['1']
+    assert [match.player_id for match in index.search('sam')] == ['2', '3']
+    assert index.search('Sam Howell')[0] == ('2', 'Sam Howell', 3.0)
+    assert index.search('mahommes')[0].player_id == '1'
+    assert index.search('chiefs')[0].player_id == 'KC'
+    assert index.search('') == []
+    index.apply_changes(diff_players(
+        {'2': {'full_name': 'Sam Howell'}},
+        {'2': {'full_name': 'Samuel Howell'}, '4': {'full_name': 'Drake'}}))
+    assert index.search('samuel')[0].player_id == '2'
+    assert index.search('drake')[0].player_id == '4'
+
+
+def test_short_prefix_matches_follow_changes():
+    """Test that cached short prefix matches are dropped on changes and
+    misspellings are only searched without prefix matches."""
+    index = PlayerNameIndex({'1': {'full_name': 'Sam Howell'},
+                             '2': {'full_name': 'Mark Samson'}})
+    assert [match.player_id for match in index.search('sa')] == ['1', '2']
+    index.add([('3', {'full_name': 'Sa Li'})])
+    assert index.search('sa')[0] == ('3', 'Sa Li', 2.75)
+    index.remove(['1'])
+    assert [match.player_id for match in index.search('sa')] == ['3', '2']
+    assert [match.player_id for match in index.search('samso')] == ['2']
+
+
+def test_exact_words_rank_above_prefixes():
+    """Test that whole word matches rank before shorter prefix matches."""
+    index = PlayerNameIndex({'1': {'full_name': 'Josh Allen'},
+                             '2': {'full_name': 'Allend Li'},
+                             '3': {'full_name': 'Josh Allensworth'}})
+    assert [match.player_id for match in index.search('allen')] == \
+        ['1', '2', '3']
+    assert [match.player_id for match in index.search('josh allen')] == \
+        ['1', '3']
+    assert index.search('Josh Allen')[0].score == 3.0
+    scores = [match.score for match in index.search('allen')]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_single_word_names():
+    """Test first and last names of single-word player names."""
+    personal = PlayerPersonal({'full_name': 'Drake'})
+    assert personal.get_first_name() == 'Drake'
+    assert personal.get_last_name() == ''
+    personal = PlayerPersonal({'full_name': 'Amon-Ra St. Brown'})
+    assert personal.get_first_name() == 'Amon-Ra'
+    assert personal.get_last_name() == 'St. Brown'
+
+
+def test_player_records_are_interned(repository: PlayerRepository):
+    """Test that repeated record values share enum members and strings."""
+    first, second = (repository.get(player_id)
+                     for player_id in ('00000000', '01010101'))
+    assert first['position'] is Position.TE
+    assert first['position'] == 'TE'
+    assert first['fantasy_positions'][0] is second['fantasy_positions'][0]
+    assert repository.index.select(position='TE') == {'00000000', '01010101'}
+    record = intern_record({'team': 'XYZ', 'status': 'Active', 'college': 'LSU'})
+    assert record['status'] is Status.ACTIVE
+    assert record['team'] is intern_record({'team': 'XYZ'})['team']
+    assert json.loads(json.dumps(record)) == \
+        {'team': 'XYZ', 'status': 'Active', 'college': 'LSU'}
+
+
+def test_player_snapshots_as_of(tmp_path: Path):
+    """Test delta snapshots with keyframes and as_of lookups."""
+    store = PlayerSnapshotStore(str(tmp_path), keyframe_interval=2)
+    weeks = [
+        {'1': {'team': 'WAS', 'status': 'Active', 'injury_status': 'Q'}},
+        {'1': {'team': 'WAS', 'status': 'Active'}, '2': {'team': 'KC'}},
+        {'1': {'team': 'PHI', 'status': 'Active'}, '2': {'team': 'KC'}},
+        {'2': {'team': 'KC', 'status': 'Inactive'}},
+    ]
+    keyframes = [store.add_snapshot(f"2023-09-{day:02}", players)
+                 for day, players in zip((7, 14, 21, 28), weeks)]
+    assert keyframes == [True, False, True, False]
+
+    store = PlayerSnapshotStore(str(tmp_path))
+    assert dict(store.as_of('2023-09-20')) == weeks[1]
+    assert dict(store.as_of('2023-09-21')) == weeks[2]
+    assert dict(store.as_of('2023-12-31')) == weeks[3]
+    assert dict(store.as_of('2023-09-07')) == weeks[0]
+    assert store.as_of('2023-09-14') is store.as_of('2023-09-15')
+    with pytest.raises(KeyError):
+        store.as_of('2023-09-01')
+    with pytest.raises(ValueError):
+        store.add_snapshot('2023-09-01', weeks[0])
@@ -0,0 +1,300 @@
+import numpy as np
+import pytest
+
+from script.common.common import read_json_from_file
+from script.leagues.leagues import Defense, Kicking, ScoringSettings
+from script.players.index import PlayerIndex
+from script.scoring.batch import MultiLeagueScorer
+from script.scoring.buckets import DEFAULT_RULES, BucketRule, ThresholdRule
+from script.scoring.live import LiveScorer
+from script.scoring.engine import (DEFAULT_VOCABULARY, ScoringEngine,
+                                   StatMatrix, StatVocabulary,
+                                   compile_weights,
+                                   players_points_from_matchups,
+                                   scoring_fingerprint)
+from script.scoring.top_scorers import TopScorer, TopScorerQuery, top_k
+from script.scoring.week_cache import ScoredWeek, ScoredWeekCache, week_key
+
+
+class Setup:
+    ''' Setup class for shared scoring test data. '''
+    def __init__(self) -> None:
+        self.scoring_settings = ScoringSettings(
+            read_json_from_file('test_league.json')['scoring_settings']
+            )
+        self.stats = {
+            'qb': {'pass_yd': 300, 'pass_td': 2, 'pass_int': 1,
+                   'rush_yd': 20, 'pass_att': 35, 'gp': 1},
+            'wr': {'rec': 5, 'rec_yd': 80, 'rec_td': 1},
+            'te': {'rec': 4, 'rec_yd': 40, 'bonus_rec_te': 4},
+            'DET': {'pts_allow_7_13': 1, 'sack': 3, 'int': 1},
+            'k': {'fgm_40_49': 1, 'fgm_50p': 1, 'xpm': 3, 'fgmiss': 1},
+        }
+        self.expected = {'qb': 25.0, 'wr': 19.0, 'te': 12.0, 'DET': 9.0,
+                         'k': 11.0}
+
+
+@pytest.fixture(name="setup")
+def setup_fixture():
+    """Pytest decorator to use shared Setup class for testing."""
+    return Setup()
+
+
+def test_scoring_settings_read_their_keys(setup: Setup):
+    """Test that category classes read their own scoring keys."""
+    assert setup.scoring_settings.passing_settings.pass_yd == 0.04
+    assert setup.scoring_settings.receiving_settings.rec == 1.0
+    assert setup.scoring_settings.rushing_settings.rush_td == 6.0
+
+
+def test_compile_weights(setup: Setup):
+    """Test compiling scoring settings into a weight vector."""
+    weights = compile_weights(setup.scoring_settings)
+    assert weights.shape == (len(DEFAULT_VOCABULARY),)
+    assert weights[DEFAULT_VOCABULARY.column('pass_yd')] == 0.04
+    assert weights[DEFAULT_VOCABULARY.column('pass_att')] == 0.0
+
+
+def test_score_week(setup: Setup):
+    """Test scoring a week's stats with one matrix product."""
+    engine = ScoringEngine(setup.scoring_settings)
+    assert engine.unscored == []
+    points = engine.score_stats(setup.stats)
+    assert points == pytest.approx(setup.expected)
+
+
+def test_validate_against_players_points(setup: Setup):
+    """Test validating computed points against Sleeper matchups."""
+    engine = ScoringEngine(setup.scoring_settings)
+    matrix = StatMatrix.from_stats(setup.stats)
+    matchups = [
+        {'roster_id': 1, 'players_points': {'qb': 25.0, 'wr': 19.0}},
+        {'roster_id': 2, 'players_points': {'te': 12.0, 'DET': 8.0,
+                                            'bench': 0.0}},
+    ]
+    players_points = players_points_from_matchups(matchups)
+    assert engine.validate(matrix, players_points) == {'DET': (9.0, 8.0)}
+
+
+def test_vocabulary_mismatch(setup: Setup):
+    """Test that matrices of another vocabulary are rejected."""
+    vocabulary = StatVocabulary.for_settings({'custom_stat': 1.0})
+    assert 'custom_stat' in vocabulary
+    engine = ScoringEngine({'custom_stat': 1.0})
+    assert engine.unscored == ['custom_stat']
+    with pytest.raises(ValueError):
+        engine.score(StatMatrix.from_stats(setup.stats, vocabulary))
+    with pytest.raises(ValueError):
+        StatMatrix(['a'], np.zeros((2, 3)))
+
+
+def test_scoring_fingerprint(setup: Setup):
+    """Test that equivalent scoring settings share a fingerprint."""
+    settings = setup.scoring_settings.settings
+    reordered = dict(reversed(list(settings.items())))
+    reordered['pass_td'] = 6
+    reordered['unused'] = 0.0
+    assert scoring_fingerprint(reordered) == \
+        scoring_fingerprint(setup.scoring_settings)
+    assert scoring_fingerprint(dict(settings, rec=0.5)) != \
+        scoring_fingerprint(settings)
+
+
+def test_multi_league_scoring(setup: Setup):
+    """Test scoring one week for many leagues with one matrix product."""
+    ppr = setup.scoring_settings.settings
+    half_ppr = dict(ppr, rec=0.5)
+    leagues = {'a': ppr, 'b': half_ppr, 'c': dict(ppr), 'd': {'rec': 1}}
+    scorer = MultiLeagueScorer(leagues)
+    assert scorer.weights.shape == (len(DEFAULT_VOCABULARY), 3)
+    points = scorer.score_stats(setup.stats)
+    assert points.values.shape == (len(setup.stats), 4)
+    for league_id, settings in leagues.items():
+        assert points.league(league_id) == \
+            pytest.approx(ScoringEngine(settings).score_stats(setup.stats))
+    assert points.player('wr') == {'a': 19.0, 'b': 16.5, 'c': 19.0, 'd': 5.0}
+    assert points.player('unknown') == {}
+
+
+@pytest.mark.parametrize("points_allowed, bucket", [
+    (0, 'pts_allow_0'), (1, 'pts_allow_1_6'), (6, 'pts_allow_1_6'),
+    (7, 'pts_allow_7_13'), (13, 'pts_allow_7_13'), (14, 'pts_allow_14_20'),
+    (20, 'pts_allow_14_20'), (21, 'pts_allow_21_27'),
+    (27, 'pts_allow_21_27'), (28, 'pts_allow_28_34'),
+    (34, 'pts_allow_28_34'), (35, 'pts_allow_35p'), (62, 'pts_allow_35p'),
+])
+def test_points_allowed_buckets(points_allowed: int, bucket: str):
+    """Test binning points allowed at every bucket edge."""
+    matrix = StatMatrix.from_stats({'DEF': {'pts_allow': points_allowed}})
+    buckets = {stat: matrix.values[0, DEFAULT_VOCABULARY.column(stat)]
+               for stat in DEFAULT_RULES[0].stats}
+    assert buckets == {stat: float(stat == bucket) for stat in buckets}
+
+
+def test_field_goal_distance_buckets(setup: Setup):
+    """Test scoring kickers from per kick distances."""
+    stats = {
+        'k1': {'fgm_distances': [19, 20, 39, 40, 49, 50, 61], 'xpm': 2,
+               'fgmiss_distances': [45]},
+        'k2': {'fgm_40_49': 1, 'fgm_50p': 1, 'xpm': 3, 'fgmiss': 1},
+        'k3': {'fgm_distances': [], 'fgm_50p': 1},
+    }
+    points = ScoringEngine(setup.scoring_settings).score_stats(stats)
+    assert points['k1'] == pytest.approx(3 + 3 + 3 + 4 + 4 + 5 + 5 + 2)
+    assert points['k2'] == pytest.approx(11.0)
+    assert points['k3'] == 0.0
+
+
+def test_threshold_bonuses():
+    """Test that long touchdowns count every reached threshold and
+    yardage bonuses only their range."""
+    settings = {'rush_td': 6, 'rush_td_40p': 1, 'rush_td_50p': 2,
+                'bonus_rush_yd_100': 3, 'bonus_rush_yd_200': 4}
+    stats = {
+        'rb1': {'rush_td': 3, 'rush_td_lengths': [5, 40, 55],
+                'rush_yd': 210},
+        'rb2': {'rush_td': 1, 'rush_td_lengths': [39], 'rush_yd': 99},
+        'rb3': {'rush_td': 1, 'rush_td_40p': 1, 'bonus_rush_yd_100': 1},
+        'rb4': {'rush_yd': 150, 'bonus_rush_yd_100': 1},
+        'rb5': {'rush_yd': 200, 'bonus_rush_yd_200': 1},
+    }
+    points = ScoringEngine(settings).score_stats(stats)
+    assert points == pytest.approx(
+        {'rb1': 18 + 2 * 1 + 2 + 4, 'rb2': 6, 'rb3': 10, 'rb4': 3,
+         'rb5': 4})
+
+
+def test_invalid_rules():
+    """Test that rules need sorted edges and one stat per edge."""
+    with pytest.raises(ValueError):
+        BucketRule('pts_allow', (7, 0), ('a', 'b'))
+    with pytest.raises(ValueError):
+        ThresholdRule('rush_yd', (100,), ('a', 'b'))
+
+
+def test_defense_and_kicking_settings(setup: Setup):
+    """Test the bucketed defense and kicking settings keys."""
+    settings = setup.scoring_settings.settings
+    defense = Defense(dict(settings, pts_allow_21_27=-0.5))
+    assert defense.pts_allow_21_27 == -0.5
+    assert Kicking(settings).fgm_50p == 5.0
+
+
+def test_live_scoring_from_deltas(setup: Setup):
+    """Test that stat deltas update points, lineups and leaderboards."""
+    ppr = setup.scoring_settings.settings
+    leagues = {'ppr': ppr, 'half': dict(ppr, rec=0.5)}
+    lineups = {
+        'ppr': {'1': ['qb', 'wr'], '2': ['te', 'DET', 'k']},
+        'half': {'1': ['wr', 'te'], '2': ['qb', 'rb']},
+    }
+    stats = {player_id: dict(player_stats)
+             for player_id, player_stats in setup.stats.items()}
+    stats['DET'] = {'pts_allow': 10, 'sack': 3, 'int': 1}
+    scorer = LiveScorer(leagues, lineups)
+    scorer.load_stats(stats)
+    assert scorer.lineup_total('ppr', '1') == pytest.approx(44.0)
+    assert scorer.leaderboard('ppr') == [('1', 44.0), ('2', 32.0)]
+
+    deltas = {
+        'wr': {'rec': 1, 'rec_yd': 45, 'rec_td_lengths': [45]},
+        'DET': {'pts_allow': 7},
+        'rb': {'rush_yd': 120, 'rush_td': 1},
+    }
+    changed = scorer.apply_deltas(deltas)
+    assert changed == {('ppr', '1'), ('ppr', '2'), ('half', '1'),
+                       ('half', '2')}
+    assert scorer.points('DET')['ppr'] == pytest.approx(6.0)
+    assert scorer.points('rb') == {'ppr': 18.0, 'half': 18.0}
+    assert scorer.leaderboard('ppr') == [('1', pytest.approx(49.5)),
+                                         ('2', pytest.approx(29.0))]
+
+    stats['wr'].update(rec=6, rec_yd=125, rec_td=1,
+                       rec_td_lengths=[45])
+    stats['DET']['pts_allow'] = 17
+    stats['rb'] = {'rush_yd': 120, 'rush_td': 1}
+    expected = LiveScorer(leagues, lineups)
+    expected.load_stats(stats)
+    for league_id in leagues:
+        for roster_id in lineups[league_id]:
+            assert scorer.lineup_total(league_id, roster_id) == \
+                pytest.approx(expected.lineup_total(league_id, roster_id))
+    assert scorer.apply_deltas({'bench': {'rec': 1}}) == set()
+
+
+def test_scored_week_cache(setup: Setup, tmp_path):
+    """Test reusing stored finished weeks across equivalent leagues."""
+    ppr = setup.scoring_settings.settings
+    leagues = {'a': ppr, 'b': dict(reversed(list(ppr.items()))),
+               'c': dict(ppr, rec=0.5)}
+    loaded = []
+
+    def load_stats(season: str, week: int):
+        loaded.append((season, week))
+        return setup.stats
+
+    cache = ScoredWeekCache(tmp_path)
+    weeks = cache.league_weeks(leagues, '2023', [1, 2, 3], load_stats,
+                               current_week=3)
+    assert loaded == [('2023', 1), ('2023', 2), ('2023', 3)]
+    assert len(cache) == 4
+    assert weeks['a'][1].as_dict() == pytest.approx(setup.expected)
+    assert weeks['b'][2].as_dict() == weeks['a'][2].as_dict()
+    assert weeks['c'][3].as_dict()['wr'] == pytest.approx(16.5)
+
+    loaded.clear()
+    reopened = ScoredWeekCache(tmp_path)
+    weeks = reopened.league_weeks({'d': dict(ppr)}, '2023', [1, 2, 3],
+                                  load_stats, current_week=3)
+    assert loaded == [('2023', 3)]
+    assert weeks['d'][2].as_dict() == pytest.approx(setup.expected)
+    assert reopened.stats()['hits'] == 2
+    assert reopened.get(ppr, '2023', 1) is not None
+    assert reopened.get(ppr, '2023', 3) is None
+
+    stored = reopened.league_week({'rec': 1}, '2022', 1, load_stats)
+    assert stored.as_dict()['wr'] == 5.0
+    assert week_key(scoring_fingerprint({'rec': 1}), '2022', 1) in reopened
+    reopened.clear()
+    assert len(reopened) == 0
+
+
+def test_top_k_breaks_ties():
+    """Test partition selection with deterministic tie-breaking."""
+    points = np.array([5.0, 9.0, 7.0, 9.0, 7.0, 1.0])
+    assert top_k(points, 3).tolist() == [1, 3, 2]
+    assert top_k(points, 3, include_ties=True).tolist() == [1, 3, 2, 4]
+    assert top_k(points, 2, [np.array([0, 1, 0, 0, 0, 0])]).tolist() \
+        == [3, 1]
+    assert top_k(points, 10).tolist() == [1, 3, 2, 4, 0, 5]
+    assert top_k(points, 0).tolist() == []
+
+
+def test_top_scorers_per_position(setup: Setup):
+    """Test the top scorers of several positions in one query."""
+    players = {
+        'qb': {'position': 'QB', 'years_exp': 3},
+        'qb2': {'position': 'QB', 'years_exp': 0},
+        'wr': {'position': 'WR', 'years_exp': 0},
+        'wr2': {'position': 'WR', 'years_exp': 5},
+        'te': {'position': 'TE', 'years_exp': 1},
+        'DET': {'position': 'DEF'},
+        'k': {'position': 'K', 'years_exp': 9},
+    }
+    stats = dict(setup.stats, qb2={'pass_yd': 100}, wr2={'rec': 19})
+    points = ScoringEngine(setup.scoring_settings).score_stats(stats)
+    week = ScoredWeek(np.array(list(points)), np.array(list(points.values())))
+    query = TopScorerQuery.from_week(week, PlayerIndex(players))
+    top = query.top(['QB', 'WR', 'RB'], depth=1)
+    assert top == {'QB': [TopScorer(1, 'qb', 25.0)],
+                   'WR': [TopScorer(1, 'wr', 19.0)], 'RB': []}
+    assert query.top(['WR'], depth=1, include_ties=True)['WR'] == \
+        [TopScorer(1, 'wr', 19.0), TopScorer(1, 'wr2', 19.0)]
+    tie_break = TopScorerQuery(week.player_ids, week.points,
+                               {'WR': ['wr', 'wr2']}, {'wr2': 100.0})
+    assert tie_break.top(depth=2)['WR'][0].player_id == 'wr2'
+    rookies = TopScorerQuery.from_week(week, PlayerIndex(players),
+                                       ['QB', 'WR'], rookies=True)
+    assert [scorer.player_id for scorer in rookies.top()['QB']] == ['qb2']
+    with pytest.raises(KeyError):
+        query.top(['LB'])